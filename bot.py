@@ -7,6 +7,7 @@ from dotenv import load_dotenv
 import logging
 import yaml
 import os
+from cogs.utility.log_pipeline import setup_logging
 load_dotenv()
 DISCORD_BOT_KEY = os.environ.get("DISCORD_BOT_KEY")
 #print(DISCORD_BOT_KEY) how to leak ur key 101
@@ -15,18 +16,9 @@ def load_config():
     with open('config/config.yml', 'r') as file:
         return yaml.safe_load(file)
 config = load_config()
-# setup logging
+# setup logging: log calls only queue the record, a background thread does the disk writes
 log_file_path = config.get("log_file_path", "bot.log")
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    filename=log_file_path,
-    encoding='utf-8'
-)
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)
-console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-logging.getLogger().addHandler(console_handler)
+setup_logging(config.get("logging") or {}, log_file_path)
 # intents shittt
 intents = discord.Intents.default()
 intents.message_content = True
@@ -53,6 +45,8 @@ async def on_ready():
 # load cogs
 async def load_cogs():
     try:
+          # First: the other cogs register their message handlers with it as they load.
+          await bot.load_extension("cogs.utility.message_router")
           await bot.load_extension("cogs.testing.message")
           await bot.load_extension("cogs.testing.homework_manager")
           await bot.load_extension("cogs.testing.log")
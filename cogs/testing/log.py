@@ -2,14 +2,29 @@
 from discord.ext import commands
 import logging
 
+# Its own logger, so config.yml can rate-limit or silence the per-message log (logging: rate_limits).
+logger = logging.getLogger(__name__)
+
 class Log(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
+    async def cog_load(self):
+        router = self.bot.get_cog("MessageRouter")
+        if router is None:
+            logging.error("The `MessageRouter` cog is not loaded.")
+            return
+        router.add_observer(self.log_message)
+
+    async def cog_unload(self):
+        router = self.bot.get_cog("MessageRouter")
+        if router is not None:
+            router.remove(self.log_message)
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        logging.info(f'Message from {message.author}: {message.content}')
+    def log_message(self, message):
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        logger.info(f'Message from {message.author}: {message.content}')
 
 async def setup(bot):
     logging.info("setting up the log cog...")
@@ -1,19 +1,26 @@
 # cogs/testing/message.py
 from discord.ext import commands
+import logging
 
 
 class Message(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author == self.bot.user:
+    async def cog_load(self):
+        router = self.bot.get_cog("MessageRouter")
+        if router is None:
+            logging.error("The `MessageRouter` cog is not loaded.")
             return
+        router.add_trigger("test1", self.on_test)
+
+    async def cog_unload(self):
+        router = self.bot.get_cog("MessageRouter")
+        if router is not None:
+            router.remove(self.on_test)
 
-        if "test1" in message.content.lower():
-            await message.channel.send("test")
+    async def on_test(self, message):
+        await message.channel.send("test")
 
 
 async def setup(bot):
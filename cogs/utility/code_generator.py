@@ -1,11 +1,50 @@
 # cogs/utility/code_generator.py
 import discord
 from discord.ext import commands
+import asyncio
 import logging
 import re
 import os
+import yaml
 from groq import AsyncGroq
 
+from cogs.utility.compile_scheduler import CompileCancelled
+from cogs.utility.language_detection import LANGUAGE_ALIASES, LanguageHistory, detect_language
+
+MAX_CODE_CANDIDATES = 4  # stays under the compile queue's per-user limit
+CODE_REPAIR_ERROR_CHARS = 1500
+
+class Candidate:
+    """One generated program and what happened when it was run."""
+
+    def __init__(self, code, result=None, error=None):
+        self.code = code
+        self.result = result
+        self.error = error
+
+    @property
+    def passed(self):
+        if self.error or not self.result:
+            return False
+        if (self.result.get("buildResult") or {}).get("code") not in (None, 0):
+            return False
+        return (self.result.get("execResult") or {}).get("code", self.result.get("code")) == 0
+
+    def failure_report(self):
+        """What went wrong, as the compiler/runtime reported it, for the repair prompt."""
+        if self.error:
+            return self.error
+        result = self.result or {}
+        build = result.get("buildResult") or {}
+        if build.get("code") not in (None, 0):
+            stderr = build.get("stderr", "")
+            if isinstance(stderr, list):  # godbolt sends [{"text": ...}, ...]
+                stderr = "\n".join(line.get("text", "") for line in stderr)
+            return f"Compilation failed:\n{str(stderr).strip()[:CODE_REPAIR_ERROR_CHARS]}"
+        exec_result = result.get("execResult") or {}
+        stderr = (exec_result.get("stderr") or "").strip()
+        return f"Exited with code {exec_result.get('code')}:\n{stderr[:CODE_REPAIR_ERROR_CHARS] or '(no error output)'}"
+
 class CodeGenerator(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
@@ -29,40 +68,178 @@ class CodeGenerator(commands.Cog):
             "csharp": "cs",
             "c#": "cs"
         }
+        with open('config/config.yml', 'r') as file:
+            config = yaml.safe_load(file).get("code_generator", {}) or {}
+        self.language_history = LanguageHistory(config.get("language_history_path") or None)
 
-    @commands.command()
-    async def code(self, ctx, *, prompt=None):
-        if not prompt:
-            await ctx.send("Please provide a prompt describing the code you want to generate.")
-            return
+    async def cog_load(self):
+        await self.language_history.load()
+
+    async def cog_unload(self):
+        await self.language_history.close()
+
+    def extract_code(self, text):
+        return self.extract_fence(text)[1]
 
-        # First, determine what language to use
+    def extract_fence(self, text):
+        """(fence tag or None, code) of the first code block in a response."""
+        # Extract the code block using regex
+        match = re.search(r"```([\w+#]+)?\n([\s\S]+?)\n```", text)
+        # If no code block is found, use the entire response
+        return (match.group(1), match.group(2)) if match else (None, text)
+
+    async def ask_language(self, prompt):
+        """The old way: a separate LLM call just to pick the language."""
         language_prompt = (
             "What programming language would be most appropriate for the following task? If the user gives one they want use that instead unless it isnt in the list."
             "Respond with just the name of one language from this list: Python, Java, JavaScript, C, C++, Rust, Go, C#."
             f"Task: {prompt}"
         )
+        language_response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": language_prompt}],
+            temperature=0.2,
+            max_tokens=50
+        )
+        language_text = language_response.choices[0].message.content.strip().lower()
 
-        async with ctx.typing():
-            try:
-                # Determine the language
-                language_response = await self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[{"role": "user", "content": language_prompt}],
-                    temperature=0.2,
-                    max_tokens=50
-                )
-                language_text = language_response.choices[0].message.content.strip().lower()
+        # Find the language in the response
+        language = LANGUAGE_ALIASES.get(language_text.strip(" .`*\n"))
+        if language:
+            return language
+        for lang in self.supported_languages:
+            if lang in language_text:
+                return lang
+        return "python"  # Default to Python if no clear language is detected
+
+    async def generate_any_language(self, prompt):
+        """One call that both picks the language and writes the code. Returns (language, code)."""
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": (
+                "Write complete, working code for the following task. If the user gives a language they want use that, "
+                "unless it isnt in this list; otherwise pick the most appropriate one from: Python, Java, JavaScript, C, C++, Rust, Go, C#. "
+                "Only provide the code itself without explanations, in one code block whose opening fence names the language "
+                "(for example ```python). "
+                f"Task: {prompt}"
+            )}],
+            temperature=self.temperature,
+            max_tokens=self.max_tokens
+        )
+        tag, code = self.extract_fence(response.choices[0].message.content.strip())
+        return LANGUAGE_ALIASES.get((tag or "").lower(), "python"), code
+
+    async def generate(self, prompt):
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=self.temperature,
+            max_tokens=self.max_tokens
+        )
+        return self.extract_code(response.choices[0].message.content.strip())
 
-                # Find the language in the response
-                detected_language = None
-                for lang in self.supported_languages:
-                    if lang in language_text:
-                        detected_language = lang
-                        break
+    async def attempt(self, ctx, compiler_cog, lang_code, prompt):
+        """Generate one program and run it. Failures end up in the Candidate, not as exceptions."""
+        try:
+            code = await self.generate(prompt)
+        except Exception as e:
+            logging.error(f"Candidate generation failed: {e}")
+            return Candidate(None, error=f"Generation failed: {e}")
+        result, error = await compiler_cog.compile_code(
+            compiler_cog.resolve_compiler(lang_code)["id"],
+            code,
+            language=lang_code,
+            user_id=ctx.author.id,
+            message_id=ctx.message.id
+        )
+        return Candidate(code, result, error)
+
+    async def first_passing(self, attempts):
+        """Run attempts concurrently. Returns (winner, []) as soon as one passes, cancelling the
+        rest, or (None, candidates) once they have all failed."""
+        tasks = [asyncio.create_task(attempt) for attempt in attempts]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                candidate = await next_done
+                if candidate.passed:
+                    return candidate, []
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return None, [task.result() for task in tasks]
 
-                if not detected_language:
-                    detected_language = "python"  # Default to Python if no clear language is detected
+    def repair_prompt(self, language, task, candidate):
+        return (
+            f"This {language} program was written for the task below, but it failed when run.\n"
+            f"Task: {task}\n\n"
+            f"Program:\n```\n{candidate.code}\n```\n\n"
+            f"{candidate.failure_report()}\n\n"
+            f"Fix it. Only provide the complete corrected code without explanations, wrapped in a code block."
+        )
+
+    async def generate_verified(self, ctx, compiler_cog, language, lang_code, task, code_prompt, candidates):
+        """Generate `candidates` programs at once and keep the first that runs cleanly. If none does,
+        each distinct failure gets one repair attempt, also run concurrently.
+        Returns (candidate, note); candidate may have failed if the repair round did too."""
+        winner, failed = await self.first_passing(
+            self.attempt(ctx, compiler_cog, lang_code, code_prompt) for _ in range(candidates)
+        )
+        if winner:
+            return winner, f"passed on the first round ({candidates} candidates)"
+
+        repairable = list({c.code: c for c in failed if c.code is not None}.values())
+        if not repairable:
+            return failed[0], "every candidate failed to generate"
+        logging.info(f"All {candidates} code candidates failed for {ctx.author}; repairing {len(repairable)}")
+        winner, repaired = await self.first_passing(
+            self.attempt(ctx, compiler_cog, lang_code, self.repair_prompt(language, task, c)) for c in repairable
+        )
+        if winner:
+            return winner, f"passed after a repair round ({candidates} candidates)"
+        return next((c for c in repaired if c.code is not None), repairable[0]), "no candidate passed, even after repair"
+
+    async def send_output(self, ctx, output):
+        # Send the output, handling Discord's message length limit
+        if len(output) > 2000:
+            chunks = [output[i:i+1994] for i in range(0, len(output), 1994)]
+            for chunk in chunks:
+                await ctx.send(chunk)
+        else:
+            await ctx.send(output)
+
+    @commands.command()
+    async def code(self, ctx, *, prompt=None):
+        candidates = 1
+        match = re.match(r"-k\s*=?\s*(\d+)\s+", prompt or "")
+        if match:
+            candidates = max(1, min(int(match.group(1)), MAX_CODE_CANDIDATES))
+            prompt = prompt[match.end():]
+
+        if not prompt:
+            await ctx.send("Please provide a prompt describing the code you want to generate.\n"
+                           f"Use `!code -k 3 <prompt>` to generate up to {MAX_CODE_CANDIDATES} candidates at once "
+                           "and keep the first one that compiles and runs cleanly.")
+            return
+
+        async with ctx.typing():
+            try:
+                # First, determine what language to use: locally when the prompt makes it clear,
+                # otherwise the LLM picks it (in the same call as the code when possible).
+                detection = detect_language(prompt, self.language_history)
+                code = None
+                if detection.confident:
+                    detected_language = detection.language
+                    logging.info(f"Detected {detected_language} locally for {ctx.author} ({', '.join(detection.reasons) or 'keywords'})")
+                    if detection.reasons:
+                        self.language_history.observe(prompt, detected_language)
+                elif candidates > 1:
+                    # Every candidate has to be in the same language, so settle it up front.
+                    detected_language = await self.ask_language(prompt)
+                    self.language_history.observe(prompt, detected_language)
+                else:
+                    detected_language, code = await self.generate_any_language(prompt)
+                    self.language_history.observe(prompt, detected_language)
 
                 lang_code = self.supported_languages.get(detected_language, "py")
 
@@ -73,52 +250,48 @@ class CodeGenerator(commands.Cog):
                     f"Task: {prompt}"
                 )
 
-                code_response = await self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[{"role": "user", "content": code_prompt}],
-                    temperature=self.temperature,
-                    max_tokens=self.max_tokens
-                )
-
-                code_text = code_response.choices[0].message.content.strip()
-
-                # Extract the code block using regex
-                code_block_regex = r"```(?:\w+)?\n([\s\S]+?)\n```"
-                match = re.search(code_block_regex, code_text)
+                compiler_cog = self.bot.get_cog("Compiler")
+                if candidates > 1 and compiler_cog:
+                    await ctx.send(f"Generating {candidates} {detected_language} candidates and running them...")
+                    candidate, note = await self.generate_verified(
+                        ctx, compiler_cog, detected_language, lang_code, prompt, code_prompt, candidates
+                    )
+                    if candidate.code is None:
+                        await ctx.send(f"Error generating code: {candidate.error}")
+                        return
+                    await ctx.send(f"Generated {detected_language} code ({note}):\n```{lang_code}\n{candidate.code}\n```")
+                    if candidate.error:
+                        await ctx.send(f"Error running code: {candidate.error}")
+                    else:
+                        await self.send_output(ctx, compiler_cog.format_output(candidate.result, lang_code))
+                    return
 
-                if match:
-                    code = match.group(1)
-                else:
-                    # If no code block is found, use the entire response
-                    code = code_text
+                if code is None:
+                    code = await self.generate(code_prompt)
 
                 # Send generated code
                 await ctx.send(f"Generated {detected_language} code:\n```{lang_code}\n{code}\n```")
 
                 # Now compile and run the code using the Compiler cog
-                compiler_cog = self.bot.get_cog("Compiler")
                 if compiler_cog:
                     await ctx.send("Executing code...")
                     result, error = await compiler_cog.compile_code(
-                        compiler_cog.language_compilers[lang_code]["id"],
-                        code
+                        compiler_cog.resolve_compiler(lang_code)["id"],
+                        code,
+                        language=lang_code,
+                        user_id=ctx.author.id,
+                        message_id=ctx.message.id
                     )
 
                     if error:
                         await ctx.send(f"Error running code: {error}")
                     else:
-                        output = compiler_cog.format_output(result, lang_code)
-
-                        # Send the output, handling Discord's message length limit
-                        if len(output) > 2000:
-                            chunks = [output[i:i+1994] for i in range(0, len(output), 1994)]
-                            for chunk in chunks:
-                                await ctx.send(chunk)
-                        else:
-                            await ctx.send(output)
+                        await self.send_output(ctx, compiler_cog.format_output(result, lang_code))
                 else:
                     await ctx.send("Compiler module not available. Code execution skipped.")
 
+            except CompileCancelled:
+                logging.info(f"Code run for {ctx.author} withdrawn: request message deleted")
             except Exception as e:
                 logging.error(f"Error in code generation: {e}")
                 await ctx.send(f"An error occurred while generating or running the code: {str(e)}")
@@ -0,0 +1,430 @@
+# bot/cogs/utility/compile_backends.py
+import abc
+import asyncio
+import json
+import logging
+import os
+import re
+import shlex
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from cogs.utility import sandbox_launcher
+
+logger = logging.getLogger(__name__)
+
+GODBOLT_FILTERS = {
+    "binary": False,
+    "execute": True,
+    "labels": True,
+    "directives": True,
+    "commentOnly": True,
+    "demangle": True,
+    "intel": True
+}
+
+# Marker in a toolchain command that is replaced by the user's -a arguments.
+USER_ARGS = "{args}"
+MAX_OUTPUT_BYTES = 64 * 1024  # per stream; the rest is drained and dropped
+
+# All the program sees of the host, read-only; everything else (the bot's files, .env, /home,
+# /root, /tmp) doesn't exist inside the sandbox. Toolchains add their own install directories.
+SANDBOX_READONLY_PATHS = ["/usr", "/bin", "/sbin", "/lib", "/lib32", "/lib64", "/libx32",
+                          "/etc/alternatives", "/etc/ld.so.cache", "/etc/ld.so.conf", "/etc/ld.so.conf.d"]
+SANDBOX_DEVICES = ["/dev/null", "/dev/zero", "/dev/random", "/dev/urandom"]
+
+
+class CompileBackend(abc.ABC):
+    """Runs source with one toolchain.
+
+    `compile()` returns (result, error) where result has the shape of Compiler Explorer's JSON
+    response (buildResult / execResult / asm), which is what `Compiler.format_output` reads.
+    """
+
+    name = ""
+
+    def supports(self, language: str) -> bool:
+        return True
+
+    @abc.abstractmethod
+    async def compile(self, compiler_id, source_code, user_args, language=None, show_asm=False):
+        """Compile (and run) `source_code`; returns (result, error)."""
+
+
+class GodboltBackend(CompileBackend):
+    """Compiles and runs on godbolt.org through the Compiler cog's shared session."""
+
+    name = "godbolt"
+
+    def __init__(self, url: str, get_session: Callable):
+        self.url = url
+        self.get_session = get_session
+
+    async def compile(self, compiler_id, source_code, user_args, language=None, show_asm=False):
+        session = self.get_session()
+        compile_endpoint = f"{self.url}/{compiler_id}/compile"
+
+        payload = {
+            "source": source_code,
+            "options": {
+                "userArguments": user_args,
+                "executeParameters": {
+                    "args": [],
+                    "stdin": ""
+                },
+                "compilerOptions": {
+                    # An executor-only request skips the assembly; ask for a full compile when it's wanted.
+                    "executorRequest": not show_asm
+                },
+                "filters": GODBOLT_FILTERS
+            }
+        }
+
+        try:
+            headers = {"Content-Type": "application/json", "Accept": "text/plain"}
+            async with session.post(compile_endpoint, json=payload, headers=headers) as response:
+                if response.status != 200:
+                    return None, f"API returned status code {response.status}"
+
+                response_text = await response.text()
+                # Try to parse as JSON first
+                result = {}
+                compilation_messages = None
+                try:
+                    response_json = json.loads(response_text)
+                    if 'compilationMessages' in response_json:
+                        compilation_messages = response_json['compilationMessages']
+                        result['compilationMessages'] = compilation_messages
+                    return response_json, None
+                except json.JSONDecodeError:
+                    # If not JSON, parse as plain text
+                    pass
+
+                # Parse plain text for stdout
+                stdout_start_marker = "Standard out:\n"
+                stdout_start_index = response_text.find(stdout_start_marker)
+                if stdout_start_index != -1:
+                    stdout_end_index = response_text.find("\nStandard error:", stdout_start_index)
+                    if stdout_end_index == -1:
+                        stdout_end_index = len(response_text)
+                    stdout_output = response_text[stdout_start_index + len(stdout_start_marker):stdout_end_index].strip()
+                    result['execResult'] = result.get('execResult', {})
+                    result['execResult']['stdout'] = stdout_output
+
+                # Parse plain text for stderr
+                stderr_start_marker = "Standard error:\n"
+                stderr_start_index = response_text.find(stderr_start_marker)
+                if stderr_start_index != -1:
+                    stderr_output = response_text[stderr_start_index + len(stderr_start_marker):].strip()
+                    result['execResult'] = result.get('execResult', {})
+                    result['execResult']['stderr'] = stderr_output
+
+                # If we found any output, consider it a success
+                # Check for result code pattern in response text
+                result_code_match = re.search(r"# Compiler exited with result code (\d+)", response_text)
+                if result_code_match:
+                    exit_code = int(result_code_match.group(1))
+                    result['execResult'] = result.get('execResult', {})
+                    result['execResult']['code'] = exit_code
+                    return result, None
+                elif 'execResult' in result:
+                    result['execResult']['code'] = 0
+                    return result, None
+                else:
+                    logger.error(f"Failed to parse response: {response_text[:500]}")
+                    return None, "Failed to parse API response"
+        except Exception as e:
+            logger.error(f"Error compiling code: {e}")
+            return None, f"Error: {str(e)}"
+
+
+class LocalToolchain:
+    """How to build (optionally) and run one language inside the sandbox working directory.
+
+    `mounts` are extra host paths the toolchain needs inside the sandbox (read-only), on top of
+    SANDBOX_READONLY_PATHS and the directories its commands are found in. Toolchains behind a
+    manager's proxy in the user's home (rustup) or that need their root in the environment (go)
+    name a `home_command` printing their install directory; `locate()` then mounts it, runs the
+    real binaries from there, and exports it as `home_env` if set.
+    """
+
+    def __init__(self, name: str, filename: str, run: List[str], build: Optional[List[str]] = None,
+                 env: Optional[Dict[str, str]] = None, mounts: Optional[List[str]] = None,
+                 home_command: Optional[List[str]] = None, home_env: Optional[str] = None):
+        self.name = name
+        self.filename = filename
+        self.run = run
+        self.build = build
+        self.env = env or {}
+        self.mounts = mounts or []
+        self.home_command = home_command
+        self.home_env = home_env
+        self.home: Optional[str] = None
+
+    def locate(self):
+        """Blocking; called once when the sandbox starts."""
+        if not self.home_command or self.home or not self.available():
+            return
+        try:
+            home = subprocess.run(self.home_command, capture_output=True, text=True, timeout=30, check=True).stdout.strip()
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.warning(f"Couldn't locate {self.name}: {e}")
+            return
+        self.home = home
+        self.mounts.append(home)
+        if self.home_env:
+            self.env[self.home_env] = home
+        for command in (self.build, self.run):
+            if command and not command[0].startswith("./"):
+                command[0] = os.path.join(home, "bin", command[0])
+
+    def commands(self) -> List[str]:
+        return [self.run[0]] + ([self.build[0]] if self.build else [])
+
+    def available(self) -> bool:
+        return all(cmd.startswith("./") or shutil.which(cmd) for cmd in self.commands())
+
+    def readonly_paths(self) -> List[str]:
+        paths = list(self.mounts)
+        for cmd in self.commands():
+            found = None if cmd.startswith("./") else shutil.which(cmd)
+            if found:
+                paths.append(os.path.dirname(found))
+                paths.append(os.path.dirname(os.path.realpath(found)))
+        return paths
+
+
+# The bot's own interpreter, by absolute path: a `python3` shim on PATH (pyenv, ...) would need
+# its whole manager inside the sandbox.
+_PYTHON = LocalToolchain("Python 3 (local)", "main.py", run=[sys.executable, USER_ARGS, "main.py"],
+                         mounts=[sys.base_prefix])
+_NODE = LocalToolchain("Node.js (local)", "main.js", run=["node", USER_ARGS, "main.js"])
+_GCC = LocalToolchain("gcc (local)", "main.c", build=["gcc", USER_ARGS, "main.c", "-o", "main", "-lm"], run=["./main"])
+_GXX = LocalToolchain("g++ (local)", "main.cpp", build=["g++", USER_ARGS, "main.cpp", "-o", "main"], run=["./main"])
+# Run the active toolchain's own rustc: rustup's proxy would need ~/.rustup and ~/.cargo in the sandbox.
+_RUSTC = LocalToolchain("rustc (local)", "main.rs", build=["rustc", USER_ARGS, "main.rs", "-o", "main"], run=["./main"],
+                        home_command=["rustc", "--print", "sysroot"])
+_GO = LocalToolchain("go (local)", "main.go", build=["go", "build", USER_ARGS, "-o", "main", "main.go"], run=["./main"],
+                     env={"GOCACHE": "{tmp}/.gocache", "GOPATH": "{tmp}/.gopath"},
+                     home_command=["go", "env", "GOROOT"], home_env="GOROOT")
+
+LOCAL_TOOLCHAINS = {
+    "py": _PYTHON,
+    "python": _PYTHON,
+    "js": _NODE,
+    "javascript": _NODE,
+    "c": _GCC,
+    "cpp": _GXX,
+    "c++": _GXX,
+    "rust": _RUSTC,
+    "go": _GO,
+}
+
+
+class SandboxLimits:
+    def __init__(self, timeout_seconds: float = 10, cpu_seconds: int = 5, memory_mb: int = 512,
+                 max_processes: int = 256, max_file_mb: int = 16):
+        self.timeout_seconds = timeout_seconds
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.max_processes = max_processes
+        self.max_file_mb = max_file_mb
+
+
+class LocalSandboxBackend(CompileBackend):
+    """Builds and runs code in a subprocess on this machine.
+
+    Each request gets a fresh temp directory as its working directory and HOME, and a minimal
+    environment. Every process runs in its own session, with rlimits on CPU time, data size,
+    process count, file size and open files, and in new user, mount, pid and network namespaces:
+    no network, no other processes, and a filesystem that is an empty tmpfs holding read-only binds
+    of the system and toolchain directories plus the writable temp directory, pivoted to as the
+    root. That setup is done by sandbox_launcher, run as a process of its own, so the bot itself
+    only forks and execs. A wall-clock timeout kills the whole process group. If the sandbox can't
+    be set up on this host (or the bot's own files are still visible from inside it), the backend
+    disables itself and requests go to godbolt.
+    """
+
+    name = "local"
+
+    def __init__(self, limits: SandboxLimits):
+        self.limits = limits
+        self.enabled = False
+
+    async def start(self):
+        # Probe once: only enable local runs if the isolation works here.
+        probe = ["/bin/sh", "-c", 'test ! -e "$1"', "sh", os.path.abspath(__file__)]
+        tmp = await asyncio.to_thread(self._make_temp)
+        try:
+            result = await self._run(probe, tmp, self._env(tmp), self._spec_for(tmp, []))
+            self.enabled = result["code"] == 0
+            if result["code"] == sandbox_launcher.SETUP_FAILED:
+                logger.warning(f"Local compile sandbox unavailable: {result['stderr']}")
+        except Exception as e:
+            logger.warning(f"Local compile sandbox unavailable: {e}")
+            self.enabled = False
+        finally:
+            await asyncio.to_thread(self._remove_temp, tmp)
+        if self.enabled:
+            for toolchain in set(LOCAL_TOOLCHAINS.values()):
+                await asyncio.to_thread(toolchain.locate)
+            available = sorted({lang for lang, tc in LOCAL_TOOLCHAINS.items() if tc.available()})
+            logger.info(f"Local compile sandbox ready for: {', '.join(available) or 'nothing'}")
+        else:
+            logger.warning("Local compile sandbox disabled (no user/mount/network namespaces); using godbolt for everything")
+
+    def supports(self, language: str) -> bool:
+        toolchain = LOCAL_TOOLCHAINS.get(language)
+        return self.enabled and toolchain is not None and toolchain.available()
+
+    @staticmethod
+    def _make_temp() -> str:
+        """A fresh working directory, plus an empty `<dir>.root` next to it to build the sandbox root on."""
+        tmp = tempfile.mkdtemp(prefix="compile-")
+        os.mkdir(tmp + ".root")
+        return tmp
+
+    @staticmethod
+    def _remove_temp(tmp: str):
+        shutil.rmtree(tmp, True)
+        shutil.rmtree(tmp + ".root", True)
+
+    def _spec_for(self, tmp: str, extra_paths: List[str]) -> Dict[str, Any]:
+        """What sandbox_launcher builds for one run in `tmp`."""
+        readonly = []
+        for path in sorted({os.path.normpath(p) for p in SANDBOX_READONLY_PATHS + extra_paths}):
+            if os.path.lexists(path) and not any(path.startswith(parent + "/") for parent in readonly):
+                readonly.append(path)
+        return {
+            "root": tmp + ".root",
+            "tmp": tmp,
+            "readonly": readonly,
+            "devices": SANDBOX_DEVICES,
+            "limits": {
+                "cpu_seconds": self.limits.cpu_seconds,
+                "memory_mb": self.limits.memory_mb,
+                "max_processes": self.limits.max_processes,
+                "max_file_mb": self.limits.max_file_mb,
+            },
+        }
+
+    def _env(self, tmp: str, extra: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        env = {"PATH": os.environ.get("PATH", "/usr/bin:/bin"), "HOME": tmp, "TMPDIR": tmp, "LANG": "C.UTF-8"}
+        for key, value in (extra or {}).items():
+            env[key] = value.replace("{tmp}", tmp)
+        return env
+
+    @staticmethod
+    async def _drain(stream, buffer: bytearray):
+        while True:
+            chunk = await stream.read(65536)
+            if not chunk:
+                return
+            if len(buffer) < MAX_OUTPUT_BYTES:
+                buffer.extend(chunk[:MAX_OUTPUT_BYTES - len(buffer)])
+
+    async def _run(self, argv: List[str], tmp: str, env: Dict[str, str], spec: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one command through sandbox_launcher; returns an execResult-style dict."""
+        stdout, stderr = bytearray(), bytearray()
+        started = time.perf_counter()
+        # The launcher reports the program's CPU time here, to tell a CPU-limit kill from others.
+        status_read, status_write = os.pipe()
+        try:
+            launcher = [sys.executable, "-I", sandbox_launcher.__file__, json.dumps({**spec, "status_fd": status_write})]
+            proc = await asyncio.create_subprocess_exec(
+                *launcher, *argv, cwd=tmp, env=env, stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+                start_new_session=True, pass_fds=(status_write,),
+            )
+        except BaseException:
+            os.close(status_read)
+            raise
+        finally:
+            os.close(status_write)
+        # return_exceptions: if we're cancelled mid-run, nobody is left to collect the readers' result.
+        readers = asyncio.gather(self._drain(proc.stdout, stdout), self._drain(proc.stderr, stderr), return_exceptions=True)
+        timed_out = False
+        try:
+            await asyncio.wait_for(proc.wait(), timeout=self.limits.timeout_seconds)
+        except asyncio.TimeoutError:
+            timed_out = True
+        finally:
+            # The whole group: whatever the program forked must not outlive the request.
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            await proc.wait()
+        try:
+            await asyncio.wait_for(readers, timeout=1)
+        except asyncio.TimeoutError:
+            pass
+        elapsed_ms = int((time.perf_counter() - started) * 1000)
+        cpu_seconds = self._read_cpu_seconds(status_read)
+
+        error_text = stderr.decode("utf-8", errors="replace")
+        code = proc.returncode
+        if timed_out:
+            error_text += f"\n[Killed: exceeded the {self.limits.timeout_seconds}s time limit]"
+        elif code == -signal.SIGXCPU or (code == -signal.SIGKILL and cpu_seconds >= self.limits.cpu_seconds):
+            # SIGKILL is the hard CPU limit only if the CPU time got there; otherwise it's the OOM
+            # killer or the program itself.
+            error_text += f"\n[Killed: exceeded the {self.limits.cpu_seconds}s CPU limit]"
+        elif code == -signal.SIGKILL:
+            error_text += f"\n[Killed (signal {-code})]"
+        if len(stdout) >= MAX_OUTPUT_BYTES:
+            error_text += "\n[Output truncated]"
+        return {
+            "stdout": stdout.decode("utf-8", errors="replace"),
+            "stderr": error_text.strip(),
+            "code": code,
+            "execTime": elapsed_ms,
+        }
+
+    @staticmethod
+    def _read_cpu_seconds(fd: int) -> float:
+        # The launcher has exited by now, so this never blocks; nothing written means it was killed.
+        try:
+            os.set_blocking(fd, False)
+            return float(os.read(fd, 64) or 0)
+        except (OSError, ValueError):
+            return 0.0
+        finally:
+            os.close(fd)
+
+    async def compile(self, compiler_id, source_code, user_args, language=None, show_asm=False):
+        toolchain = LOCAL_TOOLCHAINS.get(language)
+        if toolchain is None:
+            return None, f"No local toolchain for {language}"
+        try:
+            args = shlex.split(user_args or "")
+        except ValueError as e:
+            return None, f"Invalid arguments: {e}"
+        expand = lambda command: [part for token in command for part in (args if token == USER_ARGS else [token])]
+
+        tmp = await asyncio.to_thread(self._make_temp)
+        try:
+            with open(os.path.join(tmp, toolchain.filename), "w", encoding="utf-8") as f:
+                f.write(source_code)
+            env = self._env(tmp, toolchain.env)
+            spec = self._spec_for(tmp, toolchain.readonly_paths())
+            result = {"local": True, "compiler": toolchain.name}
+            if toolchain.build:
+                build = await self._run(expand(toolchain.build), tmp, env, spec)
+                result["buildResult"] = {"code": build["code"], "stderr": build["stderr"] or build["stdout"]}
+                if build["code"] != 0:
+                    return result, None
+                if build["stderr"]:
+                    result["compilationMessages"] = [{"message": line} for line in build["stderr"].splitlines()]
+            result["execResult"] = await self._run(expand(toolchain.run), tmp, env, spec)
+            return result, None
+        except Exception as e:
+            logger.error(f"Local compile failed: {e}")
+            return None, f"Error: {str(e)}"
+        finally:
+            await asyncio.to_thread(self._remove_temp, tmp)
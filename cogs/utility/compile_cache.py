@@ -0,0 +1,144 @@
+# bot/cogs/utility/compile_cache.py
+import asyncio
+import collections
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from cogs.utility.storage_utils import write_atomic
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 1
+SAVE_DELAY_SECONDS = 10  # batch bursts of new results into one write
+
+CompileOutcome = Tuple[Optional[Dict[str, Any]], Optional[str]]  # (result, error), as compile_code returns
+
+
+def compile_cache_key(compiler_id: str, source: str, user_args: str, filters: Dict[str, Any]) -> str:
+    """Content address of a compile request: everything that can change what godbolt returns."""
+    payload = json.dumps([compiler_id, source, user_args, filters], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CompileResultCache:
+    """LRU + TTL cache of successful compile results, optionally persisted to a JSON file.
+
+    `get_or_run()` also deduplicates in-flight work: callers asking for a key that is already
+    being compiled wait on the same call instead of starting another one. Errors are returned
+    to everyone waiting but never cached.
+    """
+
+    def __init__(self, maxsize: int = 512, ttl_seconds: float = 3600, path: Optional[str] = None):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.path = os.path.abspath(path) if path else None
+        self._entries: "collections.OrderedDict[str, Tuple[float, Dict[str, Any]]]" = collections.OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._save_task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0  # requests that joined an identical call already in flight
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, result = entry
+        if time.time() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return result
+
+    def put(self, key: str, result: Dict[str, Any]):
+        self._entries[key] = (time.time(), result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        if self.path:
+            self.schedule_save()
+
+    async def get_or_run(self, key: str, run: Callable[[], Awaitable[CompileOutcome]]) -> CompileOutcome:
+        cached = self.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached, None
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.create_task(self._run_and_store(key, run))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.shared += 1
+        # The call runs in its own task and is shielded, so a cancelled caller (even the one that
+        # started it) doesn't cancel it for the others waiting on it.
+        return await asyncio.shield(task)
+
+    async def _run_and_store(self, key: str, run: Callable[[], Awaitable[CompileOutcome]]) -> CompileOutcome:
+        result, error = await run()
+        if error is None and result is not None:
+            self.put(key, result)
+        return result, error
+
+    # --- Persistence ---
+
+    async def load(self):
+        if not self.path:
+            return
+        try:
+            entries = await asyncio.to_thread(self._read)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Discarding unreadable compile cache {self.path}: {e}")
+            return
+        now = time.time()
+        for key, stored_at, result in entries:
+            if now - stored_at <= self.ttl_seconds and key not in self._entries:
+                self._entries[key] = (stored_at, result)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        logger.info(f"Loaded {len(self._entries)} cached compile results from {self.path}")
+
+    def _read(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != CACHE_VERSION:
+            return []
+        return data["entries"]
+
+    def schedule_save(self):
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.create_task(self._save_later())
+
+    async def _save_later(self):
+        await asyncio.sleep(SAVE_DELAY_SECONDS)
+        await self.save()
+
+    async def save(self):
+        if not self.path:
+            return
+        # Oldest first, so loading back in order restores the LRU order.
+        payload = json.dumps({
+            "version": CACHE_VERSION,
+            "entries": [[key, stored_at, result] for key, (stored_at, result) in self._entries.items()],
+        })
+        try:
+            await asyncio.to_thread(write_atomic, self.path, payload)
+        except OSError as e:
+            logger.error(f"Failed to save compile cache: {e}")
+
+    async def close(self):
+        """Flush a pending batched save."""
+        if self._save_task and not self._save_task.done():
+            self._save_task.cancel()
+            await self.save()
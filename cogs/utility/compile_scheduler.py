@@ -0,0 +1,246 @@
+# bot/cogs/utility/compile_scheduler.py
+import asyncio
+import bisect
+import collections
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds; the last bucket catches everything slower.
+HISTOGRAM_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float("inf"))
+
+
+class CompileQueueFull(Exception):
+    pass
+
+
+class CompileCancelled(Exception):
+    """The message that asked for the compile was deleted before the result came back."""
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; cheap to update, good enough for percentiles to tune limits."""
+
+    def __init__(self, buckets=HISTOGRAM_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th percentile (the max for the open last bucket)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self) -> str:
+        if not self.count:
+            return "no samples"
+        return (f"n={self.count} avg={self.total / self.count:.2f}s p50≤{self.percentile(0.5):.2f}s "
+                f"p90≤{self.percentile(0.9):.2f}s p99≤{self.percentile(0.99):.2f}s max={self.max:.2f}s")
+
+
+class CompileJob:
+    def __init__(self, key: Hashable, user_id: int, run: Callable[[], Awaitable[Any]]):
+        self.key = key
+        self.user_id = user_id
+        self.run = run
+        self.enqueued_at = time.monotonic()
+        self.running = False
+        # One future per request sharing this job (identical requests are deduplicated).
+        self.waiters: Dict[object, asyncio.Future] = {}
+        self.position_callbacks: Dict[object, Callable[[int], Awaitable[None]]] = {}
+        self.last_positions: Dict[object, int] = {}
+
+
+class CompileScheduler:
+    """Bounded, per-user fair queue in front of the compile backends.
+
+    At most `max_concurrent` jobs run at once. Waiting jobs are dispatched round-robin across
+    users, so one person pasting ten snippets doesn't starve everyone else. A request identical
+    to one already queued or running joins it instead of adding a job. Requests can be withdrawn
+    by message id (`cancel_message`); a queued job with no requests left is dropped. A running job
+    is left to finish, since its result still lands in the result cache.
+    """
+
+    def __init__(self, max_concurrent: int = 4, max_queued: int = 50, max_queued_per_user: int = 5):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queued = max_queued
+        self.max_queued_per_user = max_queued_per_user
+        self._jobs: Dict[Hashable, CompileJob] = {}  # queued and running, by key
+        self._user_queues: "collections.OrderedDict[int, collections.deque]" = collections.OrderedDict()
+        self._by_message: Dict[Hashable, List[Tuple[CompileJob, object]]] = {}  # message id -> its requests
+        self._queue_changed = asyncio.Condition()
+        self._workers: List[asyncio.Task] = []
+        self._positions_changed = asyncio.Event()
+        self.queue_wait = Histogram()
+        self.execution = Histogram()
+
+    # --- Lifecycle ---
+
+    def start(self):
+        if self._workers:
+            return
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.max_concurrent)]
+        self._workers.append(asyncio.create_task(self._position_notifier()))
+
+    async def stop(self):
+        jobs = list(self._jobs.values())
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        for job in jobs:
+            for future in job.waiters.values():
+                if not future.done():
+                    future.set_exception(CompileCancelled())
+
+    # --- Queue ---
+
+    def queued_count(self) -> int:
+        return sum(len(queue) for queue in self._user_queues.values())
+
+    def running_count(self) -> int:
+        return sum(1 for job in self._jobs.values() if job.running)
+
+    def _dispatch_order(self) -> List[CompileJob]:
+        """Queued jobs in the order the workers will take them: one per user per round."""
+        queues = [list(queue) for queue in self._user_queues.values()]
+        depth = max((len(queue) for queue in queues), default=0)
+        return [queue[i] for i in range(depth) for queue in queues if i < len(queue)]
+
+    async def submit(self, key: Hashable, user_id: int, message_id: Hashable, run: Callable[[], Awaitable[Any]],
+                     on_position: Optional[Callable[[int], Awaitable[None]]] = None) -> Any:
+        """Queue `run` (or join the identical job already queued/running) and wait for its result.
+
+        Raises CompileQueueFull if the queue (or this user's share of it) is full, and
+        CompileCancelled if the request is withdrawn with `cancel_message()` first.
+        """
+        future = asyncio.get_running_loop().create_future()
+        job = self._jobs.get(key)
+        if job is None:
+            if self.queued_count() >= self.max_queued:
+                raise CompileQueueFull("The compile queue is full, try again in a bit.")
+            user_queue = self._user_queues.get(user_id)
+            if user_queue is not None and len(user_queue) >= self.max_queued_per_user:
+                raise CompileQueueFull(f"You already have {len(user_queue)} compiles queued, wait for those to finish.")
+            job = CompileJob(key, user_id, run)
+            self._jobs[key] = job
+            async with self._queue_changed:
+                self._user_queues.setdefault(user_id, collections.deque()).append(job)
+                self._queue_changed.notify()
+        token = object()
+        job.waiters[token] = future
+        requests = self._by_message.setdefault(message_id, [])
+        requests.append((job, token))
+        if on_position:
+            job.position_callbacks[token] = on_position
+            # Reported by the notifier, and only if the job is still waiting once idle workers have
+            # had their turn: a compile that starts right away shows no queue position at all.
+            self._positions_changed.set()
+        try:
+            return await future
+        except asyncio.CancelledError:
+            # The caller gave up (e.g. a sibling attempt already won): same as withdrawing it.
+            await self._withdraw(job, token)
+            raise
+        finally:
+            job.position_callbacks.pop(token, None)
+            if (job, token) in requests:
+                requests.remove((job, token))
+            if not requests and self._by_message.get(message_id) is requests:
+                del self._by_message[message_id]
+
+    async def cancel_message(self, message_id: Hashable) -> bool:
+        """Withdraw every request made by a (deleted) message. Returns True if any was waiting."""
+        requests = self._by_message.pop(message_id, [])
+        for job, token in requests:
+            future = job.waiters.get(token)
+            if future is not None and not future.done():
+                future.set_exception(CompileCancelled())
+            await self._withdraw(job, token)
+        return bool(requests)
+
+    async def _withdraw(self, job: CompileJob, token: object):
+        """Forget one request; drop its job if it was the last one and the job hasn't started."""
+        job.waiters.pop(token, None)
+        if job.waiters or job.running or self._jobs.get(job.key) is not job:
+            return
+        async with self._queue_changed:
+            user_queue = self._user_queues.get(job.user_id)
+            if user_queue is not None and job in user_queue:
+                user_queue.remove(job)
+                if not user_queue:
+                    del self._user_queues[job.user_id]
+        self._jobs.pop(job.key, None)
+        logger.info(f"Dropped queued compile for user {job.user_id}: no requests left")
+        self._positions_changed.set()
+
+    async def _take_next(self) -> CompileJob:
+        async with self._queue_changed:
+            await self._queue_changed.wait_for(lambda: bool(self._user_queues))
+            user_id, user_queue = next(iter(self._user_queues.items()))
+            job = user_queue.popleft()
+            # Round-robin: this user goes to the back of the line.
+            del self._user_queues[user_id]
+            if user_queue:
+                self._user_queues[user_id] = user_queue
+            return job
+
+    async def _worker(self):
+        while True:
+            job = await self._take_next()
+            job.running = True
+            started = time.monotonic()
+            self.queue_wait.observe(started - job.enqueued_at)
+            self._positions_changed.set()
+            try:
+                result = await job.run()
+            except Exception as e:
+                for future in job.waiters.values():
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for future in job.waiters.values():
+                    if not future.done():
+                        future.set_result(result)
+            finally:
+                self.execution.observe(time.monotonic() - started)
+                self._jobs.pop(job.key, None)
+
+    async def _report_position(self, job: CompileJob, token: object, position: int):
+        callback = job.position_callbacks.get(token)
+        if callback is None or job.last_positions.get(token) == position:
+            return
+        job.last_positions[token] = position
+        try:
+            await callback(position)
+        except Exception as e:
+            logger.warning(f"Failed to report compile queue position: {e}")
+
+    async def _position_notifier(self):
+        # Runs apart from the workers so slow message edits never hold up a compile; bursts of
+        # queue changes collapse into one round of updates.
+        while True:
+            await self._positions_changed.wait()
+            self._positions_changed.clear()
+            await asyncio.sleep(0)  # let idle workers take what they can first
+            for position, job in enumerate(self._dispatch_order(), start=1):
+                for token in list(job.position_callbacks):
+                    await self._report_position(job, token, position)
+
@@ -1,11 +1,27 @@
 # cogs/utility/compiler.py
+import discord
+from discord import app_commands
 from discord.ext import commands
+import asyncio
+import difflib
+import io
 import logging
+import time
 import aiohttp
-import json
 import re
 import argparse
 import shlex
+import yaml
+from typing import List
+
+from cogs.utility.compile_backends import GODBOLT_FILTERS, LOCAL_TOOLCHAINS, GodboltBackend, LocalSandboxBackend, SandboxLimits
+from cogs.utility.compile_cache import CompileResultCache, compile_cache_key
+from cogs.utility.compiler_catalogue import LANGUAGE_ALIASES, CompilerCatalogue
+from cogs.utility.compile_scheduler import CompileCancelled, CompileQueueFull, CompileScheduler
+from cogs.utility.message_utils import split_message
+
+MAX_COMPILE_VARIANTS = 4
+COMPILERS_LIST_LIMIT = 25
 
 class ArgumentParserError(Exception):
     pass
@@ -17,7 +33,39 @@ class CustomArgumentParser(argparse.ArgumentParser):
 class Compiler(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        with open('config/config.yml', 'r') as file:
+            config = yaml.safe_load(file).get("compiler", {}) or {}
         self.godbolt_url = "https://godbolt.org/api/compiler"
+        # One session for the cog's lifetime, so repeated compiles reuse pooled connections.
+        self.session = None
+        self.result_cache = CompileResultCache(
+            maxsize=config.get("result_cache_size", 512),
+            ttl_seconds=config.get("result_cache_ttl_seconds", 3600),
+            path=config.get("result_cache_path") or None,
+        )
+        self.backends = {
+            "godbolt": GodboltBackend(self.godbolt_url, self.get_session),
+            "local": LocalSandboxBackend(SandboxLimits(
+                timeout_seconds=config.get("local_timeout_seconds", 10),
+                cpu_seconds=config.get("local_cpu_seconds", 5),
+                memory_mb=config.get("local_memory_mb", 512),
+                max_processes=config.get("local_max_processes", 256),
+            )),
+        }
+        # language -> backend name; anything not listed (or not runnable locally) goes to godbolt
+        self.routes = config.get("routes", {}) or {}
+        self.scheduler = CompileScheduler(
+            max_concurrent=config.get("max_concurrent_compiles", 4),
+            max_queued=config.get("max_queued_compiles", 50),
+            max_queued_per_user=config.get("max_queued_compiles_per_user", 5),
+        )
+        self.catalogue = CompilerCatalogue(
+            config.get("catalogue_path") or "compiler_catalogue.json",
+            ttl_seconds=config.get("catalogue_ttl_hours", 24) * 3600,
+            fixture_path=config.get("catalogue_fixture_path") or None,
+        )
+        self.catalogue_task = None
+        # Used until the catalogue has loaded, or for aliases it doesn't know.
         self.language_compilers = {
             "py": {"id": "python311", "name": "Python 3.11"},
             "python": {"id": "python311", "name": "Python 3.11"},
@@ -34,96 +82,70 @@ class Compiler(commands.Cog):
             "go": {"id": "gl1232", "name": "x86-64 gc 1.23.2"},
         }
 
-    async def compile_code(self, compiler_id, source_code, user_args="", show_asm=False):
-        async with aiohttp.ClientSession() as session:
-            compile_endpoint = f"{self.godbolt_url}/{compiler_id}/compile"
-
-            payload = {
-                "source": source_code,
-                "options": {
-                    "userArguments": user_args,
-                    "executeParameters": {
-                        "args": [],
-                        "stdin": ""
-                    },
-                    "compilerOptions": {
-                        "executorRequest": True
-                    },
-                    "filters": {
-                        "binary": False,
-                        "execute": True,
-                        "labels": True,
-                        "directives": True,
-                        "commentOnly": True,
-                        "demangle": True,
-                        "intel": True
-                    }
-                }
-            }
-
-            try:
-                headers = {"Content-Type": "application/json", "Accept": "text/plain"}
-                async with session.post(compile_endpoint, json=payload, headers=headers) as response:
-                    if response.status != 200:
-                        return None, f"API returned status code {response.status}"
-
-                    response_text = await response.text()
-                    # Try to parse as JSON first
-                    result = {}
-                    compilation_messages = None
-                    try:
-                        response_json = json.loads(response_text)
-                        if 'compilationMessages' in response_json:
-                            compilation_messages = response_json['compilationMessages']
-                            result['compilationMessages'] = compilation_messages
-                        return response_json, None
-                    except json.JSONDecodeError:
-                        # If not JSON, parse as plain text
-                        pass
-
-                    # Parse plain text for stdout
-                    stdout_start_marker = "Standard out:\n"
-                    stdout_start_index = response_text.find(stdout_start_marker)
-                    if stdout_start_index != -1:
-                        stdout_end_index = response_text.find("\nStandard error:", stdout_start_index)
-                        if stdout_end_index == -1:
-                            stdout_end_index = len(response_text)
-                        stdout_output = response_text[stdout_start_index + len(stdout_start_marker):stdout_end_index].strip()
-                        result['execResult'] = result.get('execResult', {})
-                        result['execResult']['stdout'] = stdout_output
-
-                    # Parse plain text for stderr
-                    stderr_start_marker = "Standard error:\n"
-                    stderr_start_index = response_text.find(stderr_start_marker)
-                    if stderr_start_index != -1:
-                        stderr_output = response_text[stderr_start_index + len(stderr_start_marker):].strip()
-                        result['execResult'] = result.get('execResult', {})
-                        result['execResult']['stderr'] = stderr_output
-
-                    # If we found any output, consider it a success
-                    # Check for result code pattern in response text
-                    result_code_match = re.search(r"# Compiler exited with result code (\d+)", response_text)
-                    if result_code_match:
-                        exit_code = int(result_code_match.group(1))
-                        result['execResult'] = result.get('execResult', {})
-                        result['execResult']['code'] = exit_code
-                        return result, None
-                    elif 'execResult' in result:
-                        result['execResult']['code'] = 0
-                        return result, None
-                    else:
-                        logging.error(f"Failed to parse response: {response_text[:500]}")
-                        return None, "Failed to parse API response"
-            except Exception as e:
-                logging.error(f"Error compiling code: {e}")
-                return None, f"Error: {str(e)}"
+    async def cog_load(self):
+        await self.result_cache.load()
+        if "local" in self.routes.values():
+            await self.backends["local"].start()
+        self.scheduler.start()
+        self.catalogue_task = asyncio.create_task(self.catalogue.load(self.get_session))
+
+    async def cog_unload(self):
+        if self.catalogue_task:
+            self.catalogue_task.cancel()
+        await self.scheduler.stop()
+        await self.result_cache.close()
+        if self.session and not self.session.closed:
+            await self.session.close()
+
+    def get_session(self):
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession()
+        return self.session
+
+    def resolve_compiler(self, language):
+        """{"id", "name"} of the default compiler for a fence language, or None if unsupported."""
+        return self.catalogue.resolve(language) or self.language_compilers.get(language)
+
+    def supported_languages(self):
+        languages = set(self.language_compilers)
+        languages.update(alias for alias in LANGUAGE_ALIASES if self.catalogue.resolve(alias))
+        return sorted(languages)
+
+    def backend_for(self, language):
+        backend = self.backends.get(self.routes.get(language, "godbolt"), self.backends["godbolt"])
+        return backend if backend.supports(language) else self.backends["godbolt"]
+
+    async def compile_code(self, compiler_id, source_code, user_args="", show_asm=False, language=None,
+                           user_id=None, message_id=None, on_position=None):
+        """Compile and run through the scheduler. `message_id` is the message that asked for it
+        (deleting it withdraws the request); `on_position(n)` is awaited while it waits in the queue.
+        Raises CompileCancelled if the request is withdrawn."""
+        backend = self.backend_for(language)
+        cache_id = compiler_id if backend.name == "godbolt" else f"{backend.name}:{language}"
+        # Identical requests (same compiler, source, args and filters) are answered from the cache,
+        # or share the call already in flight.
+        key = compile_cache_key(cache_id, source_code, user_args, dict(GODBOLT_FILTERS, asm=bool(show_asm)))
+        run = lambda: self.result_cache.get_or_run(
+            key, lambda: backend.compile(compiler_id, source_code, user_args, language, show_asm)
+        )
+        if self.result_cache.get(key) is not None:
+            return await run()  # cached results don't need a slot
+        try:
+            return await self.scheduler.submit(
+                key, user_id or 0, message_id if message_id is not None else object(), run, on_position
+            )
+        except CompileQueueFull as e:
+            return None, str(e)
 
     def format_output(self, result, language, show_asm=False):
         if not result:
             return "Failed to compile or run code."
 
         output = []
-        output.append("**Compilation provided by Compiler Explorer at https://godbolt.org/**")
+        if result.get("local"):
+            output.append(f"**Ran locally with {result.get('compiler', 'a sandboxed toolchain')}**")
+        else:
+            output.append("**Compilation provided by Compiler Explorer at https://godbolt.org/**")
 
         # Process compilation messages
         self._process_compilation_messages(result, output)
@@ -217,11 +239,13 @@ class Compiler(commands.Cog):
 
             # Parse the arguments using a custom parser
             parser = CustomArgumentParser(description="Compiler options", add_help=False)
-            parser.add_argument("-a", type=str, help="Compiler arguments", default="")
+            parser.add_argument("-a", type=str, action="append", help="Compiler arguments (repeat to compare)", default=[])
+            parser.add_argument("-c", type=str, action="append", help="Compiler id (repeat to compare)", default=[])
             parser.add_argument("-s", action="store_true", help="Show assembly output")
+            parser.add_argument("-d", action="store_true", help="Attach assembly diffs between variants")
 
             if not args_part:
-                return {"args": "", "show_asm": False}, None
+                return {"a": [], "c": [], "s": False, "d": False}, None
 
             try:
                 parsed_args = parser.parse_args(shlex.split(args_part))
@@ -245,14 +269,20 @@ class Compiler(commands.Cog):
                 "Usage: !compile [options] ```language\ncode\n```\n"
                 "Options:\n"
                 "  -a=\"arg1 arg2\"   Compiler/interpreter arguments\n"
+                "  -c=<id>     Compiler Explorer compiler id instead of the language default\n"
                 "  -s,         Show assembly output (for compiled languages)\n"
-                "Example: !compile -a=\"-O3 -Wall\" -s ```c\nint main() { return 0; }\n```"
+                "  -d,         Attach assembly diffs when comparing\n"
+                f"Repeat -a and/or -c to compare up to {MAX_COMPILE_VARIANTS} variants side by side.\n"
+                "Example: !compile -a=\"-O3 -Wall\" -s ```c\nint main() { return 0; }\n```\n"
+                "Example: !compile -a=-O0 -a=-O3 -d ```c\nint main() { return 0; }\n```"
             )
             await ctx.send(f"Error parsing command arguments: {arg_error}\n\n{help_msg}")
             return
 
-        user_args = arg_dict.get("-a", "")
-        show_asm = arg_dict.get("-s", False)
+        arg_sets = arg_dict.get("a") or [""]
+        compiler_ids = arg_dict.get("c") or []
+        show_asm = arg_dict.get("s", False)
+        show_diff = arg_dict.get("d", False)
 
         language, source_code = self.extract_code_block(content)
 
@@ -260,16 +290,48 @@ class Compiler(commands.Cog):
             await ctx.send("Please provide code in a code block format. Example: ```language\ncode here\n```")
             return
 
-        if language not in self.language_compilers:
-            supported_langs = ", ".join(f"`{lang}`" for lang in self.language_compilers.keys())
+        compiler_info = self.resolve_compiler(language)
+        if compiler_info is None:
+            supported_langs = ", ".join(f"`{lang}`" for lang in self.supported_languages())
             await ctx.send(f"Unsupported language. Supported languages are: {supported_langs}")
             return
 
-        compiler_info = self.language_compilers[language]
-        await ctx.send(f"Compiling {compiler_info['name']} code{' with arguments: ' + user_args if user_args else ''}...")
+        unknown_ids = [cid for cid in compiler_ids if self.catalogue.loaded and cid not in self.catalogue.compilers]
+        if unknown_ids:
+            await ctx.send(self.unknown_compiler_message(unknown_ids[0], language))
+            return
+
+        if compiler_ids:
+            # An explicit compiler id always means godbolt (routing is per language, not per compiler).
+            compilers = [(cid, self.compiler_name(cid), None) for cid in compiler_ids]
+        else:
+            compiler_name = LOCAL_TOOLCHAINS[language].name if self.backend_for(language).name == "local" else compiler_info['name']
+            compilers = [(compiler_info['id'], compiler_name, language)]
+        variants = [(cid, name, route, args) for cid, name, route in compilers for args in arg_sets]
+        if len(variants) > MAX_COMPILE_VARIANTS:
+            await ctx.send(f"Too many variants ({len(variants)}); compare at most {MAX_COMPILE_VARIANTS} at once.")
+            return
+        if len(variants) > 1:
+            await self.compile_variants(ctx, language, source_code, variants, show_asm or show_diff, show_diff)
+            return
+
+        compiler_id, compiler_name, route, user_args = variants[0]
+        status_text = f"Compiling {compiler_name} code{' with arguments: ' + user_args if user_args else ''}..."
+        status = await ctx.send(status_text)
+
+        async def on_position(position):
+            await status.edit(content=f"{status_text} (queue position {position})")
 
         async with ctx.typing():
-            result, error = await self.compile_code(compiler_info['id'], source_code, user_args, show_asm)
+            try:
+                result, error = await self.compile_code(
+                    compiler_id, source_code, user_args, show_asm, language=route,
+                    user_id=ctx.author.id, message_id=ctx.message.id, on_position=on_position,
+                )
+            except CompileCancelled:
+                # The request message was deleted: its status message goes with it.
+                await self.delete_status(status)
+                return
 
             if error:
                 await ctx.send(f"Error: {error}")
@@ -278,12 +340,168 @@ class Compiler(commands.Cog):
             output = self.format_output(result, language, show_asm)
 
             # Send the output, handling Discord's message length limit
-            if len(output) > 2000:
-                chunks = [output[i:i+1994] for i in range(0, len(output), 1994)]
-                for i, chunk in enumerate(chunks):
-                    await ctx.send(f"{chunk}")
+            for chunk in split_message(output):
+                await ctx.send(chunk)
+
+    def compiler_name(self, compiler_id):
+        compiler = self.catalogue.compilers.get(compiler_id)
+        if compiler:
+            return compiler["name"]
+        for info in self.language_compilers.values():
+            if info["id"] == compiler_id:
+                return info["name"]
+        return compiler_id
+
+    def unknown_compiler_message(self, compiler_id, language):
+        # Rejecting here saves a round trip to godbolt that can only fail.
+        candidates = {c["id"]: c for c in self.catalogue.compilers_for(language, limit=len(self.catalogue.compilers))}
+        close = difflib.get_close_matches(compiler_id, list(candidates) or list(self.catalogue.compilers), n=3, cutoff=0.5)
+        message = f"Unknown compiler id `{compiler_id}`."
+        if close:
+            message += " Did you mean " + ", ".join(f"`{cid}`" for cid in close) + "?"
+        return message + " Use `/compilers` to list them."
+
+    async def compile_variants(self, ctx, language, source_code, variants, show_asm, show_diff):
+        """Run several (compiler, args) variants of one program concurrently and report them together."""
+        labels = [f"{name} {args}".strip() for _, name, _, args in variants]
+        status = await ctx.send(f"Compiling {len(variants)} variants: " + ", ".join(f"`{label}`" for label in labels) + "...")
+
+        async def run_variant(compiler_id, route, user_args):
+            started = time.perf_counter()
+            result, error = await self.compile_code(
+                compiler_id, source_code, user_args, show_asm, language=route,
+                user_id=ctx.author.id, message_id=ctx.message.id,
+            )
+            return result, error, time.perf_counter() - started
+
+        started = time.perf_counter()
+        async with ctx.typing():
+            try:
+                outcomes = await asyncio.gather(*(run_variant(cid, route, args) for cid, _, route, args in variants))
+            except CompileCancelled:
+                await self.delete_status(status)
+                return
+        wall_time = time.perf_counter() - started
+
+        output = self.format_variants(labels, outcomes, wall_time)
+        file = None
+        if show_diff:
+            diff = self.assembly_diffs(labels, [result for result, _, _ in outcomes])
+            if diff:
+                file = discord.File(io.BytesIO(diff.encode("utf-8")), filename="asm.diff")
+            else:
+                output += "\n*No assembly to diff (the variants returned none).*"
+        chunks = split_message(output)
+        for i, chunk in enumerate(chunks):
+            await ctx.send(chunk, file=file if i == len(chunks) - 1 else None)
+        await self.delete_status(status)
+
+    @staticmethod
+    async def delete_status(status):
+        try:
+            await status.delete()
+        except discord.HTTPException:
+            pass
+
+    @staticmethod
+    def assembly_text(result):
+        return "\n".join(section.get("text", "") for section in (result or {}).get("asm", []))
+
+    def format_variants(self, labels, outcomes, wall_time):
+        rows = []
+        details = []
+        all_ran = True
+        for i, (label, (result, error, elapsed)) in enumerate(zip(labels, outcomes), start=1):
+            exec_result = (result or {}).get("execResult", {})
+            build_result = (result or {}).get("buildResult", {})
+            if error or not result:
+                exit_text = "error"
+                details.append(error or "Failed to compile or run code.")
+            elif build_result.get("code") not in (None, 0):
+                exit_text = "build failed"
+                stderr = build_result.get("stderr", "")
+                if isinstance(stderr, list):  # godbolt sends [{"text": ...}, ...]
+                    stderr = "\n".join(line.get("text", "") for line in stderr)
+                details.append(f"build error:\n{str(stderr).strip()[:400]}")
             else:
-                await ctx.send(output)
+                exit_text = str(exec_result.get("code", "?"))
+                details.append((exec_result.get("stdout") or "").strip()[:400])
+            all_ran = all_ran and exit_text not in ("error", "build failed")
+            exec_time = f"{exec_result['execTime']} ms" if "execTime" in exec_result else f"{elapsed * 1000:.0f} ms*"
+            asm_lines = len((result or {}).get("asm", []))
+            rows.append((str(i), label, exit_text, exec_time, f"{asm_lines} lines" if asm_lines else "-"))
+
+        headers = ("#", "Variant", "Exit", "Exec", "Asm")
+        widths = [max(len(row[col]) for row in rows + [headers]) for col in range(len(headers))]
+        table = "\n".join("  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip() for row in [headers] + rows)
+
+        lines = [f"**Compared {len(labels)} variants in {wall_time:.2f}s**", f"```\n{table}```"]
+        if all_ran and len(set(details)) == 1:
+            lines.append(f"**Output (same for all):**\n```\n{details[0] or '(none)'}```")
+        else:
+            lines.append("**Output:**\n```\n" + "\n".join(f"[{i}] {text}" for i, text in enumerate(details, start=1)) + "```")
+        if any(row[3].endswith("*") for row in rows):
+            lines.append("-# * round-trip time; the backend didn't report an execution time")
+        return "\n".join(lines)
+
+    def assembly_diffs(self, labels, results):
+        """Unified diffs of every variant's assembly against the first one's."""
+        texts = [self.assembly_text(result) for result in results]
+        if sum(1 for text in texts if text) < 2:
+            return ""
+        base = texts[0].splitlines()
+        diffs = []
+        for label, text in zip(labels[1:], texts[1:]):
+            diffs.extend(difflib.unified_diff(base, text.splitlines(), fromfile=labels[0], tofile=label, lineterm=""))
+        return "\n".join(diffs) + "\n"
+
+    @app_commands.command(name="compilers", description="List Compiler Explorer compilers for a language.")
+    @app_commands.describe(language="Language, e.g. c++ or rust", search="Only compilers whose name or id contains this")
+    async def compilers(self, interaction: discord.Interaction, language: str, search: str = ""):
+        if not self.catalogue.loaded:
+            await interaction.response.send_message("The compiler list is still loading, try again in a moment.", ephemeral=True)
+            return
+        compilers = self.catalogue.compilers_for(language, search, COMPILERS_LIST_LIMIT + 1)
+        if not compilers:
+            await interaction.response.send_message(f"No compilers found for `{language}`{f' matching `{search}`' if search else ''}.", ephemeral=True)
+            return
+        default = self.catalogue.resolve(language)
+        lines = [f"`{c['id']}` - {c['name']}{' (default)' if default and c['id'] == default['id'] else ''}"
+                 for c in compilers[:COMPILERS_LIST_LIMIT]]
+        if len(compilers) > COMPILERS_LIST_LIMIT:
+            lines.append("... more; narrow it down with `search`.")
+        chunks = split_message(f"**Compilers for {language}** (use with `!compile -c=<id>`)\n" + "\n".join(lines))
+        await interaction.response.send_message(chunks[0])
+        for chunk in chunks[1:]:
+            await interaction.followup.send(chunk)
+
+    @compilers.autocomplete("language")
+    async def compilers_language_autocomplete(self, interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+        current = current.lower()
+        names = sorted(set(self.catalogue.language_ids()) | set(LANGUAGE_ALIASES))
+        return [app_commands.Choice(name=name, value=name) for name in names if name.startswith(current)][:COMPILERS_LIST_LIMIT]
+
+    @compilers.autocomplete("search")
+    async def compilers_search_autocomplete(self, interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+        language = getattr(interaction.namespace, "language", None) or ""
+        compilers = self.catalogue.compilers_for(language, current, COMPILERS_LIST_LIMIT)
+        return [app_commands.Choice(name=f"{c['name']} ({c['id']})"[:100], value=c["id"][:100]) for c in compilers]
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload):
+        if await self.scheduler.cancel_message(payload.message_id):
+            logging.info(f"Compile request {payload.message_id} withdrawn: message deleted")
+
+    @commands.command(aliases=['cstats'])
+    async def compile_stats(self, ctx):
+        cache = self.result_cache
+        await ctx.send(
+            "```Compile queue:\n"
+            f"Running: {self.scheduler.running_count()}/{self.scheduler.max_concurrent}, queued: {self.scheduler.queued_count()}\n"
+            f"Queue wait: {self.scheduler.queue_wait.summary()}\n"
+            f"Execution:  {self.scheduler.execution.summary()}\n"
+            f"Result cache: {len(cache)} entries, {cache.hits} hits, {cache.misses} misses, {cache.shared} shared```"
+        )
 
 async def setup(bot):
     logging.info("Setting up the compiler cog...")
@@ -0,0 +1,181 @@
+# bot/cogs/utility/compiler_catalogue.py
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from cogs.utility.storage_utils import write_atomic
+
+logger = logging.getLogger(__name__)
+
+CATALOGUE_VERSION = 1
+COMPILER_FIELDS = "id,name,lang,compilerType,semver,instructionSet,supportsExecute"
+# Names that mark a build as not a stable release.
+_UNSTABLE_RE = re.compile(r"trunk|\btip\b|nightly|snapshot|beta|alpha|\brc\d*\b|\bdev\b|assertions|experimental|\(.*branch.*\)", re.IGNORECASE)
+# A standalone version number, so the "86" in "x86-64" doesn't count.
+_VERSION_RE = re.compile(r"(?<![\w-])\d+(?:\.\d+)*")
+
+# What users type in ```lang fences -> Compiler Explorer language id.
+LANGUAGE_ALIASES = {
+    "py": "python",
+    "python": "python",
+    "java": "java",
+    "js": "javascript",
+    "javascript": "javascript",
+    "c": "c",
+    "cpp": "c++",
+    "c++": "c++",
+    "rust": "rust",
+    "asm": "assembly",
+    "cs": "csharp",
+    "c#": "csharp",
+    "go": "go",
+}
+
+
+def _version_key(compiler: Dict[str, Any]):
+    match = _VERSION_RE.search(compiler.get("semver") or "") or _VERSION_RE.search(compiler.get("name", ""))
+    return tuple(int(part) for part in match.group().split(".")) if match else ()
+
+
+def _family(name: str) -> str:
+    """'x86-64 gcc 14.2' -> 'x86-64 gcc': the compiler without its version."""
+    match = _VERSION_RE.search(name)
+    return name[:match.start()].strip() if match else name.strip()
+
+
+def _is_stable(compiler: Dict[str, Any]) -> bool:
+    return not _UNSTABLE_RE.search(f"{compiler.get('name', '')} {compiler.get('semver') or ''}")
+
+
+class CompilerCatalogue:
+    """Compilers and languages known to Compiler Explorer, cached on disk for `ttl_seconds`.
+
+    Loaded in the background at startup: a fresh disk cache is used as is, otherwise the API is
+    queried (falling back to a stale cache if that fails). With `fixture_path` set the API is never
+    touched and the fixture (same shape as the cache file) is used instead, for offline testing.
+    Until something is loaded, `resolve()` returns None and callers use their built-in defaults.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 86400, fixture_path: Optional[str] = None,
+                 api_url: str = "https://godbolt.org/api"):
+        self.path = os.path.abspath(path)
+        self.ttl_seconds = ttl_seconds
+        self.fixture_path = fixture_path
+        self.api_url = api_url
+        self.fetched_at = 0.0
+        self.languages: Dict[str, Dict[str, Any]] = {}
+        self.compilers: Dict[str, Dict[str, Any]] = {}
+        self._by_language: Dict[str, List[Dict[str, Any]]] = {}
+        self._defaults: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self.compilers)
+
+    def _apply(self, data: Dict[str, Any]):
+        self.languages = {lang["id"]: lang for lang in data.get("languages", [])}
+        self.compilers = {compiler["id"]: compiler for compiler in data.get("compilers", [])}
+        self.fetched_at = data.get("fetched_at", time.time())
+        by_language: Dict[str, List[Dict[str, Any]]] = {}
+        for compiler in self.compilers.values():
+            by_language.setdefault(compiler.get("lang"), []).append(compiler)
+        for compilers in by_language.values():
+            compilers.sort(key=lambda c: (_version_key(c), c["name"]), reverse=True)
+        self._by_language = by_language
+        self._defaults = {lang: self._pick_default(lang) for lang in by_language}
+
+    def _pick_default(self, lang: str) -> Optional[Dict[str, Any]]:
+        """Newest stable compiler of the same family as Compiler Explorer's own default, preferring
+        ones that can execute code (and x86-64 builds)."""
+        compilers = self._by_language.get(lang, [])
+        # Some languages only have trunk builds; those are better than nothing.
+        candidates = [c for c in compilers if _is_stable(c)] or compilers
+        if not candidates:
+            return None
+        site_default = self.compilers.get(self.languages.get(lang, {}).get("defaultCompiler", ""))
+        if site_default is not None:
+            family = _family(site_default["name"])
+            same_family = [c for c in candidates if _family(c["name"]) == family]
+            candidates = same_family or candidates
+        if any(c.get("supportsExecute") for c in candidates):
+            candidates = [c for c in candidates if c.get("supportsExecute")]
+        if any(c.get("instructionSet") == "amd64" for c in candidates):
+            candidates = [c for c in candidates if c.get("instructionSet") in ("amd64", None)]
+        return max(candidates, key=lambda c: (_version_key(c), c["name"]))
+
+    # --- Lookups ---
+
+    def resolve(self, alias: str) -> Optional[Dict[str, str]]:
+        """{"id", "name"} of the compiler to use for a fence language, or None if unknown/not loaded."""
+        compiler = self._defaults.get(LANGUAGE_ALIASES.get(alias, alias))
+        return {"id": compiler["id"], "name": compiler["name"]} if compiler else None
+
+    def language_ids(self) -> List[str]:
+        return sorted(self._by_language)
+
+    def compilers_for(self, language: str, search: str = "", limit: int = 25) -> List[Dict[str, Any]]:
+        """Compilers for a language (alias or id), newest first, filtered by a substring of name or id."""
+        search = search.lower()
+        compilers = self._by_language.get(LANGUAGE_ALIASES.get(language, language), [])
+        return [c for c in compilers if search in c["name"].lower() or search in c["id"].lower()][:limit]
+
+    # --- Loading ---
+
+    async def load(self, get_session: Callable):
+        """Load once at startup, then refresh whenever the cache goes stale. Meant to run as a task."""
+        if self.fixture_path:
+            try:
+                self._apply(await asyncio.to_thread(self._read, self.fixture_path))
+                logger.info(f"Compiler catalogue loaded from fixture {self.fixture_path}: {len(self.compilers)} compilers")
+            except (OSError, ValueError, KeyError) as e:
+                logger.error(f"Failed to load compiler catalogue fixture {self.fixture_path}: {e}")
+            return
+
+        try:
+            cached = await asyncio.to_thread(self._read, self.path)
+            if cached.get("version") == CATALOGUE_VERSION:
+                self._apply(cached)
+                logger.info(f"Compiler catalogue loaded from {self.path}: {len(self.compilers)} compilers")
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Discarding unreadable compiler catalogue {self.path}: {e}")
+
+        while True:
+            age = time.time() - self.fetched_at
+            if not self.loaded or age >= self.ttl_seconds:
+                await self.refresh(get_session())
+                age = time.time() - self.fetched_at
+            # Retry a failed first fetch sooner than a full TTL.
+            await asyncio.sleep(max(60, self.ttl_seconds - age) if self.loaded else 300)
+
+    async def refresh(self, session) -> bool:
+        headers = {"Accept": "application/json"}
+        try:
+            async with session.get(f"{self.api_url}/languages", headers=headers) as response:
+                response.raise_for_status()
+                languages = await response.json()
+            async with session.get(f"{self.api_url}/compilers", params={"fields": COMPILER_FIELDS}, headers=headers) as response:
+                response.raise_for_status()
+                compilers = await response.json()
+        except Exception as e:
+            logger.error(f"Failed to fetch the Compiler Explorer catalogue: {e}")
+            return False
+
+        data = {"version": CATALOGUE_VERSION, "fetched_at": time.time(), "languages": languages, "compilers": compilers}
+        self._apply(data)
+        try:
+            await asyncio.to_thread(write_atomic, self.path, json.dumps(data))
+        except OSError as e:
+            logger.error(f"Failed to save compiler catalogue: {e}")
+        logger.info(f"Compiler catalogue refreshed: {len(self.languages)} languages, {len(self.compilers)} compilers")
+        return True
+
+    @staticmethod
+    def _read(path: str) -> Dict[str, Any]:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
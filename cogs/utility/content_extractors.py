@@ -0,0 +1,264 @@
+# bot/cogs/utility/content_extractors.py
+import asyncio
+import concurrent.futures
+import io
+import json
+import logging
+import multiprocessing
+from typing import Awaitable, Callable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from bs4 import BeautifulSoup
+from markdownify import markdownify
+
+logger = logging.getLogger(__name__)
+
+MAX_HTML_BYTES = 5 * 1024 * 1024
+MAX_TEXT_BYTES = 1024 * 1024
+MAX_PDF_BYTES = 25 * 1024 * 1024
+PDF_MAX_PAGES = 150  # scanned PDFs have no text layer; don't walk all of a huge one for nothing
+PDF_EXTRACT_TIMEOUT_SECONDS = 45
+PDF_WORKER_PROCESSES = 2
+
+# Servers often label downloads generically; fall back to the URL's extension for these.
+GENERIC_CONTENT_TYPES = {"", "application/octet-stream", "binary/octet-stream", "application/download"}
+EXTENSION_CONTENT_TYPES = {
+    ".pdf": "application/pdf",
+    ".txt": "text/plain",
+    ".md": "text/markdown",
+    ".csv": "text/csv",
+    ".json": "application/json",
+    ".html": "text/html",
+    ".htm": "text/html",
+}
+
+
+class ContentExtractor:
+    """Turns a downloaded body of certain content types into plain text for the research context.
+
+    `content_types` entries are exact MIME types, a `type/*` wildcard or a `+suffix` structured
+    syntax suffix (e.g. `+json`). `extract(body, charset, max_length)` may stop early once it has
+    `max_length` characters. Bodies are read up to `max_bytes`; when `allow_truncated` is False a
+    larger body is rejected instead of being handed over cut short (a truncated PDF is unreadable).
+    """
+
+    def __init__(self, name: str, content_types: List[str],
+                 extract: Callable[[bytes, Optional[str], int], Awaitable[str]],
+                 max_bytes: int, allow_truncated: bool = True):
+        self.name = name
+        self.content_types = content_types
+        self.extract = extract
+        self.max_bytes = max_bytes
+        self.allow_truncated = allow_truncated
+
+    def handles_exactly(self, mime: str) -> bool:
+        return mime in self.content_types
+
+    def handles_pattern(self, mime: str) -> bool:
+        for pattern in self.content_types:
+            if pattern.endswith("/*") and mime.startswith(pattern[:-1]):
+                return True
+            if pattern.startswith("+") and mime.endswith(pattern):
+                return True
+        return False
+
+
+_extractors: List[ContentExtractor] = []
+
+
+def register_extractor(name: str, content_types: List[str], max_bytes: int, allow_truncated: bool = True):
+    """Decorator adding an async `(body, charset, max_length) -> str` function to the registry."""
+    def decorator(fn):
+        _extractors.append(ContentExtractor(name, content_types, fn, max_bytes, allow_truncated))
+        return fn
+    return decorator
+
+
+def find_extractor(mime: str) -> Optional[ContentExtractor]:
+    """Extractor for a MIME type; exact registrations win over wildcard/suffix ones."""
+    for extractor in _extractors:
+        if extractor.handles_exactly(mime):
+            return extractor
+    for extractor in _extractors:
+        if extractor.handles_pattern(mime):
+            return extractor
+    return None
+
+
+def parse_content_type(header: Optional[str], url: str = "") -> Tuple[str, Optional[str]]:
+    """(mime, charset) from a Content-Type header, guessing from the URL for generic binary types."""
+    parts = [part.strip() for part in (header or "").split(";")]
+    mime = parts[0].lower()
+    charset = None
+    for param in parts[1:]:
+        key, _, value = param.partition("=")
+        if key.strip().lower() == "charset" and value:
+            charset = value.strip().strip('"\'')
+    if mime in GENERIC_CONTENT_TYPES:
+        path = urlparse(url).path.lower()
+        for extension, guessed in EXTENSION_CONTENT_TYPES.items():
+            if path.endswith(extension):
+                return guessed, charset
+        mime = mime or "application/octet-stream"
+    return mime, charset
+
+
+async def read_body(response, max_bytes: int) -> Tuple[bytes, bool]:
+    """Read a streamed httpx response up to `max_bytes`. Returns (body, truncated)."""
+    chunks = []
+    size = 0
+    async for chunk in response.aiter_bytes():
+        chunks.append(chunk)
+        size += len(chunk)
+        if size > max_bytes:
+            return b"".join(chunks)[:max_bytes], True
+    return b"".join(chunks), False
+
+
+def clean_lines(text: str) -> str:
+    """Collapse the blank lines and runs of spaces extraction leaves behind."""
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return '\n'.join(chunk for chunk in chunks if chunk)
+
+
+def _decode(body: bytes, charset: Optional[str]) -> str:
+    try:
+        return body.decode(charset or "utf-8", errors="replace")
+    except LookupError:
+        return body.decode("utf-8", errors="replace")
+
+
+# --- HTML ---
+
+@register_extractor("html", ["text/html", "application/xhtml+xml", "text/xml", "application/xml", "+xml"], MAX_HTML_BYTES)
+async def extract_html(body: bytes, charset: Optional[str], max_length: int) -> str:
+    soup = BeautifulSoup(body, 'html.parser', from_encoding=charset)
+    for element in soup(["script", "style", "nav", "footer", "header", "aside", "form", "button", "iframe", "noscript", "img", "svg"]):
+        element.decompose()
+    main_content_tags = ['main', 'article', 'div[role="main"]', 'div.content', 'div#content']
+    main_content = None
+    for tag_selector in main_content_tags:
+        found_content = soup.select_one(tag_selector) if any(c in tag_selector for c in '[.#') else soup.find(tag_selector)
+        if found_content: main_content = found_content; break
+    if not main_content: main_content = soup.body if soup.body else soup
+
+    markdown_content = markdownify(str(main_content), heading_style="ATX", bullets='*').strip()
+    return clean_lines(markdown_content)
+
+
+# --- Plain text and JSON ---
+
+@register_extractor("text", ["text/*"], MAX_TEXT_BYTES)
+async def extract_plain_text(body: bytes, charset: Optional[str], max_length: int) -> str:
+    return clean_lines(_decode(body, charset)[:max_length * 2])
+
+
+@register_extractor("json", ["application/json", "+json"], MAX_TEXT_BYTES)
+async def extract_json(body: bytes, charset: Optional[str], max_length: int) -> str:
+    text = _decode(body, charset)
+    try:
+        # Re-indent compactly: minified JSON is one enormous line, fully pretty-printed wastes the cap on spaces.
+        return json.dumps(json.loads(text), indent=1, ensure_ascii=False)[:max_length * 2]
+    except ValueError:
+        # Truncated or not really JSON; the raw text is still better than nothing.
+        return clean_lines(text[:max_length * 2])
+
+
+# --- PDF ---
+
+_pdf_executor: Optional[concurrent.futures.ProcessPoolExecutor] = None
+
+
+def _get_pdf_executor() -> concurrent.futures.ProcessPoolExecutor:
+    global _pdf_executor
+    if _pdf_executor is None:
+        # spawn, not fork: the bot process has live threads (sqlite, executors) that fork would copy mid-flight.
+        _pdf_executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=PDF_WORKER_PROCESSES, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pdf_executor
+
+
+def _reset_pdf_executor():
+    """Drop the pool and kill its workers; the next PDF starts a fresh one.
+
+    Needed after a timeout: the abandoned job keeps its worker busy until it finishes, and a few
+    pathological PDFs would otherwise hold the whole pool. Other PDFs still in the pool fail too.
+    """
+    global _pdf_executor
+    executor, _pdf_executor = _pdf_executor, None
+    if executor is None:
+        return
+    if hasattr(executor, "terminate_workers"):  # Python 3.14+
+        executor.terminate_workers()
+        return
+    workers = list((executor._processes or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for worker in workers:
+        worker.terminate()
+
+
+def _pdf_to_text(body: bytes, max_length: int, max_pages: int) -> str:
+    """Runs in a worker process: extract page by page, stopping once `max_length` chars are collected."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(io.BytesIO(body))
+    if reader.is_encrypted:
+        reader.decrypt("")
+    parts = []
+    collected = 0
+    for page_num, page in enumerate(reader.pages, start=1):
+        if page_num > max_pages or collected >= max_length:
+            break
+        text = clean_lines(page.extract_text() or "")
+        if not text:
+            continue
+        parts.append(f"[Page {page_num}]\n{text}")
+        collected += len(text)
+    return "\n\n".join(parts)
+
+
+@register_extractor("pdf", ["application/pdf", "application/x-pdf"], MAX_PDF_BYTES, allow_truncated=False)
+async def extract_pdf(body: bytes, charset: Optional[str], max_length: int) -> str:
+    if not body.startswith(b"%PDF-"):
+        raise ValueError("not a PDF document")
+    loop = asyncio.get_running_loop()
+    try:
+        return await asyncio.wait_for(
+            loop.run_in_executor(_get_pdf_executor(), _pdf_to_text, body, max_length, PDF_MAX_PAGES),
+            timeout=PDF_EXTRACT_TIMEOUT_SECONDS,
+        )
+    except asyncio.TimeoutError:
+        logger.warning(f"PDF extraction took over {PDF_EXTRACT_TIMEOUT_SECONDS}s; restarting the PDF workers")
+        _reset_pdf_executor()
+        raise
+    except concurrent.futures.process.BrokenProcessPool:
+        # A worker died (crash, OOM kill); a broken pool fails every later job, so replace it.
+        _reset_pdf_executor()
+        raise
+    except ImportError:
+        logger.error("pypdf library not found. Please install it: pip install pypdf")
+        raise RuntimeError("PDF support is not installed")
+
+
+# --- Unlabelled downloads ---
+
+@register_extractor("binary", ["application/octet-stream"], MAX_PDF_BYTES, allow_truncated=False)
+async def extract_unlabelled(body: bytes, charset: Optional[str], max_length: int) -> str:
+    """Sniff a generically-labelled download: PDFs by magic number, otherwise it must be UTF-8 text."""
+    if body.startswith(b"%PDF-"):
+        return await extract_pdf(body, charset, max_length)
+    try:
+        text = body.decode(charset or "utf-8")
+    except (UnicodeDecodeError, LookupError):
+        raise ValueError("unrecognised binary content")
+    return clean_lines(text[:max_length * 2])
+
+
+def shutdown_extractors():
+    """Stop the PDF worker processes (they are started again on the next PDF)."""
+    global _pdf_executor
+    if _pdf_executor is not None:
+        _pdf_executor.shutdown(wait=False, cancel_futures=True)
+        _pdf_executor = None
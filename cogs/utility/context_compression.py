@@ -0,0 +1,207 @@
+# bot/cogs/utility/context_compression.py
+import math
+import re
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from cogs.utility.research_corpus import query_terms
+
+# Structural lines written by the scraper / breadth merge; always kept verbatim.
+_STRUCTURE_RE = re.compile(r"^(--- SOURCE: .* ---|URL: \S*|CONTENT:|=== SUB-QUESTION \d+: .* ===|-{20,})$")
+_LINK_RE = re.compile(r"!?\[([^\]]*)\]\([^)]*\)")
+_IMAGE_RE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+_BARE_URL_RE = re.compile(r"<?https?://\S+>?")
+_LIST_MARKER_RE = re.compile(r"^\s*(?:[*+\-]|\d+[.)])\s+")
+_LINK_SEPARATORS_RE = re.compile(r"[\s|,·•*\-–—:;/>]+")
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(\[])")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+BOILERPLATE_MIN_PAGES = 3  # a short line on this many pages is site chrome, dropped everywhere
+BOILERPLATE_MAX_CHARS = 100
+MAX_LINK_TEXTS_PER_LINE = 8
+NEAR_DUPLICATE_THRESHOLD = 0.8  # Jaccard similarity of word 3-grams
+MIN_DEDUP_WORDS = 6  # shorter sentences ("Read more.") are left to the other passes
+MIN_PRUNE_CHARS = 6000  # below this there is little to gain from dropping whole sentences
+
+
+def _normalize(line: str) -> str:
+    return " ".join(_WORD_RE.findall(line.lower()))
+
+
+def _shingles(words: List[str]) -> set:
+    if len(words) < 3:
+        return {tuple(words)}
+    return {tuple(words[i:i + 3]) for i in range(len(words) - 2)}
+
+
+def _is_link_only(line: str) -> bool:
+    if not (_LINK_RE.search(line) or _BARE_URL_RE.search(line)):
+        return False
+    rest = _BARE_URL_RE.sub("", _LINK_RE.sub("", _LIST_MARKER_RE.sub("", line)))
+    return not _LINK_SEPARATORS_RE.sub("", rest)
+
+
+class _Line:
+    __slots__ = ("text", "page", "structural", "sentences")
+
+    def __init__(self, text: str, page: int, structural: bool):
+        self.text = text
+        self.page = page
+        self.structural = structural
+        self.sentences: List[Optional[str]] = []
+
+
+def compress_context(context: str, query: str = "", target_ratio: float = 0.6) -> Tuple[str, Dict[str, Any]]:
+    """Shrink scraped research context before it is sent to an LLM.
+
+    In order: drop boilerplate lines repeated across pages, collapse link-only lines (and unwrap
+    inline links), drop near-duplicate sentences, then, if the result is still above
+    `target_ratio` of the original (and longer than MIN_PRUNE_CHARS), drop the lowest-information
+    sentences until it fits.
+    Source and sub-question markers are kept. Returns the text and a stats dict.
+    """
+    stats = {
+        "original_chars": len(context),
+        "boilerplate_lines": 0,
+        "link_lines": 0,
+        "duplicate_sentences": 0,
+        "low_information_sentences": 0,
+    }
+
+    # Split into lines tagged with the page (source block) they belong to.
+    lines: List[_Line] = []
+    page = 0
+    in_code_block = False
+    for raw in context.splitlines():
+        text = raw.strip()
+        if text.startswith("--- SOURCE:"):
+            page += 1
+        if text.startswith("```"):
+            in_code_block = not in_code_block
+        structural = bool(_STRUCTURE_RE.match(text)) or in_code_block or text.startswith("```")
+        lines.append(_Line(raw if in_code_block else text, page, structural))
+
+    # 1. Boilerplate: lines repeated across pages.
+    pages_per_line = defaultdict(set)
+    for line in lines:
+        if not line.structural and line.text:
+            pages_per_line[_normalize(line.text)].add(line.page)
+    seen_repeated = set()
+    for line in lines:
+        if line.structural or not line.text:
+            continue
+        key = _normalize(line.text)
+        pages = pages_per_line[key]
+        if not key or len(pages) < 2:
+            continue
+        if (len(pages) >= BOILERPLATE_MIN_PAGES and len(line.text) <= BOILERPLATE_MAX_CHARS) or key in seen_repeated:
+            line.text = ""
+            stats["boilerplate_lines"] += 1
+        else:
+            seen_repeated.add(key)
+
+    # 2. Links: runs of link-only lines become one line of link texts; inline links keep their text.
+    link_run: List[str] = []
+    run_start: Optional[_Line] = None
+    for line in lines + [_Line("", -1, True)]:
+        if not line.structural and line.text and _is_link_only(line.text):
+            link_run.extend(t.strip() for t in _LINK_RE.findall(_IMAGE_RE.sub("", line.text)) if t.strip())
+            stats["link_lines"] += 1
+            if run_start is None:
+                run_start = line
+            line.text = ""
+            continue
+        if run_start is not None:
+            if link_run:
+                extra = len(link_run) - MAX_LINK_TEXTS_PER_LINE
+                run_start.text = "Links: " + " · ".join(link_run[:MAX_LINK_TEXTS_PER_LINE]) + (f" (+{extra} more)" if extra > 0 else "")
+            link_run, run_start = [], None
+        if not line.structural and line.text:
+            line.text = _LINK_RE.sub(lambda m: m.group(1), _IMAGE_RE.sub("", line.text)).strip()
+
+    # 3. Near-duplicate sentences, found through a 3-gram inverted index.
+    sentence_refs: List[Tuple[_Line, int]] = []
+    kept_shingles: List[set] = []
+    shingle_index = defaultdict(list)
+    for line in lines:
+        if line.structural or not line.text:
+            continue
+        line.sentences = _SENTENCE_SPLIT_RE.split(line.text)
+        for idx, sentence in enumerate(line.sentences):
+            words = _WORD_RE.findall(sentence.lower())
+            if len(words) >= MIN_DEDUP_WORDS:
+                shingles = _shingles(words)
+                candidates = {cand for s in shingles for cand in shingle_index.get(s, ())}
+                if any(len(shingles & kept_shingles[c]) / len(shingles | kept_shingles[c]) >= NEAR_DUPLICATE_THRESHOLD for c in candidates):
+                    line.sentences[idx] = None
+                    stats["duplicate_sentences"] += 1
+                    continue
+                for s in shingles:
+                    shingle_index[s].append(len(kept_shingles))
+                kept_shingles.append(shingles)
+            sentence_refs.append((line, idx))
+
+    # 4. Drop the lowest-information sentences until the target ratio is met.
+    def current_length() -> int:
+        return sum(len(line.text) + 1 if line.structural else sum(len(s) + 1 for s in line.sentences if s) for line in lines)
+
+    target_chars = max(int(len(context) * target_ratio), MIN_PRUNE_CHARS)
+    excess = current_length() - target_chars
+    if excess > 0 and sentence_refs:
+        focus_terms = set(query_terms(query))
+        sentence_terms = [set(query_terms(ref[0].sentences[ref[1]])) for ref in sentence_refs]
+        doc_freq = defaultdict(int)
+        for terms in sentence_terms:
+            for term in terms:
+                doc_freq[term] += 1
+        total = len(sentence_refs)
+
+        def score(i: int) -> float:
+            line, idx = sentence_refs[i]
+            terms = sentence_terms[i]
+            # Headings structure the report; keep them.
+            if line.text.startswith("#"):
+                return math.inf
+            information = sum(math.log(1 + total / doc_freq[t]) for t in terms)
+            information += 3.0 * len(terms & focus_terms)
+            if any(ch.isdigit() for ch in line.sentences[idx]):
+                information += 1.0  # figures and dates are what reports are made of
+            return information / math.sqrt(1 + len(line.sentences[idx]) / 40)
+
+        for i in sorted(range(total), key=score):
+            if excess <= 0:
+                break
+            line, idx = sentence_refs[i]
+            if line.text.startswith("#"):
+                continue
+            excess -= len(line.sentences[idx]) + 1
+            line.sentences[idx] = None
+            stats["low_information_sentences"] += 1
+
+    # Reassemble, dropping source blocks left with no content at all. Sub-question headers start
+    # a block of their own, so they are kept even when the source before them is dropped.
+    blocks: List[List[str]] = [[]]
+    has_content = [False]
+    for line in lines:
+        if line.structural and line.text.startswith(("--- SOURCE:", "=== SUB-QUESTION")):
+            blocks.append([])
+            has_content.append(False)
+        if line.structural:
+            blocks[-1].append(line.text)
+        else:
+            text = " ".join(s for s in line.sentences if s) if line.sentences else line.text
+            if text:
+                blocks[-1].append(text)
+                has_content[-1] = True
+    output = []
+    for block, content in zip(blocks, has_content):
+        if content or not block or not block[0].startswith("--- SOURCE:"):
+            for text in block:
+                if text.startswith(("--- SOURCE:", "=== SUB-QUESTION")) and output:
+                    output.append("")
+                output.append(text)
+    compressed = "\n".join(output)
+
+    stats["compressed_chars"] = len(compressed)
+    stats["ratio"] = len(compressed) / len(context) if context else 1.0
+    return compressed, stats
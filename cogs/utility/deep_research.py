@@ -3,7 +3,9 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 import asyncio
+import io
 import os
+import re
 import logging
 from dotenv import load_dotenv
 from groq import AsyncGroq, RateLimitError, APIError
@@ -11,13 +13,19 @@ import random
 import concurrent.futures
 import httpx
 import time
+import yaml
 from typing import List, Dict, Any, Optional, Tuple
 from urllib.parse import unquote
+from email.utils import parsedate_to_datetime
+
+from cogs.utility.message_utils import split_message, DISCORD_MESSAGE_LIMIT
+from cogs.utility.research_jobs import ResearchJob, ResearchJobManager, ResearchProgress, JOB_QUEUED
+from cogs.utility.research_corpus import ResearchCorpus
+from cogs.utility.context_compression import compress_context
+from cogs.utility.content_extractors import find_extractor, parse_content_type, read_body, shutdown_extractors
 
 # We'll reuse/adapt the search/scrape logic inspired by deep_researcher.py
-# Make sure these dependencies are installed: beautifulsoup4, httpx, markdownify
-from bs4 import BeautifulSoup
-from markdownify import markdownify
+# Make sure these dependencies are installed: beautifulsoup4, httpx, markdownify, pypdf (PDF sources)
 # Setup Logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -28,7 +36,21 @@ load_dotenv()
 # --- Groq Configuration ---
 PRIMARY_GROQ_MODEL = "meta-llama/llama-4-scout-17b-16e-instruct"
 FALLBACK_GROQ_MODELS = ["llama-3.3-70b-versatile", "llama-3.1-8b-instant", "gemma2-9b-it"]
-GROQ_RATE_LIMIT_COOLDOWN_SECONDS = 65
+GROQ_RATE_LIMIT_COOLDOWN_SECONDS = 65  # used when a 429 carries no retry-after header
+GROQ_MAX_COOLDOWN_WAITS = 2  # how many times a call may sleep for a model to come off cooldown
+
+# --- Per-Stage Model Routing ---
+# Cheap stages (query generation, gap analysis) run on fast instant models so they
+# don't eat the synthesis model's rate-limit budget. Each list is that stage's
+# fallback chain, tried in order. Override under `deep_research.stage_models` in config.yml.
+STAGE_QUERY_GENERATION = "query_generation"
+STAGE_GAP_ANALYSIS = "gap_analysis"
+STAGE_SYNTHESIS = "synthesis"
+DEFAULT_STAGE_MODELS = {
+    STAGE_QUERY_GENERATION: ["llama-3.1-8b-instant", "gemma2-9b-it", "llama-3.3-70b-versatile"],
+    STAGE_GAP_ANALYSIS: ["llama-3.1-8b-instant", "llama-3.3-70b-versatile", "gemma2-9b-it"],
+    STAGE_SYNTHESIS: [PRIMARY_GROQ_MODEL] + [m for m in FALLBACK_GROQ_MODELS if m != PRIMARY_GROQ_MODEL],
+}
 
 # --- Search/Scrape Configuration ---
 MAX_SEARCH_RESULTS_OVERALL_CAP = 15
@@ -43,6 +65,52 @@ MAX_FOLLOWUP_GENERATED_QUERIES = 2
 MAX_RESULTS_PER_FOLLOWUP_QUERY = 2
 MAX_PAGES_TO_SCRAPE_PER_FOLLOWUP_ROUND = 2
 
+# --- Breadth Mode Configuration ---
+# Breadth mode splits the topic into sub-questions and researches them as concurrent branches
+# that draw from one shared budget.
+MODE_DEPTH = "depth"
+MODE_BREADTH = "breadth"
+BREADTH_MAX_SUB_QUESTIONS = 4
+BREADTH_MAX_TOTAL_PAGES = 14
+BREADTH_MAX_TOKENS = 60000
+BREADTH_MAX_SECONDS = 240
+BRANCH_LOOP_LIMITS = {
+    "max_loops": 2,
+    "initial_queries": 2,
+    "initial_results": 3,
+    "initial_pages": 3,
+    "followup_queries": 1,
+    "followup_results": 2,
+    "followup_pages": 1,
+}
+
+# --- Research Job Configuration ---
+DEFAULT_MAX_CONCURRENT_JOBS = 2
+DEFAULT_MAX_QUEUED_JOBS = 20
+DEFAULT_JOB_STATE_DIR = "research_jobs"
+DEFAULT_PROGRESS_INTERVAL_SECONDS = 3  # at most one status edit per interval per job
+
+# --- Report Delivery Configuration ---
+# Reports longer than this (chars, footer included) go out as an embed summary + .md attachment.
+DEFAULT_REPORT_ATTACHMENT_THRESHOLD = 4000
+MAX_EMBED_SUMMARY_LENGTH = 1500
+MAX_EMBED_SOURCES = 10
+# --- Research Corpus Configuration ---
+# Every extracted page is kept in a local full-text index; queries it can already answer skip the web.
+DEFAULT_CORPUS_PATH = "research_corpus.db"
+DEFAULT_CORPUS_MAX_AGE_DAYS = 14  # older pages are re-fetched instead of served from the corpus
+CORPUS_MIN_HITS_PER_QUERY = 2  # fresh matching documents needed to treat a query as covered locally
+
+# --- Context Compression Configuration ---
+# Scraped context is compressed locally before every LLM call; sentences are pruned down to this
+# fraction of the original once boilerplate, link lists and duplicates are gone.
+DEFAULT_COMPRESSION_TARGET_RATIO = 0.6
+
+# Stages of one research loop, recorded in checkpoints so a resumed job picks up mid-loop.
+LOOP_STAGE_QUERIES = "queries"
+LOOP_STAGE_SEARCH = "search"
+LOOP_STAGE_SCRAPE = "scrape"
+
 # --- Utility Functions ---
 
 def get_useragent():
@@ -53,17 +121,31 @@ def get_useragent():
     ]
     return random.choice(agents)
 
-async def _think_and_log(message: str, delay: float = 0.2):
+def load_stage_models(config: Optional[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """Merge the `deep_research.stage_models` table from config over the defaults."""
+    stage_models = {stage: list(models) for stage, models in DEFAULT_STAGE_MODELS.items()}
+    configured = ((config or {}).get("deep_research") or {}).get("stage_models") or {}
+    for stage, models in configured.items():
+        if stage not in stage_models:
+            logger.warning(f"Ignoring unknown DeepResearch stage '{stage}' in config.")
+            continue
+        if isinstance(models, str):
+            models = [models]
+        models = [m for m in models if m]
+        if models:
+            # Keep order, drop duplicates.
+            stage_models[stage] = list(dict.fromkeys(models))
+    return stage_models
+
+def _think_and_log(message: str):
     logger.info(f"[THOUGHT] {message}")
-    if delay > 0:
-        await asyncio.sleep(delay)
 
 async def tavily_search(query: str, max_results: int = 5) -> List[Dict[str, str]]:
     tavily_api_key = os.environ.get("TAVILY_API_KEY")
     if not tavily_api_key:
         logger.warning("TAVILY_API_KEY not found. Tavily search unavailable.")
         return []
-    await _think_and_log(f"Searching Tavily for: '{query}' (max {max_results} results).")
+    _think_and_log(f"Searching Tavily for: '{query}' (max {max_results} results).")
     try:
         from tavily import TavilyClient
         client = TavilyClient(tavily_api_key)
@@ -118,65 +200,100 @@ async def _perform_searches_for_query_list(
     return unique_results
 
 
+def _format_source(title: str, url: str, body: str) -> str:
+    return f"\n\n--- SOURCE: {title} ---\nURL: {url}\n\nCONTENT:\n{body}\n\n" + "-" * 60 + "\n"
+
+def _source_body(content_result: str) -> str:
+    """The page text inside a block produced by `_format_source`."""
+    body = content_result.split("CONTENT:\n", 1)[-1]
+    return body.rsplit("\n\n" + "-" * 60, 1)[0]
+
 async def scrape_page_content(url: str, title: str, max_length: int = MAX_SCRAPE_CONTENT_LENGTH) -> Optional[str]:
-    await _think_and_log(f"Scraping: {title} ({url})", delay=0.1)
+    _think_and_log(f"Scraping: {title} ({url})")
     try:
         async with httpx.AsyncClient(follow_redirects=True, timeout=15.0) as client:
             headers = {'User-Agent': get_useragent()}
-            response = await client.get(url, headers=headers)
-            response.raise_for_status()
-
-            if 'text/html' not in response.headers.get('Content-Type', '').lower():
-                logger.warning(f"Skipping non-HTML content ({response.headers.get('Content-Type')}) for {url}")
-                return f"\n\n--- SOURCE: {title} ---\nURL: {url}\n\nCONTENT:\n[Non-HTML content type]\n\n" + "-" * 60 + "\n"
-
-            html_content = response.text
-            soup = BeautifulSoup(html_content, 'html.parser')
-            for element in soup(["script", "style", "nav", "footer", "header", "aside", "form", "button", "iframe", "noscript", "img", "svg"]):
-                element.decompose()
-            main_content_tags = ['main', 'article', 'div[role="main"]', 'div.content', 'div#content']
-            main_content = None
-            for tag_selector in main_content_tags:
-                found_content = soup.select_one(tag_selector) if any(c in tag_selector for c in '[.#') else soup.find(tag_selector)
-                if found_content: main_content = found_content; break
-            if not main_content: main_content = soup.body if soup.body else soup
-
-            markdown_content = markdownify(str(main_content), heading_style="ATX", bullets='*').strip()
-            lines = (line.strip() for line in markdown_content.splitlines())
-            chunks_inner = (phrase.strip() for line in lines for phrase in line.split("  "))
-            cleaned_content = '\n'.join(chunk for chunk in chunks_inner if chunk)
+            async with client.stream("GET", url, headers=headers) as response:
+                response.raise_for_status()
+
+                # Pick the extractor from the headers, so unusable content is never downloaded.
+                mime, charset = parse_content_type(response.headers.get('Content-Type'), url)
+                extractor = find_extractor(mime)
+                if extractor is None:
+                    logger.warning(f"Skipping unsupported content ({mime}) for {url}")
+                    return _format_source(title, url, f"[Unsupported content type: {mime}]")
+                content_length = response.headers.get('Content-Length', '')
+                if not extractor.allow_truncated and content_length.isdigit() and int(content_length) > extractor.max_bytes:
+                    return _format_source(title, url, f"[Failed: {extractor.name} too large ({int(content_length) // 1024} KB)]")
+
+                body, truncated = await read_body(response, extractor.max_bytes)
+                if truncated and not extractor.allow_truncated:
+                    return _format_source(title, url, f"[Failed: {extractor.name} too large]")
+
+            cleaned_content = await extractor.extract(body, charset, max_length)
 
             if not cleaned_content:
                 logger.warning(f"Extracted empty content for {url}")
-                return f"\n\n--- SOURCE: {title} ---\nURL: {url}\n\nCONTENT:\n[Failed to extract meaningful content]\n\n" + "-" * 60 + "\n"
+                return _format_source(title, url, "[Failed to extract meaningful content]")
 
             truncated_msg = "... [Truncated]"
             if len(cleaned_content) > max_length:
                 cleaned_content = cleaned_content[:max_length - len(truncated_msg)] + truncated_msg
 
-            logger.info(f"Scraped {url} (Length: {len(cleaned_content)})")
-            return f"\n\n--- SOURCE: {title} ---\nURL: {url}\n\nCONTENT:\n{cleaned_content}\n\n" + "-" * 60 + "\n"
+            logger.info(f"Scraped {url} as {extractor.name} (Length: {len(cleaned_content)})")
+            return _format_source(title, url, cleaned_content)
     except httpx.TimeoutException:
-        return f"\n\n--- SOURCE: {title} ---\nURL: {url}\n\nCONTENT:\n[Failed: Request Timeout]\n\n" + "-" * 60 + "\n"
+        return _format_source(title, url, "[Failed: Request Timeout]")
     except httpx.HTTPStatusError as e:
-        return f"\n\n--- SOURCE: {title} ---\nURL: {url}\n\nCONTENT:\n[Failed: HTTP {e.response.status_code}]\n\n" + "-" * 60 + "\n"
+        return _format_source(title, url, f"[Failed: HTTP {e.response.status_code}]")
     except Exception as e:
         logger.error(f"Error processing {url}: {e}", exc_info=True)
-        return f"\n\n--- SOURCE: {title} ---\nURL: {url}\n\nCONTENT:\n[Failed: {str(e)[:50]}]\n\n" + "-" * 60 + "\n"
+        return _format_source(title, url, f"[Failed: {str(e)[:50]}]")
+
+def _is_failed_scrape(content_result: Optional[str]) -> bool:
+    return (
+        not content_result or
+        "[Failed to" in content_result or
+        "[Unsupported content type" in content_result or
+        "[Failed:" in content_result or
+        "[empty content]" in content_result or
+        "[meaningful content]" in content_result or
+        len(content_result.split("CONTENT:\n", 1)[-1].strip()) < 50
+    )
 
 async def scrape_multiple_pages(
     search_results: List[Dict[str, str]],
     num_to_scrape: int,
-    research_log: List[str]
+    research_log: List[str],
+    progress: Optional[ResearchProgress] = None,
+    corpus: Optional[ResearchCorpus] = None
 ) -> Tuple[str, int, List[str]]:
     if not search_results: return "No search results to scrape.", 0, []
 
     to_scrape = search_results[:num_to_scrape]
-    await _think_and_log(f"Selected top {len(to_scrape)} of {len(search_results)} results for scraping.")
+    _think_and_log(f"Selected top {len(to_scrape)} of {len(search_results)} results for scraping.")
     research_log.append(f"Attempting to scrape {len(to_scrape)} pages.")
+    if progress:
+        progress.plan_pages(len(to_scrape))
+
+    # Pages already in the corpus and still fresh aren't fetched again.
+    stored_pages = await corpus.get_fresh([result['href'] for result in to_scrape]) if corpus else {}
+    if stored_pages:
+        research_log.append(f"Reusing {len(stored_pages)} fresh pages from the research corpus.")
+
+    async def scrape_and_count(result: Dict[str, str]) -> Optional[str]:
+        stored = stored_pages.get(result['href'])
+        if stored:
+            content_result = _format_source(result['title'], result['href'], stored['content'])
+        else:
+            content_result = await scrape_page_content(result['href'], result['title'])
+            if corpus and not _is_failed_scrape(content_result):
+                await corpus.add_page(result['href'], result['title'], _source_body(content_result))
+        if progress:
+            progress.page_done(not _is_failed_scrape(content_result))
+        return content_result
 
-    tasks = [scrape_page_content(result['href'], result['title']) for result in to_scrape]
-    scraped_contents_list = await asyncio.gather(*tasks)
+    scraped_contents_list = await asyncio.gather(*(scrape_and_count(result) for result in to_scrape))
 
     compiled_content = ""
     successful_scrapes_count = 0
@@ -185,17 +302,7 @@ async def scrape_multiple_pages(
     for i, content_result in enumerate(scraped_contents_list):
         page_title = to_scrape[i]['title']
         page_url = to_scrape[i]['href']
-        is_failure = (
-            not content_result or
-            "[Failed to" in content_result or
-            "[Non-HTML" in content_result or
-            "[Failed:" in content_result or
-            "[empty content]" in content_result or
-            "[meaningful content]" in content_result or
-            len(content_result.split("CONTENT:\n", 1)[-1].strip()) < 50
-        )
-
-        if not is_failure:
+        if not _is_failed_scrape(content_result):
             compiled_content += content_result
             successful_scrapes_count += 1
             successfully_scraped_page_urls.append(page_url)
@@ -204,25 +311,115 @@ async def scrape_multiple_pages(
             research_log.append(f"    - Failed or empty scrape: {page_title[:50]}... ({page_url})")
 
     msg = f"Successfully scraped content from {successful_scrapes_count}/{len(to_scrape)} pages."
-    await _think_and_log(msg)
+    _think_and_log(msg)
     research_log.append(msg)
 
     final_content = compiled_content if successful_scrapes_count > 0 else "Could not retrieve useful content from selected pages."
     return final_content, successful_scrapes_count, successfully_scraped_page_urls
 
+class GroqModelCooldowns:
+    """Cooldown-until timestamps per Groq model, shared by every research job in the process.
+
+    Groq rate limits are per model, so a 429 on one model says nothing about the next one.
+    """
+    def __init__(self, default_cooldown: float = GROQ_RATE_LIMIT_COOLDOWN_SECONDS):
+        self.default_cooldown = default_cooldown
+        self._cooldown_until: Dict[str, float] = {}
+
+    def mark_rate_limited(self, model: str, retry_after: Optional[float] = None) -> float:
+        cooldown = retry_after if retry_after is not None and retry_after >= 0 else self.default_cooldown
+        until = time.monotonic() + cooldown
+        # Concurrent jobs may report the same 429; keep the later deadline.
+        self._cooldown_until[model] = max(until, self._cooldown_until.get(model, 0.0))
+        return cooldown
+
+    def remaining(self, model: str) -> float:
+        until = self._cooldown_until.get(model)
+        if until is None:
+            return 0.0
+        left = until - time.monotonic()
+        if left <= 0:
+            del self._cooldown_until[model]
+            return 0.0
+        return left
+
+    def is_available(self, model: str) -> bool:
+        return self.remaining(model) == 0.0
+
+
+groq_model_cooldowns = GroqModelCooldowns()
+
+
+def _parse_retry_after(error: RateLimitError) -> Optional[float]:
+    """Seconds to wait according to the 429 response headers, if Groq sent any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000.0
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
 async def _call_groq_llm_with_fallback(
     groq_client: AsyncGroq,
     messages: List[Dict[str, str]],
+    models_to_try: List[str],
     current_model_idx: int,
     max_tokens: int = 1024,
-    temperature: float = 0.7
+    temperature: float = 0.7,
+    cooldowns: Optional[GroqModelCooldowns] = None,
+    progress: Optional[ResearchProgress] = None
 ) -> Tuple[Optional[str], int]:
-    models_to_try = [PRIMARY_GROQ_MODEL] + [m for m in FALLBACK_GROQ_MODELS if m != PRIMARY_GROQ_MODEL]
+    """Call the first model in the chain that isn't cooling down, starting at `current_model_idx`.
+
+    A rate-limited model is put on cooldown and the next one is tried right away. We only sleep
+    when every remaining model is cooling down, and then only until the soonest one frees up.
+    Returns the response (or an "Error: ..." string) and the index of the model used, which
+    callers keep as their own cursor for the next call.
+    """
+    cooldowns = cooldowns or groq_model_cooldowns
+    num_models = len(models_to_try)
+    failed_models = set()
+    cooldown_waits = 0
+
+    while True:
+        candidate_idxs = [
+            (current_model_idx + i) % num_models for i in range(num_models)
+            if models_to_try[(current_model_idx + i) % num_models] not in failed_models
+        ]
+        if not candidate_idxs:
+            return "Error: Could not complete LLM call with any model.", current_model_idx
+
+        model_idx_to_use = next((idx for idx in candidate_idxs if cooldowns.is_available(models_to_try[idx])), None)
+        if model_idx_to_use is None:
+            if cooldown_waits >= GROQ_MAX_COOLDOWN_WAITS:
+                return "Error: Groq API rate limit hit on all models.", candidate_idxs[0]
+            model_idx_to_use = min(candidate_idxs, key=lambda idx: cooldowns.remaining(models_to_try[idx]))
+            wait = cooldowns.remaining(models_to_try[model_idx_to_use])
+            if wait > GROQ_RATE_LIMIT_COOLDOWN_SECONDS:
+                return "Error: Groq API rate limit hit on all models.", model_idx_to_use
+            cooldown_waits += 1
+            _think_and_log(f"All models cooling down; waiting {wait:.1f}s for {models_to_try[model_idx_to_use]}.")
+            await asyncio.sleep(wait)
 
-    for i in range(len(models_to_try)):
-        model_idx_to_use = (current_model_idx + i) % len(models_to_try)
         model_to_use = models_to_try[model_idx_to_use]
-        await _think_and_log(f"Attempting LLM call with Groq model: {model_to_use}", delay=0.1)
+        _think_and_log(f"Attempting LLM call with Groq model: {model_to_use}")
         try:
             start_llm_time = time.time()
             chat_completion = await groq_client.chat.completions.create(
@@ -232,36 +429,36 @@ async def _call_groq_llm_with_fallback(
                 max_tokens=max_tokens,
             )
             response_text = chat_completion.choices[0].message.content
+            if progress and getattr(chat_completion, "usage", None):
+                progress.add_tokens(chat_completion.usage.total_tokens or 0)
             llm_time = time.time() - start_llm_time
             logger.info(f"Groq call completed in {llm_time:.2f}s using {model_to_use}.")
             return response_text, model_idx_to_use
-        except RateLimitError:
-            logger.warning(f"Rate limit hit for Groq model {model_to_use}.")
-            if i < len(models_to_try) - 1:
-                await _think_and_log(f"Cooldown {GROQ_RATE_LIMIT_COOLDOWN_SECONDS}s then trying next model.")
-                await asyncio.sleep(GROQ_RATE_LIMIT_COOLDOWN_SECONDS)
-            else:
-                return "Error: Groq API rate limit hit on all models.", model_idx_to_use
+        except RateLimitError as e:
+            cooldown = cooldowns.mark_rate_limited(model_to_use, _parse_retry_after(e))
+            logger.warning(f"Rate limit hit for Groq model {model_to_use}; cooling down for {cooldown:.1f}s.")
         except APIError as e:
             logger.error(f"Groq API error with model {model_to_use}: {e}")
-            if i >= len(models_to_try) - 1:
+            failed_models.add(model_to_use)
+            if len(failed_models) >= num_models:
                 return f"Error: Groq API error: {e}", model_idx_to_use
         except Exception as e:
             logger.error(f"Unexpected error during Groq call with {model_to_use}: {e}", exc_info=True)
             return f"Error: Unexpected issue during LLM call: {e}", model_idx_to_use
-    return "Error: Could not complete LLM call with any model.", current_model_idx
 
 
 async def _generate_llm_search_queries(
     groq_client: AsyncGroq,
+    models: List[str],
     current_model_idx: int,
     original_query: str,
     research_log: List[str],
     context: Optional[str] = None,
-    max_queries_to_generate: int = 3
+    max_queries_to_generate: int = 3,
+    progress: Optional[ResearchProgress] = None
 ) -> Tuple[List[str], int]:
     purpose = "analyze context and suggest follow-up search queries" if context else "analyze the original query and suggest initial search queries"
-    await _think_and_log(f"Using LLM to {purpose} for '{original_query}'.")
+    _think_and_log(f"Using LLM to {purpose} for '{original_query}'.")
 
     system_prompt = f"""You are a research assistant. Your task is to {purpose}.
 User's original query: "{original_query}"
@@ -284,7 +481,7 @@ a third specific search query
     messages = [{"role": "system", "content": system_prompt}]
 
     llm_response, model_idx_used = await _call_groq_llm_with_fallback(
-        groq_client, messages, current_model_idx, max_tokens=200, temperature=0.6
+        groq_client, messages, models, current_model_idx, max_tokens=200, temperature=0.6, progress=progress
     )
 
     if not llm_response or llm_response.startswith("Error:"):
@@ -300,14 +497,50 @@ a third specific search query
     return queries, model_idx_used
 
 
+async def _generate_sub_questions(
+    groq_client: AsyncGroq,
+    models: List[str],
+    current_model_idx: int,
+    original_query: str,
+    research_log: List[str],
+    max_sub_questions: int = 4,
+    progress: Optional[ResearchProgress] = None
+) -> Tuple[List[str], int]:
+    _think_and_log(f"Using LLM to break '{original_query}' into sub-questions.")
+    system_prompt = f"""You are a research planner. Break the user's research topic into independent sub-questions that can be researched separately and together cover the topic.
+User's topic: "{original_query}"
+
+Instructions:
+- Provide between 2 and {max_sub_questions} sub-questions. Use fewer for narrow topics.
+- For comparisons ("compare X, Y and Z"), give each item its own sub-question and add one for the direct comparison if useful.
+- Each sub-question must be self-contained (name the subject explicitly) and specific enough to search for.
+- One sub-question per line, and nothing else. Do NOT number them or use bullet points.
+"""
+    messages = [{"role": "system", "content": system_prompt}]
+    llm_response, model_idx_used = await _call_groq_llm_with_fallback(
+        groq_client, messages, models, current_model_idx, max_tokens=300, temperature=0.4, progress=progress
+    )
+    if not llm_response or llm_response.startswith("Error:"):
+        research_log.append(f"LLM sub-question generation failed: {llm_response}")
+        return [], model_idx_used
+
+    sub_questions = [q.strip().lstrip("-*0123456789.) ").strip() for q in llm_response.split('\n') if q.strip()]
+    sub_questions = list(dict.fromkeys(q for q in sub_questions if q))[:max_sub_questions]
+    research_log.append(f"LLM split the topic into {len(sub_questions)} sub-questions: {sub_questions}")
+    return sub_questions, model_idx_used
+
+
 async def synthesize_with_groq(
     context: str,
     original_query: str,
     groq_client: AsyncGroq,
+    models: List[str],
     current_model_idx: int,
-    research_log: List[str]
+    research_log: List[str],
+    progress: Optional[ResearchProgress] = None,
+    sub_questions: Optional[List[str]] = None
 ) -> Tuple[Optional[str], int]:
-    await _think_and_log(f"Synthesizing report for '{original_query}' with Groq.")
+    _think_and_log(f"Synthesizing report for '{original_query}' with Groq.")
     system_prompt = f"""You are an expert research assistant. Synthesize the provided context into a comprehensive, well-structured, objective report on: "{original_query}".
 
 Context: Provided by web searches. Each source is marked with '--- SOURCE: ... URL: ... CONTENT: ... ---'.
@@ -321,6 +554,9 @@ Instructions:
 - Format with Markdown (headings, lists, bold).
 - **Output ONLY the report itself.** No preamble like "Here is the report:". Start with the title.
 """
+    if sub_questions and len(sub_questions) > 1:
+        system_prompt += "\nThe context was gathered per sub-question (sections marked '=== SUB-QUESTION n: ... ==='). Give each sub-question its own section, then tie them together (e.g. compare them) before the conclusion:\n"
+        system_prompt += "\n".join(f"{i + 1}. {q}" for i, q in enumerate(sub_questions)) + "\n"
     user_message_content = f"Generate the research report based *only* on this context:\n\n```context\n{context}\n```"
     messages = [
         {"role": "system", "content": system_prompt},
@@ -328,14 +564,66 @@ Instructions:
     ]
 
     report, model_idx_used = await _call_groq_llm_with_fallback(
-        groq_client, messages, current_model_idx, max_tokens=4000, temperature=0.4
+        groq_client, messages, models, current_model_idx, max_tokens=4000, temperature=0.4, progress=progress
     )
     if report and not report.startswith("Error:"):
-        research_log.append(f"Synthesis successful using model {PRIMARY_GROQ_MODEL if model_idx_used == 0 else FALLBACK_GROQ_MODELS[model_idx_used-1]}.")
+        research_log.append(f"Synthesis successful using model {models[model_idx_used]}.")
     else:
         research_log.append(f"Synthesis failed: {report}")
     return report, model_idx_used
 
+class ResearchBudget:
+    """Pages, tokens and wall-clock time shared by all branches of a breadth-mode job."""
+    def __init__(self, max_pages: int, max_tokens: int, max_seconds: float, progress: ResearchProgress):
+        self.pages_left = max(0, max_pages)
+        self.max_tokens = max_tokens
+        self.deadline = time.monotonic() + max_seconds
+        self.progress = progress
+        self.tokens_at_start = progress.tokens_used
+
+    def remaining_seconds(self) -> float:
+        return self.deadline - time.monotonic()
+
+    def exhausted(self) -> bool:
+        return (
+            self.pages_left <= 0 or
+            self.remaining_seconds() <= 0 or
+            self.progress.tokens_used - self.tokens_at_start >= self.max_tokens
+        )
+
+    def reserve_pages(self, wanted: int) -> int:
+        granted = min(wanted, self.pages_left)
+        self.pages_left -= granted
+        return granted
+
+
+def _extract_report_summary(report: str, topic: str) -> Tuple[str, str]:
+    """Title (first markdown heading) and first prose paragraph of a synthesized report."""
+    title = f"Research Report: {topic}"
+    summary = ""
+    for block in re.split(r"\n\s*\n", report):
+        block = block.strip()
+        if not block:
+            continue
+        if block.startswith("#"):
+            heading_lines = [line for line in block.splitlines() if line.startswith("#")]
+            if title == f"Research Report: {topic}" and heading_lines and heading_lines[0].startswith("# "):
+                title = heading_lines[0].lstrip("# ").strip() or title
+            rest = "\n".join(line for line in block.splitlines() if not line.startswith("#")).strip()
+            if not rest:
+                continue
+            block = rest
+        summary = block
+        break
+    if len(summary) > MAX_EMBED_SUMMARY_LENGTH:
+        cut = summary.rfind(" ", 0, MAX_EMBED_SUMMARY_LENGTH)
+        summary = summary[:cut if cut > 0 else MAX_EMBED_SUMMARY_LENGTH] + "…"
+    return title, summary or "No summary available; see the attached report."
+
+def _slugify(text: str, max_length: int = 40) -> str:
+    slug = re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+    return slug[:max_length].rstrip("-") or "report"
+
 # --- DeepResearch Cog ---
 
 class DeepResearch(commands.Cog):
@@ -347,202 +635,714 @@ class DeepResearch(commands.Cog):
             self.groq_client = None
         else:
             self.groq_client = AsyncGroq(api_key=self.groq_api_key)
-        self.current_groq_model_idx = 0
-
-    @app_commands.command(name="deepresearch", description="Performs iterative deep research on a topic.")
-    @app_commands.describe(
-        topic="The topic to research",
-        max_initial_results_to_consider="Max initial search results to process (optional, affects initial scrape pool)"
-    )
-    @app_commands.choices(max_initial_results_to_consider=[
-        app_commands.Choice(name="3 Results", value=3),
-        app_commands.Choice(name="5 Results (Default)", value=5),
-        app_commands.Choice(name="7 Results", value=7),
-        app_commands.Choice(name="10 Results", value=10),
-    ])
-    async def deep_research(self, interaction: discord.Interaction, topic: str, max_initial_results_to_consider: Optional[app_commands.Choice[int]] = None):
-        # Determine ephemeral state from the initial defer. This command is designed to be non-ephemeral.
-        # However, if a user somehow invoked it ephemerally (e.g. via a wrapper command), we'd respect that.
-        # For this specific command, we will make it always non-ephemeral.
-        is_ephemeral_response = False # For deepresearch, we want public reports.
-        await interaction.response.defer(thinking=True, ephemeral=is_ephemeral_response)
-
-        research_log = [f"Deep Research initiated by {interaction.user} for topic: '{topic}'."]
-        start_time = time.time()
-
-        if not self.groq_client:
-            await interaction.followup.send("❌ Configuration Error: Groq API key is missing. Cannot perform research.", ephemeral=True) # Config errors can be ephemeral
+        try:
+            with open('config/config.yml', 'r') as file:
+                config = yaml.safe_load(file)
+        except (OSError, yaml.YAMLError) as e:
+            logger.warning(f"Could not read config/config.yml, using default DeepResearch settings: {e}")
+            config = {}
+        self.stage_models = load_stage_models(config)
+        research_config = (config or {}).get("deep_research") or {}
+        self.progress_interval = research_config.get("progress_interval_seconds", DEFAULT_PROGRESS_INTERVAL_SECONDS)
+        self.report_attachment_threshold = research_config.get("report_attachment_threshold", DEFAULT_REPORT_ATTACHMENT_THRESHOLD)
+        self.compression_target_ratio = research_config.get("compression_target_ratio", DEFAULT_COMPRESSION_TARGET_RATIO)
+        self.job_manager = ResearchJobManager(
+            self._run_research_job,
+            state_dir=research_config.get("job_state_dir", DEFAULT_JOB_STATE_DIR),
+            max_workers=research_config.get("max_concurrent_jobs", DEFAULT_MAX_CONCURRENT_JOBS),
+            max_queued=research_config.get("max_queued_jobs", DEFAULT_MAX_QUEUED_JOBS),
+            on_position_change=self._report_queue_position,
+        )
+        self.corpus = ResearchCorpus(
+            research_config.get("corpus_path", DEFAULT_CORPUS_PATH),
+            max_age_seconds=research_config.get("corpus_max_age_days", DEFAULT_CORPUS_MAX_AGE_DAYS) * 86400,
+        )
+        self._resume_task = None
+
+    async def cog_load(self):
+        self.job_manager.start()
+        self._resume_task = asyncio.create_task(self._resume_interrupted_jobs())
+
+    async def cog_unload(self):
+        if self._resume_task:
+            self._resume_task.cancel()
+        await self.job_manager.stop()
+        await self.corpus.close()
+        shutdown_extractors()
+
+    async def _resume_interrupted_jobs(self):
+        await self.bot.wait_until_ready()
+        for job in self.job_manager.load_checkpoints():
+            if await self.job_manager.submit(job) is None:
+                logger.warning(f"Research queue full; dropping interrupted job {job.job_id} ('{job.topic}').")
+                self.job_manager.discard(job)
+                await self._send_to_channel(job, f"<@{job.user_id}> ⚠️ Your research on '{job.topic}' was interrupted by a restart and the queue is too full to resume it. Please start it again.")
+                continue
+            logger.info(f"Resuming research job {job.job_id} ('{job.topic}') from checkpoint.")
+            await self._send_to_channel(job, f"<@{job.user_id}> 🔁 Resuming research on '{job.topic}' after a restart (job `{job.job_id}`).")
+
+    # --- Delivery ---
+
+    def _interaction_alive(self, job: ResearchJob) -> bool:
+        # Interaction tokens expire after 15 minutes; after that only the channel is reachable.
+        return job.interaction is not None and not job.interaction.is_expired()
+
+    async def _get_channel(self, job: ResearchJob):
+        if job.channel_id is None:
+            return None
+        channel = self.bot.get_channel(job.channel_id)
+        if channel is None:
+            try:
+                channel = await self.bot.fetch_channel(job.channel_id)
+            except discord.HTTPException as e:
+                logger.error(f"Could not fetch channel {job.channel_id} for research job {job.job_id}: {e}")
+                return None
+        return channel
+
+    async def _send_to_channel(self, job: ResearchJob, content: str) -> bool:
+        channel = await self._get_channel(job)
+        if channel is None:
+            return False
+        try:
+            await channel.send(content)
+            return True
+        except discord.HTTPException as e:
+            logger.error(f"Failed to send research job {job.job_id} message to channel {job.channel_id}: {e}")
+            return False
+
+    async def _update_status(self, job: ResearchJob, content: str):
+        """Edit the job's status message. Status updates are dropped once the interaction is gone."""
+        if not self._interaction_alive(job):
             return
+        try:
+            await job.interaction.edit_original_response(content=content)
+        except discord.HTTPException as e:
+            logger.warning(f"Could not update status for research job {job.job_id}: {e}")
+            job.interaction = None
+
+    async def _deliver(self, job: ResearchJob, chunks: List[str], embed: Optional[discord.Embed] = None,
+                       attachment: Optional[Tuple[str, bytes]] = None):
+        """Send final output through the interaction while its token is valid, else post it to the channel.
+
+        The embed and attachment (filename, bytes) ride along with the first chunk, so a report in
+        attachment mode costs a single request.
+        """
+        if job.progress:
+            # Final output replaces the status message; make sure no pending progress edit lands after it.
+            await job.progress.stop()
+
+        def first_message_kwargs() -> Dict[str, Any]:
+            kwargs = {}
+            if embed is not None:
+                kwargs["embed"] = embed
+            if attachment is not None:
+                # Build a fresh File per attempt; a File can't be re-read after a failed send.
+                kwargs["file"] = discord.File(io.BytesIO(attachment[1]), filename=attachment[0])
+            return kwargs
+
+        sent = 0
+        if self._interaction_alive(job):
+            try:
+                edit_kwargs = first_message_kwargs()
+                if "file" in edit_kwargs:
+                    edit_kwargs["attachments"] = [edit_kwargs.pop("file")]
+                await job.interaction.edit_original_response(content=chunks[0], **edit_kwargs)
+                sent = 1
+                for chunk_content in chunks[1:]:
+                    await job.interaction.followup.send(chunk_content)
+                    sent += 1
+                return
+            except discord.HTTPException as e:
+                logger.warning(f"Interaction delivery failed for research job {job.job_id}, falling back to channel: {e}")
+                job.interaction = None
 
-        num_initial_results_cap = max_initial_results_to_consider.value if max_initial_results_to_consider else 5
-        research_log.append(f"User specified max {num_initial_results_cap} initial results to consider for scraping.")
-
-        compiled_scraped_context = ""
-        total_pages_scraped = 0
-        successfully_scraped_urls = set()
-
+        channel = await self._get_channel(job)
+        if channel is None:
+            return
+        remaining = chunks[sent:]
+        if sent == 0:
+            # The mention takes room from the first chunk: re-split that one to fit.
+            mention = f"<@{job.user_id}> "
+            remaining = split_message(chunks[0], DISCORD_MESSAGE_LIMIT - len(mention)) + chunks[1:]
+            remaining[0] = mention + remaining[0]
+        try:
+            if sent == 0:
+                await channel.send(remaining.pop(0), **first_message_kwargs())
+            for chunk_content in remaining:
+                await channel.send(chunk_content)
+        except discord.HTTPException as e:
+            logger.error(f"Failed to deliver research job {job.job_id} to channel {job.channel_id}: {e}")
+
+    async def _report_queue_position(self, job: ResearchJob, position: int):
+        await self._update_status(job, f"⏳ Research on '{job.topic}' is queued (position {position}). Job ID: `{job.job_id}`")
+
+    # --- Research ---
+
+    async def _checkpoint(self, job: ResearchJob, start_time: float):
+        job.state["elapsed"] = time.time() - start_time
+        if job.progress:
+            job.state["tokens_used"] = job.progress.tokens_used
+        await self.job_manager.checkpoint(job)
+
+    def _new_loop_state(self, question: str) -> Dict[str, Any]:
+        """Progress of one refine loop (the whole job in depth mode, one branch in breadth mode)."""
+        return {
+            "question": question,
+            "loop_num": 0,
+            "loop_stage": LOOP_STAGE_QUERIES,
+            "loops_executed": 0,
+            "research_done": False,
+            "search_queries": [],
+            "search_results": [],
+            "compiled_context": "",
+            "scraped_urls": [],
+            "total_pages_scraped": 0,
+            "local_pages": 0,
+        }
+
+    def _new_job_state(self, job: ResearchJob) -> Dict[str, Any]:
+        requested_by = job.options.get("requested_by", job.user_id)
+        state = self._new_loop_state(job.topic)
+        state.update({
+            "sub_questions": None,
+            "branches": [],
+            "stage_model_idx": {stage: 0 for stage in self.stage_models},
+            "report": None,
+            "elapsed": 0.0,
+            "tokens_used": 0,
+            "research_log": [
+                f"Deep Research initiated by {requested_by} for topic: '{job.topic}' ({job.options.get('mode', MODE_DEPTH)} mode).",
+                f"User specified max {job.options.get('max_initial_results', 5)} initial results to consider for scraping.",
+            ],
+        })
+        return state
+
+    def _depth_loop_limits(self, job: ResearchJob) -> Dict[str, int]:
+        num_initial_results_cap = job.options.get("max_initial_results", 5)
+        return {
+            "max_loops": MAX_RESEARCH_LOOPS,
+            "initial_queries": MAX_INITIAL_GENERATED_QUERIES,
+            "initial_results": MAX_RESULTS_PER_INITIAL_QUERY,
+            "initial_pages": min(num_initial_results_cap, MAX_PAGES_TO_SCRAPE_INITIAL),
+            "followup_queries": MAX_FOLLOWUP_GENERATED_QUERIES,
+            "followup_results": MAX_RESULTS_PER_FOLLOWUP_QUERY,
+            "followup_pages": MAX_PAGES_TO_SCRAPE_PER_FOLLOWUP_ROUND,
+        }
+
+    async def _run_research_job(self, job: ResearchJob):
         try:
-            final_loop_num = 0
-            for loop_num in range(MAX_RESEARCH_LOOPS):
-                final_loop_num = loop_num
-                current_loop_log_header = f"\n--- Research Loop {loop_num + 1}/{MAX_RESEARCH_LOOPS} ---"
-                research_log.append(current_loop_log_header)
-                await interaction.edit_original_response(content=f"🧠 Researching '{topic}'... (Loop {loop_num + 1}/{MAX_RESEARCH_LOOPS})")
+            await self._research(job)
+            logger.info(f"Successfully completed deep research job {job.job_id} for '{job.topic}'")
+        except asyncio.CancelledError:
+            if job.progress:
+                await job.progress.stop()
+            if job.cancel_requested:
+                await self._update_status(job, f"🛑 Research on '{job.topic}' was cancelled.")
+            raise
+        except Exception as e:
+            logger.exception(f"Unexpected error during deep research for '{job.topic}': {e}")
+            research_log = job.state.setdefault("research_log", [])
+            research_log.append(f"FATAL ERROR: {type(e).__name__} - {str(e)}")
+            err_report = f"❌ An critical error occurred: {str(e)}\n\n**Research Log Snippet:**\n"
+            err_report += "\n".join([f"  - {s.strip()}" for s in research_log[-5:]])
+            if len(err_report) > 1950: err_report = err_report[:1950] + "..."
+            try:
+                await self._deliver(job, [err_report])
+            except Exception as followup_e:
+                logger.error(f"Failed to send fatal error to Discord: {followup_e}")
+        finally:
+            if job.progress:
+                await job.progress.stop()
+
+    async def _run_research_loops(
+        self,
+        job: ResearchJob,
+        loop_state: Dict[str, Any],
+        limits: Dict[str, int],
+        start_time: float,
+        budget: Optional["ResearchBudget"] = None,
+        log_prefix: str = ""
+    ) -> bool:
+        """Search/scrape/refine loop over `loop_state`, checkpointing the job after every stage.
+
+        Used for the whole job in depth mode and for each sub-question branch in breadth mode
+        (where phase messages are left to the caller and pages are drawn from a shared budget).
+        Returns False if the very first search found nothing at all.
+        """
+        research_log = job.state["research_log"]
+        stage_model_idx = job.state["stage_model_idx"]
+        progress = job.progress
+        question = loop_state["question"]
+        show_phase = budget is None
+        max_loops = limits["max_loops"]
+
+        while not loop_state["research_done"] and loop_state["loop_num"] < max_loops:
+            if budget and budget.exhausted():
+                research_log.append(f"{log_prefix}Research budget exhausted. Ending refinement.")
+                loop_state["research_done"] = True
+                break
+
+            loop_num = loop_state["loop_num"]
+            if loop_num == 0:
+                max_results_this_round = limits["initial_results"]
+                max_pages_to_scrape_this_round = limits["initial_pages"]
+            else:
+                max_results_this_round = limits["followup_results"]
+                max_pages_to_scrape_this_round = limits["followup_pages"]
+
+            if loop_state["loop_stage"] == LOOP_STAGE_QUERIES:
+                research_log.append(f"\n--- {log_prefix}Research Loop {loop_num + 1}/{max_loops} ---")
 
                 if loop_num == 0:
-                    await interaction.edit_original_response(content=f"💡 Generating initial search angles for '{topic}'...")
-                    search_queries, self.current_groq_model_idx = await _generate_llm_search_queries(
-                        self.groq_client, self.current_groq_model_idx, topic, research_log,
-                        max_queries_to_generate=MAX_INITIAL_GENERATED_QUERIES
+                    if show_phase:
+                        progress.update(f"💡 Generating initial search angles for '{question}'...", pages_done=0, pages_planned=0)
+                    search_queries, stage_model_idx[STAGE_QUERY_GENERATION] = await _generate_llm_search_queries(
+                        self.groq_client, self.stage_models[STAGE_QUERY_GENERATION],
+                        stage_model_idx[STAGE_QUERY_GENERATION], question, research_log,
+                        max_queries_to_generate=limits["initial_queries"], progress=progress
                     )
-                    if not search_queries: search_queries = [topic]
-                    max_results_this_round = MAX_RESULTS_PER_INITIAL_QUERY
-                    max_pages_to_scrape_this_round = min(num_initial_results_cap, MAX_PAGES_TO_SCRAPE_INITIAL)
+                    if not search_queries: search_queries = [question]
                 else:
-                    if not compiled_scraped_context:
-                        research_log.append("No context from previous loops, cannot generate follow-up queries. Ending refinement.")
+                    if not loop_state["compiled_context"]:
+                        research_log.append(f"{log_prefix}No context from previous loops, cannot generate follow-up queries. Ending refinement.")
+                        loop_state["research_done"] = True
                         break
-                    await interaction.edit_original_response(content=f"🤔 Analyzing context to find gaps for '{topic}'...")
-                    search_queries, self.current_groq_model_idx = await _generate_llm_search_queries(
-                        self.groq_client, self.current_groq_model_idx, topic, research_log,
-                        context=compiled_scraped_context, max_queries_to_generate=MAX_FOLLOWUP_GENERATED_QUERIES
+                    if show_phase:
+                        progress.update(f"🤔 Analyzing context to find gaps for '{question}'... (Loop {loop_num + 1}/{max_loops})", pages_done=0, pages_planned=0)
+                    compressed_context, _ = await asyncio.to_thread(
+                        compress_context, loop_state["compiled_context"], question, self.compression_target_ratio
+                    )
+                    search_queries, stage_model_idx[STAGE_GAP_ANALYSIS] = await _generate_llm_search_queries(
+                        self.groq_client, self.stage_models[STAGE_GAP_ANALYSIS],
+                        stage_model_idx[STAGE_GAP_ANALYSIS], question, research_log,
+                        context=compressed_context, max_queries_to_generate=limits["followup_queries"],
+                        progress=progress
                     )
                     if not search_queries:
-                        research_log.append("LLM found no new research angles. Ending refinement.")
+                        research_log.append(f"{log_prefix}LLM found no new research angles. Ending refinement.")
+                        loop_state["research_done"] = True
                         break
-                    max_results_this_round = MAX_RESULTS_PER_FOLLOWUP_QUERY
-                    max_pages_to_scrape_this_round = MAX_PAGES_TO_SCRAPE_PER_FOLLOWUP_ROUND
 
-                await interaction.edit_original_response(content=f"🔍 Searching with {len(search_queries)} queries (Loop {loop_num+1})...")
+                loop_state["search_queries"] = search_queries
+                loop_state["loops_executed"] = loop_num + 1
+                loop_state["loop_stage"] = LOOP_STAGE_SEARCH
+                await self._checkpoint(job, start_time)
+
+            if loop_state["loop_stage"] == LOOP_STAGE_SEARCH:
+                web_queries, local_added = await self._retrieve_from_corpus(
+                    loop_state, loop_state["search_queries"], max_pages_to_scrape_this_round, research_log,
+                    budget=budget, log_prefix=log_prefix
+                )
+                max_pages_to_scrape_this_round -= local_added
+                if not web_queries or max_pages_to_scrape_this_round <= 0:
+                    research_log.append(f"{log_prefix}Research corpus covered this loop; skipping web search.")
+                    self._advance_loop(loop_state)
+                    await self._checkpoint(job, start_time)
+                    continue
+
+                if show_phase:
+                    progress.update(f"🔍 Searching with {len(web_queries)} queries (Loop {loop_num + 1}/{max_loops})...")
                 combined_search_results = await _perform_searches_for_query_list(
-                    search_queries, max_results_this_round, research_log
+                    web_queries, max_results_this_round, research_log
                 )
 
                 if not combined_search_results:
-                    research_log.append("No search results found in this loop. Cannot continue this loop.")
-                    if loop_num == 0 and not compiled_scraped_context:
-                         await interaction.edit_original_response(content=f"⚠️ Could not find any search results for '{topic}'. Aborting.")
-                         return
+                    research_log.append(f"{log_prefix}No search results found in this loop. Cannot continue this loop.")
+                    if loop_num == 0 and not loop_state["compiled_context"]:
+                        loop_state["research_done"] = True
+                        await self._checkpoint(job, start_time)
+                        return False
+                    self._advance_loop(loop_state)
+                    await self._checkpoint(job, start_time)
                     continue
 
-                results_to_consider_for_scraping = combined_search_results[:max_pages_to_scrape_this_round]
-
-                research_log.append(f"Considering {len(results_to_consider_for_scraping)} unique results for scraping (capped at {max_pages_to_scrape_this_round}).")
+                if budget:
+                    max_pages_to_scrape_this_round = budget.reserve_pages(max_pages_to_scrape_this_round)
+                loop_state["search_results"] = combined_search_results[:max_pages_to_scrape_this_round]
+                research_log.append(f"{log_prefix}Considering {len(loop_state['search_results'])} unique results for scraping (capped at {max_pages_to_scrape_this_round}).")
+                loop_state["loop_stage"] = LOOP_STAGE_SCRAPE
+                await self._checkpoint(job, start_time)
 
+            if loop_state["loop_stage"] == LOOP_STAGE_SCRAPE:
+                results_to_consider_for_scraping = loop_state["search_results"]
                 if not results_to_consider_for_scraping:
-                    research_log.append("No suitable search results to scrape in this loop.")
+                    research_log.append(f"{log_prefix}No suitable search results to scrape in this loop.")
+                else:
+                    if show_phase:
+                        progress.update(f"📄 Scraping up to {max_pages_to_scrape_this_round} pages (Loop {loop_num + 1}/{max_loops})...", pages_done=0, pages_planned=0)
+                    newly_scraped_content, num_successfully_scraped, new_successful_urls = await scrape_multiple_pages(
+                        results_to_consider_for_scraping, len(results_to_consider_for_scraping), research_log,
+                        progress=progress, corpus=self.corpus
+                    )
+                    loop_state["total_pages_scraped"] += num_successfully_scraped
+                    loop_state["scraped_urls"] = list(dict.fromkeys(loop_state["scraped_urls"] + new_successful_urls))
+
+                    if newly_scraped_content and not newly_scraped_content.startswith("Could not retrieve"):
+                        loop_state["compiled_context"] += newly_scraped_content
+                        research_log.append(f"{log_prefix}Added {len(newly_scraped_content)} chars from {num_successfully_scraped} pages this loop.")
+                    else:
+                        research_log.append(f"{log_prefix}No new content successfully scraped in this loop.")
+
+                self._advance_loop(loop_state)
+                await self._checkpoint(job, start_time)
+
+        return True
+
+    async def _retrieve_from_corpus(
+        self,
+        loop_state: Dict[str, Any],
+        queries: List[str],
+        max_pages: int,
+        research_log: List[str],
+        budget: Optional["ResearchBudget"] = None,
+        log_prefix: str = ""
+    ) -> Tuple[List[str], int]:
+        """Answer what we can of `queries` from the research corpus before going to the web.
+
+        A query counts as covered when enough fresh stored documents contain all of its terms; the
+        best of those are added to the loop's context. Returns the queries that still need a web
+        search and the number of pages added.
+        """
+        uncovered_queries = []
+        pages_added = 0
+        for query in queries:
+            hits = await self.corpus.search(query, limit=CORPUS_MIN_HITS_PER_QUERY + max(0, max_pages))
+            if len(hits) < CORPUS_MIN_HITS_PER_QUERY:
+                uncovered_queries.append(query)
+                continue
+            for doc in hits:
+                if pages_added >= max_pages:
+                    break
+                if doc["url"] in loop_state["scraped_urls"]:
                     continue
+                if budget and not budget.reserve_pages(1):
+                    break
+                loop_state["compiled_context"] += _format_source(doc["title"], doc["url"], doc["content"])
+                loop_state["scraped_urls"].append(doc["url"])
+                pages_added += 1
+            research_log.append(f"{log_prefix}Query '{query}' answered from the research corpus ({len(hits)} matching documents).")
+
+        if pages_added:
+            loop_state["local_pages"] = loop_state.get("local_pages", 0) + pages_added
+            research_log.append(f"{log_prefix}Added {pages_added} pages from the research corpus.")
+        return uncovered_queries, pages_added
+
+    async def _research_breadth(self, job: ResearchJob, start_time: float):
+        """Split the topic into sub-questions and research each one as a concurrent branch.
+
+        Branches share one budget of pages, tokens and wall-clock time; branches still running when
+        the time runs out are cancelled and whatever they had gathered so far is kept.
+        """
+        state = job.state
+        research_log = state["research_log"]
+        stage_model_idx = state["stage_model_idx"]
+        progress = job.progress
+
+        if state["sub_questions"] is None:
+            progress.update(f"🌳 Breaking '{job.topic}' into sub-questions...", pages_done=0, pages_planned=0)
+            sub_questions, stage_model_idx[STAGE_QUERY_GENERATION] = await _generate_sub_questions(
+                self.groq_client, self.stage_models[STAGE_QUERY_GENERATION],
+                stage_model_idx[STAGE_QUERY_GENERATION], job.topic, research_log,
+                max_sub_questions=BREADTH_MAX_SUB_QUESTIONS, progress=progress
+            )
+            state["sub_questions"] = sub_questions or [job.topic]
+            state["branches"] = [self._new_loop_state(q) for q in state["sub_questions"]]
+            await self._checkpoint(job, start_time)
+
+        branches = state["branches"]
+        budget = ResearchBudget(
+            max_pages=BREADTH_MAX_TOTAL_PAGES - sum(len(b["scraped_urls"]) for b in branches),
+            max_tokens=BREADTH_MAX_TOKENS,
+            max_seconds=BREADTH_MAX_SECONDS - (time.time() - start_time),
+            progress=progress,
+        )
+        num_branches = len(branches)
+        branches_done = [sum(1 for b in branches if b["research_done"] or b["loop_num"] >= BRANCH_LOOP_LIMITS["max_loops"])]
+        phase = lambda: f"🌳 Researching {num_branches} sub-questions in parallel ({branches_done[0]}/{num_branches} done)..."
 
-                await interaction.edit_original_response(content=f"📄 Scraping up to {max_pages_to_scrape_this_round} pages (Loop {loop_num+1})...")
-                newly_scraped_content, num_successfully_scraped, new_successful_urls = await scrape_multiple_pages(
-                    results_to_consider_for_scraping, max_pages_to_scrape_this_round, research_log
+        async def run_branch(idx: int, branch: Dict[str, Any]):
+            try:
+                await self._run_research_loops(
+                    job, branch, BRANCH_LOOP_LIMITS, start_time, budget=budget, log_prefix=f"[Q{idx + 1}] "
                 )
-                total_pages_scraped += num_successfully_scraped
-                successfully_scraped_urls.update(new_successful_urls)
-
-                if newly_scraped_content and not newly_scraped_content.startswith("Could not retrieve"):
-                    compiled_scraped_context += newly_scraped_content
-                    research_log.append(f"Added {len(newly_scraped_content)} chars from {num_successfully_scraped} pages this loop.")
-                else:
-                    research_log.append("No new content successfully scraped in this loop.")
+            finally:
+                branches_done[0] += 1
+                progress.update(phase())
+
+        progress.update(phase(), pages_done=0, pages_planned=0)
+        tasks = [
+            asyncio.create_task(run_branch(idx, branch))
+            for idx, branch in enumerate(branches)
+            if not branch["research_done"] and branch["loop_num"] < BRANCH_LOOP_LIMITS["max_loops"]
+        ]
+        if tasks:
+            try:
+                done, pending = await asyncio.wait(tasks, timeout=max(0.0, budget.remaining_seconds()))
+            except asyncio.CancelledError:
+                for task in tasks:
+                    task.cancel()
+                raise
+            for task in pending:
+                task.cancel()
+            if pending:
+                research_log.append(f"Time budget reached; stopped {len(pending)} unfinished branches.")
+                await asyncio.gather(*pending, return_exceptions=True)
+            for task in done:
+                if task.exception():
+                    logger.error(f"Research branch failed for '{job.topic}': {task.exception()}", exc_info=task.exception())
+                    research_log.append(f"A research branch failed: {type(task.exception()).__name__} - {task.exception()}")
+
+        merged_context = ""
+        for idx, branch in enumerate(branches):
+            if branch["compiled_context"]:
+                merged_context += f"\n\n=== SUB-QUESTION {idx + 1}: {branch['question']} ===\n" + branch["compiled_context"]
+        state["compiled_context"] = merged_context
+        state["scraped_urls"] = list(dict.fromkeys(url for branch in branches for url in branch["scraped_urls"]))
+        state["total_pages_scraped"] = sum(branch["total_pages_scraped"] for branch in branches)
+        state["local_pages"] = sum(branch.get("local_pages", 0) for branch in branches)
+        state["loops_executed"] = max((branch["loops_executed"] for branch in branches), default=0)
+        state["research_done"] = True
+        research_log.append(f"Merged {len(branches)} branches: {state['total_pages_scraped']} pages, {len(merged_context)} chars.")
+        await self._checkpoint(job, start_time)
+
+    async def _research(self, job: ResearchJob):
+        """Run (or resume) the research for a job, then synthesize and deliver the report."""
+        topic = job.topic
+        # Fill in anything missing, so checkpoints written by older versions still resume.
+        for key, value in self._new_job_state(job).items():
+            job.state.setdefault(key, value)
+        state = job.state
+        research_log = state["research_log"]
+        # Model cursors are per job (and per stage) so concurrent jobs don't steer each other's
+        # fallbacks; rate-limit state is shared through groq_model_cooldowns instead.
+        stage_model_idx = state["stage_model_idx"]
+        for stage in self.stage_models:
+            stage_model_idx.setdefault(stage, 0)
+        start_time = time.time() - state.get("elapsed", 0.0)
+        if job.resumed:
+            research_log.append(f"Resumed from checkpoint at loop {state['loop_num'] + 1}, stage '{state['loop_stage']}'.")
+        progress = ResearchProgress(
+            lambda content: self._update_status(job, content),
+            interval=self.progress_interval,
+            started_at=start_time,
+            tokens_used=state.get("tokens_used", 0),
+        )
+        progress.pages_total = state["total_pages_scraped"] + sum(b["total_pages_scraped"] for b in state["branches"])
+        job.progress = progress
+        progress.start()
+
+        if state["report"] is None and not state["research_done"]:
+            if job.options.get("mode") == MODE_BREADTH:
+                await self._research_breadth(job, start_time)
+            elif not await self._run_research_loops(job, state, self._depth_loop_limits(job), start_time):
+                await self._deliver(job, [f"⚠️ Could not find any search results for '{topic}'. Aborting."])
+                return
 
-            if not compiled_scraped_context:
-                await interaction.edit_original_response(content=f"⚠️ Failed to gather any information for '{topic}' after all research attempts.")
+        if state["report"] is None:
+            if not state["compiled_context"]:
+                await self._deliver(job, [f"⚠️ Failed to gather any information for '{topic}' after all research attempts."])
                 logger.warning(f"Research for '{topic}' yielded no usable context.")
                 research_log.append("Overall process yielded no usable context.")
                 return
 
-            await interaction.edit_original_response(content=f"✍️ Synthesizing final report for '{topic}'...")
-            report, self.current_groq_model_idx = await synthesize_with_groq(
-                compiled_scraped_context, topic, self.groq_client, self.current_groq_model_idx, research_log
+            progress.update(f"🗜️ Compressing {len(state['compiled_context']):,} chars of context...", pages_done=0, pages_planned=0)
+            compressed_context, compression = await asyncio.to_thread(
+                compress_context, state["compiled_context"], topic, self.compression_target_ratio
+            )
+            state["compression"] = {key: compression[key] for key in ("original_chars", "compressed_chars")}
+            research_log.append(
+                f"Compressed context from {compression['original_chars']:,} to {compression['compressed_chars']:,} chars "
+                f"({compression['ratio']:.0%}): {compression['boilerplate_lines']} boilerplate lines, "
+                f"{compression['link_lines']} link lines, {compression['duplicate_sentences']} duplicate and "
+                f"{compression['low_information_sentences']} low-information sentences removed."
+            )
+            logger.info(research_log[-1])
+
+            progress.update(f"✍️ Synthesizing final report for '{topic}'...", pages_done=0, pages_planned=0)
+            report, stage_model_idx[STAGE_SYNTHESIS] = await synthesize_with_groq(
+                compressed_context, topic, self.groq_client, self.stage_models[STAGE_SYNTHESIS],
+                stage_model_idx[STAGE_SYNTHESIS], research_log, progress=progress,
+                sub_questions=state["sub_questions"]
             )
 
             if not report or report.startswith("Error:"):
                 err_msg = report if report else 'Failed to generate report.'
-                await interaction.edit_original_response(content=f"❌ {err_msg}")
+                await self._deliver(job, [f"❌ {err_msg}"])
                 logger.error(f"Failed to synthesize report for '{topic}': {err_msg}")
                 research_log.append(f"Final synthesis failed: {err_msg}")
                 return
 
-            total_time = time.time() - start_time
-            logger.info(f"Report for '{topic}'. Length: {len(report)} chars. Total time: {total_time:.2f}s")
-
-            used_model_name = PRIMARY_GROQ_MODEL
-            if self.current_groq_model_idx > 0 and self.current_groq_model_idx <= len(FALLBACK_GROQ_MODELS):
-                 used_model_name = FALLBACK_GROQ_MODELS[self.current_groq_model_idx-1]
-
-            research_summary_for_footer = [
-                f"Topic: '{topic}'",
-                f"Total research loops executed: {final_loop_num + 1}.",
-                f"Total pages successfully scraped: {total_pages_scraped} from {len(successfully_scraped_urls)} unique sites.",
-                f"Synthesis model: {used_model_name}.",
-                f"Total time: {total_time:.2f}s."
-            ]
-
-            footer_content = (
-                "\n\n---\n"
-                "**Research Process Summary:**\n"
-                + "\n".join([f"- {s.strip('- ')}" for s in research_summary_for_footer])
-            )
+            state["report"] = report
+            await self._checkpoint(job, start_time)
+
+        report = state["report"]
+        total_time = time.time() - start_time
+        logger.info(f"Report for '{topic}'. Length: {len(report)} chars. Total time: {total_time:.2f}s")
+
+        synthesis_models = self.stage_models[STAGE_SYNTHESIS]
+        used_model_name = synthesis_models[stage_model_idx[STAGE_SYNTHESIS] % len(synthesis_models)]
+        successfully_scraped_urls = state["scraped_urls"]
+
+        research_summary_for_footer = [
+            f"Topic: '{topic}'",
+            f"Total research loops executed: {state['loops_executed']}.",
+            f"Total pages successfully scraped: {state['total_pages_scraped']} from {len(successfully_scraped_urls)} unique sites.",
+            f"Synthesis model: {used_model_name}.",
+            f"Total time: {total_time:.2f}s."
+        ]
+        if state.get("local_pages"):
+            research_summary_for_footer.insert(3, f"Pages reused from the research corpus: {state['local_pages']}.")
+        compression = state.get("compression")
+        if compression and compression["original_chars"]:
+            research_summary_for_footer.insert(-2, (
+                f"Context compressed to {compression['compressed_chars'] / compression['original_chars']:.0%} "
+                f"({compression['original_chars']:,} → {compression['compressed_chars']:,} chars)."
+            ))
+
+        footer_content = (
+            "\n\n---\n"
+            "**Research Process Summary:**\n"
+            + "\n".join([f"- {s.strip('- ')}" for s in research_summary_for_footer])
+        )
 
-            if successfully_scraped_urls:
-                footer_content += "\n\n**Successfully Scraped Sources:**"
-                max_urls_to_display = 5
-                urls_to_list = list(successfully_scraped_urls)
-                for i, url in enumerate(urls_to_list):
-                    if i < max_urls_to_display:
-                        footer_content += f"\n  - <{url}>"
-                    elif i == max_urls_to_display:
-                        footer_content += f"\n  - ...and {len(urls_to_list) - max_urls_to_display} more."
-                        break
-            else:
-                footer_content += "\n\n**Successfully Scraped Sources:** None"
+        if len(report) + len(footer_content) > self.report_attachment_threshold:
+            await self._deliver_report_attachment(job, report, footer_content, successfully_scraped_urls, used_model_name, total_time)
+            return
 
-            full_report_with_footer = report + footer_content
+        if successfully_scraped_urls:
+            footer_content += "\n\n**Successfully Scraped Sources:**"
+            max_urls_to_display = 5
+            for i, url in enumerate(successfully_scraped_urls):
+                if i < max_urls_to_display:
+                    footer_content += f"\n  - <{url}>"
+                elif i == max_urls_to_display:
+                    footer_content += f"\n  - ...and {len(successfully_scraped_urls) - max_urls_to_display} more."
+                    break
+        else:
+            footer_content += "\n\n**Successfully Scraped Sources:** None"
+
+        await self._deliver(job, split_message(report + footer_content))
+
+    async def _deliver_report_attachment(self, job: ResearchJob, report: str, footer_content: str,
+                                         sources: List[str], used_model_name: str, total_time: float):
+        """Post a summary embed plus the full report as a Markdown attachment, in one message."""
+        title, summary = _extract_report_summary(report, job.topic)
+        embed = discord.Embed(title=title[:256], description=summary, color=discord.Color.blue())
+
+        if sources:
+            source_lines = []
+            for url in sources[:MAX_EMBED_SOURCES]:
+                line = f"• <{url}>"
+                if sum(len(l) + 1 for l in source_lines) + len(line) > 1000:
+                    break
+                source_lines.append(line)
+            if len(sources) > len(source_lines):
+                source_lines.append(f"...and {len(sources) - len(source_lines)} more (see attachment).")
+            embed.add_field(name="Sources", value="\n".join(source_lines), inline=False)
+        embed.set_footer(text=f"{job.state['total_pages_scraped']} pages · {used_model_name} · {total_time:.0f}s · {len(report):,} chars")
+
+        full_report = report + footer_content
+        if sources:
+            full_report += "\n\n**Sources:**\n" + "\n".join(f"- <{url}>" for url in sources)
+        filename = f"research-{_slugify(job.topic)}.md"
+        await self._deliver(
+            job,
+            [f"📑 Research report on '{job.topic}' (full report attached)."],
+            embed=embed,
+            attachment=(filename, full_report.encode("utf-8")),
+        )
 
-            max_chunk_size = 2000
-            if len(full_report_with_footer) <= max_chunk_size:
-                await interaction.edit_original_response(content=full_report_with_footer)
-            else:
-                chunks = []
-                remaining_text = full_report_with_footer
-                while remaining_text:
-                    if len(remaining_text) <= max_chunk_size:
-                        chunks.append(remaining_text)
-                        break
-                    split_at = remaining_text.rfind('\n', 0, max_chunk_size)
-                    if split_at == -1 or split_at < max_chunk_size // 2:
-                        split_at = max_chunk_size
-                    chunks.append(remaining_text[:split_at])
-                    remaining_text = remaining_text[split_at:].lstrip()
+    def _advance_loop(self, state: Dict[str, Any]):
+        state["loop_num"] += 1
+        state["loop_stage"] = LOOP_STAGE_QUERIES
+        state["search_queries"] = []
+        state["search_results"] = []
 
-                await interaction.edit_original_response(content=chunks[0])
-                for chunk_content in chunks[1:]: # Corrected variable name
-                    await asyncio.sleep(0.5)
-                    # Pass the determined ephemeral state for followups
-                    await interaction.followup.send(chunk_content, ephemeral=is_ephemeral_response)
+    # --- Commands ---
 
-            logger.info(f"Successfully completed deep research for '{topic}' by {interaction.user}")
+    @app_commands.command(name="deepresearch", description="Performs iterative deep research on a topic.")
+    @app_commands.describe(
+        topic="The topic to research",
+        max_initial_results_to_consider="Max initial search results to process (optional, affects initial scrape pool)",
+        mode="Depth refines one topic over several loops; breadth researches sub-questions in parallel (good for comparisons)"
+    )
+    @app_commands.choices(max_initial_results_to_consider=[
+        app_commands.Choice(name="3 Results", value=3),
+        app_commands.Choice(name="5 Results (Default)", value=5),
+        app_commands.Choice(name="7 Results", value=7),
+        app_commands.Choice(name="10 Results", value=10),
+    ], mode=[
+        app_commands.Choice(name="Depth (Default)", value=MODE_DEPTH),
+        app_commands.Choice(name="Breadth", value=MODE_BREADTH),
+    ])
+    async def deep_research(self, interaction: discord.Interaction, topic: str, max_initial_results_to_consider: Optional[app_commands.Choice[int]] = None,
+                            mode: Optional[app_commands.Choice[str]] = None):
+        # For deepresearch, we want public reports.
+        await interaction.response.defer(thinking=True, ephemeral=False)
 
-        except Exception as e:
-            logger.exception(f"Unexpected error during deep research for '{topic}': {e}")
-            research_log.append(f"FATAL ERROR: {type(e).__name__} - {str(e)}")
-            try:
-                err_report = f"❌ An critical error occurred: {str(e)}\n\n**Research Log Snippet:**\n"
-                err_report += "\n".join([f"  - {s.strip()}" for s in research_log[-5:]])
-                if len(err_report) > 1950: err_report = err_report[:1950] + "..."
+        if not self.groq_client:
+            await interaction.followup.send("❌ Configuration Error: Groq API key is missing. Cannot perform research.", ephemeral=True) # Config errors can be ephemeral
+            return
 
-                # Check if original response was already sent
-                if interaction.is_expired() or not await interaction.original_response(): # More robust check
-                     await interaction.followup.send(err_report, ephemeral=True) # Send as new message if original is gone/failed
-                else:
-                    await interaction.edit_original_response(content=err_report)
+        if self.job_manager.is_full():
+            await interaction.edit_original_response(content="⚠️ The research queue is full right now. Please try again in a few minutes.")
+            return
 
-            except discord.NotFound:
-                logger.warning("Interaction or original response not found when trying to send fatal error.")
-                pass
-            except Exception as followup_e:
-                logger.error(f"Failed to send fatal error to Discord: {followup_e}")
+        num_initial_results_cap = max_initial_results_to_consider.value if max_initial_results_to_consider else 5
+        job = ResearchJob(
+            topic=topic,
+            user_id=interaction.user.id,
+            channel_id=interaction.channel_id,
+            guild_id=interaction.guild_id,
+            options={
+                "max_initial_results": num_initial_results_cap,
+                "mode": mode.value if mode else MODE_DEPTH,
+                "requested_by": str(interaction.user),
+            },
+        )
+        job.interaction = interaction
+
+        # Show the queue message before submitting so it can't overwrite a worker's first status edit.
+        position = self.job_manager.queued_count() + 1
+        if position > 1 or len(self.job_manager.running_jobs()) >= self.job_manager.max_workers:
+            await self._report_queue_position(job, position)
+        else:
+            await self._update_status(job, f"🧠 Starting research on '{topic}'... Job ID: `{job.job_id}`")
+        if await self.job_manager.submit(job) is None:
+            # Filled up while the status was being sent.
+            await interaction.edit_original_response(content="⚠️ The research queue is full right now. Please try again in a few minutes.")
+            return
+        logger.info(f"Queued deep research job {job.job_id} for '{topic}' by {interaction.user} (position {position}).")
+
+    @app_commands.command(name="research_cancel", description="Cancel a queued or running deep research job.")
+    @app_commands.describe(job_id="ID of the job to cancel (defaults to your most recent job)")
+    async def research_cancel(self, interaction: discord.Interaction, job_id: Optional[str] = None):
+        if job_id:
+            job = self.job_manager.jobs.get(job_id.strip().strip('`'))
+        else:
+            user_jobs = self.job_manager.jobs_for_user(interaction.user.id)
+            job = user_jobs[-1] if user_jobs else None
+
+        if job is None:
+            await interaction.response.send_message("No matching research job found.", ephemeral=True)
+            return
+
+        if job.user_id != interaction.user.id:
+            auth_cog = self.bot.get_cog("Auth")
+            if auth_cog is None or not auth_cog.is_authorized(interaction):
+                await interaction.response.send_message("You can only cancel your own research jobs.", ephemeral=True)
+                logger.warning(f"{interaction.user} tried to cancel research job {job.job_id} owned by {job.user_id}.")
+                return
+
+        previous_status = await self.job_manager.cancel(job.job_id)
+        if previous_status is None:
+            await interaction.response.send_message("That research job already finished.", ephemeral=True)
+            return
+        if previous_status == JOB_QUEUED:
+            await self._update_status(job, f"🛑 Research on '{job.topic}' was cancelled.")
+
+        await interaction.response.send_message(f"🛑 Cancelled {previous_status} research job `{job.job_id}` ('{job.topic}').", ephemeral=True)
+        logger.info(f"Research job {job.job_id} ({previous_status}) cancelled by {interaction.user}.")
 
 
 async def setup(bot):
@@ -1,13 +1,25 @@
 import discord
+from discord import app_commands
 from discord.ext import commands
+import asyncio
 import logging
 import os
 import yaml
 import pathlib
 import time
-import fnmatch
+from typing import List, Optional
+
+from cogs.utility.fetch_search_index import make_snippet, parse_query
+from cogs.utility.fetch_store import FileFetchStore, SqliteFetchStore, read_tag_files
+from cogs.utility.fetch_templates import CompiledTemplate, TemplateCache, compile_template
+from cogs.utility.message_utils import split_message
 
 fetch_role = [1222332241070395432, 1225222029700104234]
+FETCH_LIST_PAGE_SIZE = 40
+FETCH_SEARCH_MAX_RESULTS = 8
+FETCH_TEMPLATE_CACHE_SIZE = 256  # compiled tags kept in memory
+FETCH_SUGGESTIONS = 3  # "did you mean" names offered when a lookup misses
+FETCH_AUTOCOMPLETE_LIMIT = 25  # Discord's maximum number of choices
 
 class Fetch(commands.Cog):
     def __init__(self, bot):
@@ -16,14 +28,67 @@ class Fetch(commands.Cog):
             config = yaml.safe_load(file)
         self.data_dir = os.path.abspath(config.get("fetch_data_dir", "fetch_data"))
         os.makedirs(self.data_dir, exist_ok=True)
+        # "files" keeps one .txt per tag in fetch_data_dir; "sqlite" keeps everything in fetch_db_path
+        # (run !fetch_migrate once to import the .txt files).
+        if config.get("fetch_backend", "files") == "sqlite":
+            self.store = SqliteFetchStore(config.get("fetch_db_path", "fetch.db"))
+        else:
+            self.store = FileFetchStore(self.data_dir, config.get("fetch_search_index_path", "fetch_search_index.json"))
+        self.template_cache = TemplateCache(FETCH_TEMPLATE_CACHE_SIZE)
+
+    async def cog_load(self):
+        await self.store.load()
+        logging.info(f"Fetch cog using the {self.store.backend} backend")
+
+    async def cog_unload(self):
+        await self.store.close()
 
     def is_authorized(self, user: discord.Member):
         return any(role.id in fetch_role for role in user.roles)
 
+    def tag_name(self, file_name: str) -> str:
+        return pathlib.Path(file_name).name
+
     def sanitize_path(self, file_name: str) -> str:
-        safe_name = pathlib.Path(file_name).name
+        safe_name = self.tag_name(file_name)
         return os.path.join(self.data_dir, f"{safe_name}.txt")
 
+    async def load_template(self, tag: str) -> Optional[CompiledTemplate]:
+        """The compiled tag, from the cache unless the tag changed since it was compiled."""
+        version = self.store.version(tag)
+        if version is None:
+            return None
+        template = self.template_cache.get(tag, version)
+        if template is None:
+            saved_content = await self.store.get(tag)
+            if saved_content is None:
+                return None
+            template = compile_template(saved_content)
+            self.template_cache.put(tag, version, template)
+        return template
+
+    def render(self, template: CompiledTemplate, author, channel, guild, reply: discord.Message = None) -> str:
+        # {mention} and {replycontent} stay as typed when the command isn't a reply.
+        return template.render({
+            "mention": lambda: reply.author.mention if reply else None,
+            "replycontent": lambda: reply.content if reply else None,
+            "time": lambda: f"<t:{int(time.time())}:f>",
+            "membercount": lambda: str(guild.member_count),
+            "author": lambda: author.mention,
+            "channel": lambda: channel.mention,
+        })
+
+    def render_for(self, ctx, template: CompiledTemplate) -> str:
+        reply = ctx.message.reference.resolved if ctx.message.reference and ctx.message.reference.resolved else None
+        return self.render(template, ctx.author, ctx.channel, ctx.guild, reply)
+
+    async def not_found_message(self, name: str) -> str:
+        message = f"No content saved with the name '{name}'."
+        suggestions = await self.store.suggest(self.tag_name(name), FETCH_SUGGESTIONS)
+        if suggestions:
+            message += " Did you mean " + ", ".join(f"`{s}`" for s in suggestions) + "?"
+        return message
+
     @commands.command(aliases=['f'])
     async def fetch(self, ctx, name: str = None, *, content: str = None):
         if not self.is_authorized(ctx.author):
@@ -36,10 +101,12 @@ class Fetch(commands.Cog):
                 "!f or !fetch\n"
                 "!fetch <name> <content> - to save shit\n"
                 "!fetch <name> - to get the saved shit\n"
+                "/fetch <name> - same, with name autocomplete\n"
                 "!fetch <pattern>* - to search for saved shit\n"
                 "!fd <name> - to delete saved shit\n"
-                "!fl - to list all saved shit\n"
+                "!fl [page] - to list all saved shit\n"
                 "!fs <text> - to search all files for text\n"
+                "!fi <name> - to see who saved shit and when\n"
                 "Functions:\n"
                 "{mention} - mentions the user you reply to\n"
                 "{time} - shows current time\n"
@@ -52,28 +119,22 @@ class Fetch(commands.Cog):
 
         if '*' in name:
             try:
-                files = [f[:-4] for f in os.listdir(self.data_dir) if fnmatch.fnmatch(f, f"{name}.txt")]
+                files = await self.store.glob(name)
                 if not files:
                     await ctx.send("No fetch files found matching the pattern.")
                     return
 
                 if len(files) == 1:
-                    file_path = self.sanitize_path(files[0])
-                    with open(file_path, "r") as f:
-                        saved_content = f.read()
-                        if ctx.message.reference and ctx.message.reference.resolved:
-                            mentioned_user = ctx.message.reference.resolved.author
-                            saved_content = saved_content.replace("{mention}", mentioned_user.mention)
-                            reply_content = ctx.message.reference.resolved.content
-                            saved_content = saved_content.replace("{replycontent}", reply_content)
-                        saved_content = saved_content.replace("{time}", f"<t:{int(time.time())}:f>")
-                        member_count = ctx.guild.member_count
-                        saved_content = saved_content.replace("{membercount}", str(member_count))
-                        saved_content = saved_content.replace("{author}", ctx.author.mention)
-                        saved_content = saved_content.replace("{channel}", ctx.channel.mention)
-                        await ctx.send(f"> *~/fetch_data/{files[0]}.txt*\n{saved_content}\n")
+                    template = await self.load_template(files[0])
+                    if template is None:
+                        await ctx.send("No fetch files found matching the pattern.")
+                        return
+                    await self.store.record_use(files[0])
+                    await ctx.send(f"> *~/fetch_data/{files[0]}.txt*\n{self.render_for(ctx, template)}\n")
                 else:
-                    files_list = "\n".join(files)
+                    files_list = "\n".join(files[:FETCH_LIST_PAGE_SIZE])
+                    if len(files) > FETCH_LIST_PAGE_SIZE:
+                        files_list += f"\n...and {len(files) - FETCH_LIST_PAGE_SIZE} more, narrow the pattern"
                     await ctx.send(f"```Matching fetch files:\n{files_list}```")
             except Exception as e:
                 logging.error(f"Failed to search files: {e}")
@@ -87,38 +148,54 @@ class Fetch(commands.Cog):
             return
 
         if content is None:
-            if os.path.exists(file_path):
-                try:
-                    with open(file_path, "r") as f:
-                        saved_content = f.read()
-                        if ctx.message.reference and ctx.message.reference.resolved:
-                            mentioned_user = ctx.message.reference.resolved.author
-                            saved_content = saved_content.replace("{mention}", mentioned_user.mention)
-                            reply_content = ctx.message.reference.resolved.content
-                            saved_content = saved_content.replace("{replycontent}", reply_content)
-                        saved_content = saved_content.replace("{time}", f"<t:{int(time.time())}:f>")
-                        member_count = ctx.guild.member_count
-                        saved_content = saved_content.replace("{membercount}", str(member_count))
-                        saved_content = saved_content.replace("{author}", ctx.author.mention)
-                        saved_content = saved_content.replace("{channel}", ctx.channel.mention)
-                        await ctx.send(f"> *~/fetch_data/{name}.txt*\n{saved_content}\n")
-                except Exception as e:
-                    logging.error(f"Failed to read content from {file_path}: {e}")
-                    await ctx.send(f"Error reading content for '{name}'.")
-            else:
-                logging.error(f"No content saved with the name '{name}'.")
-                await ctx.send(f"No content saved with the name '{name}'.")
+            try:
+                template = await self.load_template(self.tag_name(name))
+                if template is not None:
+                    await self.store.record_use(self.tag_name(name))
+                    await ctx.send(f"> *~/fetch_data/{name}.txt*\n{self.render_for(ctx, template)}\n")
+                else:
+                    logging.error(f"No content saved with the name '{name}'.")
+                    await ctx.send(await self.not_found_message(name), allowed_mentions=discord.AllowedMentions.none())
+            except Exception as e:
+                logging.error(f"Failed to read content from {file_path}: {e}")
+                await ctx.send(f"Error reading content for '{name}'.")
             return
 
         try:
-            with open(file_path, "w") as f:
-                f.write(content)
+            await self.store.save(self.tag_name(name), content, str(ctx.author))
+            self.template_cache.invalidate(self.tag_name(name))
             await ctx.send(f"Data saved as `{name}.txt`")
             logging.info(f"Data saved as `{name}.txt` by {ctx.author}")
         except Exception as e:
             logging.error(f"Failed to save content to {file_path}: {e}")
             await ctx.send(f"Error saving data as `{name}.txt`")
 
+    @app_commands.command(name="fetch", description="Send a saved fetch tag.")
+    @app_commands.describe(name="Name of the tag")
+    async def fetch_slash(self, interaction: discord.Interaction, name: str):
+        if not self.is_authorized(interaction.user):
+            await interaction.response.send_message("You do not have permission to use this command.", ephemeral=True)
+            return
+
+        try:
+            template = await self.load_template(self.tag_name(name))
+            if template is None:
+                await interaction.response.send_message(await self.not_found_message(name), ephemeral=True)
+                return
+            await self.store.record_use(self.tag_name(name))
+            rendered = self.render(template, interaction.user, interaction.channel, interaction.guild)
+            await interaction.response.send_message(f"> *~/fetch_data/{name}.txt*\n{rendered}\n")
+        except Exception as e:
+            logging.error(f"Failed to read content for {name}: {e}")
+            await interaction.response.send_message(f"Error reading content for '{name}'.", ephemeral=True)
+
+    @fetch_slash.autocomplete("name")
+    async def fetch_name_autocomplete(self, interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+        if not self.is_authorized(interaction.user):
+            return []
+        names = await self.store.complete(self.tag_name(current), FETCH_AUTOCOMPLETE_LIMIT)
+        return [app_commands.Choice(name=name[:100], value=name[:100]) for name in names]
+
     @commands.command(aliases=['fd'])
     async def fetch_delete(self, ctx, name: str = None):
         if not self.is_authorized(ctx.author):
@@ -135,30 +212,32 @@ class Fetch(commands.Cog):
             await ctx.send("Invalid file path.")
             return
 
-        if os.path.exists(file_path):
-            try:
-                os.remove(file_path)
+        try:
+            deleted = await self.store.delete(self.tag_name(name))
+            self.template_cache.invalidate(self.tag_name(name))
+            if deleted:
                 await ctx.send(f"Deleted `{name}.txt`")
                 logging.info(f"`{name}.txt` deleted by {ctx.author}")
-            except Exception as e:
-                logging.error(f"Failed to delete {file_path}: {e}")
-                await ctx.send(f"Error deleting `{name}.txt`")
-        else:
-            await ctx.send(f"No file found with name `{name}.txt`")
+            else:
+                await ctx.send(f"No file found with name `{name}.txt`")
+        except Exception as e:
+            logging.error(f"Failed to delete {file_path}: {e}")
+            await ctx.send(f"Error deleting `{name}.txt`")
 
     @commands.command(aliases=['fl'])
-    async def fetch_list(self, ctx):
+    async def fetch_list(self, ctx, page: int = 1):
         if not self.is_authorized(ctx.author):
             await ctx.send("You do not have permission to use this command.")
             return
 
         try:
-            files = [f[:-4] for f in os.listdir(self.data_dir) if f.endswith('.txt')]
-            if not files:
+            files, page, total_pages, total = await self.store.page(page, FETCH_LIST_PAGE_SIZE)
+            if not total:
                 await ctx.send("No fetch files found.")
                 return
             files_list = "\n".join(files)
-            await ctx.send(f"```Saved fetch files:\n{files_list}```")
+            footer = f"\n\nPage {page}/{total_pages}, {total} files. Use !fl <page> for more." if total_pages > 1 else ""
+            await ctx.send(f"```Saved fetch files:\n{files_list}{footer}```")
         except Exception as e:
             logging.error(f"Failed to list files: {e}")
             await ctx.send("Error listing fetch files.")
@@ -174,24 +253,72 @@ class Fetch(commands.Cog):
             return
 
         try:
-            matches = []
-            for filename in os.listdir(self.data_dir):
-                if filename.endswith('.txt'):
-                    file_path = os.path.join(self.data_dir, filename)
-                    with open(file_path, 'r') as f:
-                        content = f.read()
-                        if search_text.lower() in content.lower():
-                            matches.append(f"{filename[:-4]}: {content[:100]}...")
-
-            if matches:
-                result = "\n\n".join(matches)
-                await ctx.send(f"```Search results for '{search_text}':\n\n{result}```")
-            else:
+            results = await self.store.search(search_text, limit=FETCH_SEARCH_MAX_RESULTS)
+            if not results:
                 await ctx.send(f"No matches found for '{search_text}'")
+                return
+
+            terms, phrases = parse_query(search_text)
+            highlight_terms = terms + [token for phrase in phrases for token in phrase]
+            matches = [
+                f"**{discord.utils.escape_markdown(tag)}**: {make_snippet(content, highlight_terms, escape=discord.utils.escape_markdown)}"
+                for tag, content in results
+            ]
+            result = "\n\n".join(matches)
+            for chunk in split_message(f"Search results for '{search_text}':\n\n{result}"):
+                await ctx.send(chunk, allowed_mentions=discord.AllowedMentions.none())
         except Exception as e:
             logging.error(f"Failed to search files: {e}")
             await ctx.send("Error searching fetch files.")
 
+    @commands.command(aliases=['fi'])
+    async def fetch_info(self, ctx, name: str = None):
+        if not self.is_authorized(ctx.author):
+            await ctx.send("You do not have permission to use this command.")
+            return
+
+        if name is None:
+            await ctx.send("Please provide a name to look up.")
+            return
+
+        try:
+            info = await self.store.info(self.tag_name(name))
+            if info is None:
+                await ctx.send(f"No file found with name `{name}.txt`")
+                return
+            lines = [f"`{info['name']}.txt` ({info['size']} chars)"]
+            if info["author"]:
+                lines.append(f"Saved by: {info['author']}")
+            if info["created_at"]:
+                lines.append(f"Created: <t:{int(info['created_at'])}:f>")
+            lines.append(f"Updated: <t:{int(info['updated_at'])}:f>")
+            if info["use_count"] is not None:
+                lines.append(f"Used: {info['use_count']} times")
+            await ctx.send("\n".join(lines), allowed_mentions=discord.AllowedMentions.none())
+        except Exception as e:
+            logging.error(f"Failed to get info for {name}: {e}")
+            await ctx.send(f"Error getting info for `{name}.txt`")
+
+    @commands.command(aliases=['fmigrate'])
+    async def fetch_migrate(self, ctx):
+        if not self.is_authorized(ctx.author):
+            await ctx.send("You do not have permission to use this command.")
+            return
+
+        if self.store.backend != "sqlite":
+            await ctx.send("Migration imports fetch_data_dir into the SQLite store; set `fetch_backend: sqlite` in the config first.")
+            return
+
+        try:
+            tags = await asyncio.to_thread(read_tag_files, self.data_dir)
+            imported = await self.store.import_tags(tags, str(ctx.author))
+            self.template_cache.clear()
+            await ctx.send(f"Imported {imported} of {len(tags)} fetch files into the database.")
+            logging.info(f"{ctx.author} migrated {imported}/{len(tags)} fetch files from {self.data_dir} to SQLite")
+        except Exception as e:
+            logging.error(f"Failed to migrate fetch files: {e}")
+            await ctx.send("Error migrating fetch files.")
+
 async def setup(bot):
     logging.info("Setting up the fetch cog...")
     await bot.add_cog(Fetch(bot))
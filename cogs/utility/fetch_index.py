@@ -0,0 +1,186 @@
+# bot/cogs/utility/fetch_index.py
+import bisect
+import fnmatch
+import functools
+import heapq
+import logging
+import os
+import re
+from collections import Counter
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+_GLOB_CHARS = "*?["
+SUGGEST_MIN_SIMILARITY = 0.3  # Dice coefficient over trigrams; below this a name isn't offered
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_glob(pattern: str):
+    return re.compile(fnmatch.translate(pattern))
+
+
+def _literal_prefix(pattern: str) -> str:
+    """The part of a glob before its first wildcard; every match starts with it."""
+    cut = min((pattern.find(c) for c in _GLOB_CHARS if c in pattern), default=len(pattern))
+    return pattern[:cut]
+
+
+def _trigrams(name: str) -> FrozenSet[str]:
+    padded = f"  {name.lower()} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class TrigramIndex:
+    """Inverted index from character trigrams to tag names, for "did you mean" suggestions.
+
+    Names are padded ("  ab ") so short names and shared prefixes still produce trigrams. Only
+    names sharing at least one trigram with the query are scored, so a lookup touches a handful of
+    posting sets rather than every tag.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Set[str]] = {}
+        self._grams: Dict[str, FrozenSet[str]] = {}
+
+    def rebuild(self, names: Iterable[str]):
+        self._postings, self._grams = {}, {}
+        for name in names:
+            self.add(name)
+
+    def add(self, name: str):
+        if name in self._grams:
+            return
+        grams = _trigrams(name)
+        self._grams[name] = grams
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(name)
+
+    def remove(self, name: str):
+        for gram in self._grams.pop(name, ()):
+            names = self._postings.get(gram)
+            if names is not None:
+                names.discard(name)
+                if not names:
+                    del self._postings[gram]
+
+    def similar(self, query: str, limit: int = 5) -> List[str]:
+        """Up to `limit` names closest to `query`, best first."""
+        grams = _trigrams(query)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+        scored = (
+            (2 * count / (len(grams) + len(self._grams[name])), name)
+            for name, count in shared.items()
+        )
+        best = heapq.nsmallest(limit, scored, key=lambda item: (-item[0], item[1]))
+        return [name for score, name in best if score >= SUGGEST_MIN_SIMILARITY]
+
+
+def complete_names(prefixed: List[str], similar: List[str], limit: int) -> List[str]:
+    """Autocomplete choices: names starting with the typed text first, then fuzzy matches."""
+    names = prefixed[:limit]
+    seen = set(names)
+    names += [name for name in similar if name not in seen][:limit - len(names)]
+    return names
+
+
+class TagIndex:
+    """Sorted in-memory list of the tag names saved in the fetch data directory.
+
+    Built from one directory listing, then kept current by `add`/`remove` as the bot saves and
+    deletes tags. Files added or removed behind the bot's back are noticed by polling: `scan()`
+    (in a thread) relists the directory once its mtime moves, and `swap_in()` (on the loop)
+    replaces the index with the result.
+    """
+
+    def __init__(self, data_dir: str, suffix: str = ".txt"):
+        self.data_dir = data_dir
+        self.suffix = suffix
+        self._names: List[str] = []
+        self._dir_mtime = None
+        self.trigrams = TrigramIndex()
+
+    def _stat_mtime(self):
+        try:
+            return os.stat(self.data_dir).st_mtime_ns
+        except OSError:
+            return None
+
+    def _list(self) -> Tuple[Optional[int], List[str], TrigramIndex]:
+        mtime = self._stat_mtime()
+        names = sorted(f[:-len(self.suffix)] for f in os.listdir(self.data_dir) if f.endswith(self.suffix))
+        trigrams = TrigramIndex()
+        trigrams.rebuild(names)
+        return mtime, names, trigrams
+
+    def rebuild(self):
+        self._dir_mtime, self._names, self.trigrams = self._list()
+        logger.info(f"Indexed {len(self._names)} fetch tags in {self.data_dir}")
+
+    @property
+    def dir_mtime(self) -> Optional[int]:
+        return self._dir_mtime
+
+    def scan(self, known_mtime: Optional[int]) -> Optional[Tuple[Optional[int], List[str], TrigramIndex]]:
+        """Blocking; run it in a thread. A fresh listing, or None if the directory's mtime is
+        still `known_mtime`. Doesn't touch the index: hand the result to `swap_in()`."""
+        if self._stat_mtime() == known_mtime:
+            return None
+        return self._list()
+
+    def swap_in(self, known_mtime: Optional[int], scanned: Tuple[Optional[int], List[str], TrigramIndex]) -> bool:
+        """Replace the index with a `scan()` result, unless the bot saved or deleted a tag while
+        it ran: the listing may predate that, so it is dropped and the next poll scans again."""
+        if self._dir_mtime != known_mtime:
+            self._dir_mtime = None
+            return False
+        self._dir_mtime, self._names, self.trigrams = scanned
+        return True
+
+    def add(self, name: str):
+        idx = bisect.bisect_left(self._names, name)
+        if idx == len(self._names) or self._names[idx] != name:
+            self._names.insert(idx, name)
+            self.trigrams.add(name)
+        # Our own write moved the directory mtime; don't treat it as an outside change.
+        self._dir_mtime = self._stat_mtime()
+
+    def remove(self, name: str):
+        idx = bisect.bisect_left(self._names, name)
+        if idx < len(self._names) and self._names[idx] == name:
+            del self._names[idx]
+            self.trigrams.remove(name)
+        self._dir_mtime = self._stat_mtime()
+
+    def __contains__(self, name: str) -> bool:
+        idx = bisect.bisect_left(self._names, name)
+        return idx < len(self._names) and self._names[idx] == name
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def names(self) -> List[str]:
+        return list(self._names)
+
+    def prefix(self, prefix: str) -> List[str]:
+        start = end = bisect.bisect_left(self._names, prefix)
+        while end < len(self._names) and self._names[end].startswith(prefix):
+            end += 1
+        return self._names[start:end]
+
+    def glob(self, pattern: str) -> List[str]:
+        """Names matching a shell-style pattern; only the range sharing its literal prefix is scanned."""
+        regex = _compile_glob(pattern)
+        return [name for name in self.prefix(_literal_prefix(pattern)) if regex.match(name)]
+
+    def complete(self, text: str, limit: int) -> List[str]:
+        return complete_names(self.prefix(text), self.trigrams.similar(text, limit) if text else [], limit)
+
+    def page(self, page_num: int, page_size: int) -> Tuple[List[str], int, int]:
+        """One page of names, with the (1-based, clamped) page number and the total number of pages."""
+        total_pages = max(1, -(-len(self._names) // page_size))
+        page_num = min(max(1, page_num), total_pages)
+        start = (page_num - 1) * page_size
+        return self._names[start:start + page_size], page_num, total_pages
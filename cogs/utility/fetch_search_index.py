@@ -0,0 +1,252 @@
+# bot/cogs/utility/fetch_search_index.py
+import asyncio
+import json
+import logging
+import math
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from cogs.utility.storage_utils import write_atomic
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+SAVE_DELAY_SECONDS = 5  # batch bursts of saves/deletes into one write
+BM25_K1 = 1.2
+BM25_B = 0.75
+SNIPPET_WIDTH = 160
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def parse_query(query: str) -> Tuple[List[str], List[List[str]]]:
+    """Split a query into loose terms and "quoted phrases" (each a token list)."""
+    phrases = []
+    for quoted in re.findall(r'"([^"]+)"', query):
+        tokens = tokenize(quoted)
+        if len(tokens) > 1:
+            phrases.append(tokens)
+        elif tokens:
+            query += f" {tokens[0]}"
+    terms = tokenize(re.sub(r'"[^"]*"', " ", query))
+    return terms, phrases
+
+
+def make_snippet(content: str, terms: Iterable[str], width: int = SNIPPET_WIDTH,
+                 highlight=lambda word: f"**{word}**", escape=lambda text: text) -> str:
+    """A window of `content` around the first query term, with every term occurrence highlighted."""
+    terms = {t for t in terms if t}
+    matches = [m for m in _TOKEN_RE.finditer(content) if m.group().lower() in terms]
+    start = max(0, matches[0].start() - width // 3) if matches else 0
+    end = min(len(content), start + width)
+    pieces = []
+    pos = start
+    for m in matches:
+        if m.start() < start or m.end() > end:
+            continue
+        pieces.append(escape(content[pos:m.start()]))
+        pieces.append(highlight(escape(m.group())))
+        pos = m.end()
+    pieces.append(escape(content[pos:end]))
+    snippet = " ".join("".join(pieces).split())
+    return ("…" if start > 0 else "") + snippet + ("…" if end < len(content) else "")
+
+
+class FetchSearchIndex:
+    """Inverted index (token -> {tag: [positions]}) over the fetch tags' contents, persisted as JSON.
+
+    Nothing is read until the first search calls `ensure_loaded()`: the saved index is loaded and
+    reconciled against the files' mtimes, so tags written or removed while the bot was down are
+    picked up. After that `update()`/`remove()` keep it current and saves are batched to disk.
+    """
+
+    def __init__(self, data_dir: str, path: str):
+        self.data_dir = data_dir
+        self.path = os.path.abspath(path)
+        self.loaded = False
+        self._postings: Dict[str, Dict[str, List[int]]] = {}
+        self._docs: Dict[str, Dict] = {}  # tag -> {"mtime": ns, "length": tokens, "terms": [...]}
+        self._total_length = 0
+        self._pending: List[Tuple] = []  # updates made while the initial load was running
+        self._load_lock = asyncio.Lock()
+        self._save_task: Optional[asyncio.Task] = None
+
+    # --- Loading ---
+
+    async def ensure_loaded(self, tags: Iterable[str]):
+        if self.loaded:
+            return
+        async with self._load_lock:
+            if self.loaded:
+                return
+            postings, docs, changed = await asyncio.to_thread(self._load_and_reconcile, list(tags))
+            self._postings, self._docs = postings, docs
+            self._total_length = sum(doc["length"] for doc in docs.values())
+            self.loaded = True
+            for op in self._pending:
+                if op[0] == "update":
+                    self.update(*op[1:])
+                else:
+                    self.remove(*op[1:])
+            self._pending = []
+            if changed:
+                self.schedule_save()
+            logger.info(f"Fetch search index ready: {len(self._docs)} tags, {len(self._postings)} terms ({changed} reindexed).")
+
+    def _load_and_reconcile(self, tags: List[str]):
+        postings, docs = {}, {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION:
+                postings, docs = data["postings"], data["docs"]
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Discarding unreadable fetch search index {self.path}: {e}")
+
+        changed = 0
+        wanted = set(tags)
+        for tag in [t for t in docs if t not in wanted]:
+            self._unindex(postings, docs, tag)
+            changed += 1
+        for tag in wanted:
+            file_path = os.path.join(self.data_dir, f"{tag}.txt")
+            try:
+                mtime = os.stat(file_path).st_mtime_ns
+                if tag in docs and docs[tag]["mtime"] == mtime:
+                    continue
+                with open(file_path, "r") as f:
+                    content = f.read()
+            except (OSError, UnicodeDecodeError) as e:
+                logger.warning(f"Could not index fetch tag {tag}: {e}")
+                continue
+            self._unindex(postings, docs, tag)
+            self._index(postings, docs, tag, content, mtime)
+            changed += 1
+        return postings, docs, changed
+
+    # --- Updates ---
+
+    @staticmethod
+    def _index(postings, docs, tag: str, content: str, mtime: int):
+        tokens = tokenize(content)
+        positions: Dict[str, List[int]] = {}
+        for pos, token in enumerate(tokens):
+            positions.setdefault(token, []).append(pos)
+        for token, token_positions in positions.items():
+            postings.setdefault(token, {})[tag] = token_positions
+        docs[tag] = {"mtime": mtime, "length": len(tokens), "terms": list(positions)}
+
+    @staticmethod
+    def _unindex(postings, docs, tag: str):
+        doc = docs.pop(tag, None)
+        if not doc:
+            return
+        for token in doc["terms"]:
+            tag_postings = postings.get(token)
+            if tag_postings is not None:
+                tag_postings.pop(tag, None)
+                if not tag_postings:
+                    del postings[token]
+
+    def update(self, tag: str, content: str, mtime: int):
+        if not self.loaded:
+            self._pending.append(("update", tag, content, mtime))
+            return
+        self._total_length -= self._docs.get(tag, {}).get("length", 0)
+        self._unindex(self._postings, self._docs, tag)
+        self._index(self._postings, self._docs, tag, content, mtime)
+        self._total_length += self._docs[tag]["length"]
+        self.schedule_save()
+
+    def remove(self, tag: str):
+        if not self.loaded:
+            self._pending.append(("remove", tag))
+            return
+        self._total_length -= self._docs.get(tag, {}).get("length", 0)
+        self._unindex(self._postings, self._docs, tag)
+        self.schedule_save()
+
+    # --- Persistence ---
+
+    def schedule_save(self):
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.create_task(self._save_later())
+
+    async def _save_later(self):
+        await asyncio.sleep(SAVE_DELAY_SECONDS)
+        await self.save()
+
+    async def save(self):
+        # Snapshot on the loop, serialize and write in a thread. The copies only go one level into
+        # the postings: position lists and doc entries are replaced on update, never mutated.
+        snapshot = {
+            "version": INDEX_VERSION,
+            "docs": dict(self._docs),
+            "postings": {token: dict(tags) for token, tags in self._postings.items()},
+        }
+        try:
+            await asyncio.to_thread(self._write, snapshot)
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to save fetch search index: {e}")
+
+    def _write(self, snapshot: Dict):
+        write_atomic(self.path, json.dumps(snapshot))
+
+    async def invalidate(self):
+        """Make the next search reconcile against the directory again (after outside changes)."""
+        await self.close()
+        self.loaded = False
+
+    async def close(self):
+        """Flush a pending batched save."""
+        if self._save_task and not self._save_task.done():
+            self._save_task.cancel()
+            await self.save()
+
+    # --- Search ---
+
+    def _phrase_matches(self, tag: str, phrase: List[str]) -> bool:
+        try:
+            position_sets = [set(self._postings[token][tag]) for token in phrase[1:]]
+            first_positions = self._postings[phrase[0]][tag]
+        except KeyError:
+            return False
+        return any(all(start + i + 1 in positions for i, positions in enumerate(position_sets)) for start in first_positions)
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """BM25-ranked tags for a query. Every term and "quoted phrase" must match; if nothing
+        matches everything, tags matching any of the loose terms are ranked instead."""
+        terms, phrases = parse_query(query)
+        all_terms = list(dict.fromkeys(terms + [t for phrase in phrases for t in phrase]))
+        if not all_terms or not self._docs:
+            return []
+
+        candidate_sets = [set(self._postings.get(term, {})) for term in all_terms]
+        candidates = set.intersection(*candidate_sets)
+        candidates = {tag for tag in candidates if all(self._phrase_matches(tag, phrase) for phrase in phrases)}
+        if not candidates and not phrases and len(terms) > 1:
+            candidates = set.union(*candidate_sets)
+
+        num_docs = len(self._docs)
+        avg_length = self._total_length / num_docs if num_docs else 0
+        scores = {}
+        for tag in candidates:
+            doc_length = self._docs[tag]["length"]
+            score = 0.0
+            for term in all_terms:
+                tag_postings = self._postings.get(term, {})
+                freq = len(tag_postings.get(tag, ()))
+                if not freq:
+                    continue
+                idf = math.log(1 + (num_docs - len(tag_postings) + 0.5) / (len(tag_postings) + 0.5))
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_length / avg_length) if avg_length else BM25_K1
+                score += idf * freq * (BM25_K1 + 1) / (freq + norm)
+            scores[tag] = score
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
@@ -0,0 +1,306 @@
+# bot/cogs/utility/fetch_store.py
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from cogs.utility.fetch_index import TagIndex, TrigramIndex, complete_names
+from cogs.utility.fetch_search_index import FetchSearchIndex, parse_query
+from cogs.utility.storage_utils import SqliteStore, write_atomic
+
+logger = logging.getLogger(__name__)
+
+FETCH_INDEX_POLL_SECONDS = 30  # how often to check fetch_data_dir for files changed outside the bot
+
+
+def read_tag_files(data_dir: str) -> List[Tuple[str, str, float]]:
+    """(tag, content, mtime) for every .txt tag in a directory. Blocking; run it in a thread."""
+    tags = []
+    for filename in sorted(os.listdir(data_dir)):
+        if not filename.endswith(".txt"):
+            continue
+        path = os.path.join(data_dir, filename)
+        try:
+            with open(path, "r") as f:
+                tags.append((filename[:-4], f.read(), os.stat(path).st_mtime))
+        except (OSError, UnicodeDecodeError) as e:
+            logger.warning(f"Skipping unreadable fetch file {filename}: {e}")
+    return tags
+
+
+class FileFetchStore:
+    """Tags as one .txt file each in `data_dir`, with in-memory name and full-text indexes."""
+
+    backend = "files"
+
+    def __init__(self, data_dir: str, search_index_path: str):
+        self.data_dir = data_dir
+        os.makedirs(self.data_dir, exist_ok=True)
+        self.index = TagIndex(self.data_dir)
+        self.search_index = FetchSearchIndex(self.data_dir, search_index_path)
+        self._watch_task = None
+
+    async def load(self):
+        await asyncio.to_thread(self.index.rebuild)
+        self._watch_task = asyncio.create_task(self._watch_data_dir())
+
+    async def close(self):
+        if self._watch_task:
+            self._watch_task.cancel()
+        await self.search_index.close()
+
+    async def _watch_data_dir(self):
+        while True:
+            await asyncio.sleep(FETCH_INDEX_POLL_SECONDS)
+            try:
+                # List the directory off the loop; only the swap happens here.
+                known_mtime = self.index.dir_mtime
+                scanned = await asyncio.to_thread(self.index.scan, known_mtime)
+                if scanned and self.index.swap_in(known_mtime, scanned):
+                    logger.info("fetch_data_dir changed outside the bot, tag index rebuilt")
+                    if self.search_index.loaded:
+                        await self.search_index.invalidate()
+            except Exception as e:
+                logger.error(f"Failed to refresh fetch tag index: {e}")
+
+    def _path(self, tag: str) -> str:
+        return os.path.join(self.data_dir, f"{tag}.txt")
+
+    def _read(self, tag: str) -> Optional[str]:
+        try:
+            with open(self._path(tag), "r") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _write(self, tag: str, content: str) -> int:
+        path = self._path(tag)
+        write_atomic(path, content, encoding=None)
+        return os.stat(path).st_mtime_ns
+
+    def version(self, tag: str) -> Optional[int]:
+        """The file's mtime, or None if the tag doesn't exist. Catches edits made outside the bot."""
+        try:
+            return os.stat(self._path(tag)).st_mtime_ns
+        except OSError:
+            return None
+
+    async def get(self, tag: str) -> Optional[str]:
+        return await asyncio.to_thread(self._read, tag)
+
+    async def save(self, tag: str, content: str, author: str):
+        mtime = await asyncio.to_thread(self._write, tag, content)
+        self.index.add(tag)
+        self.search_index.update(tag, content, mtime)
+
+    async def delete(self, tag: str) -> bool:
+        try:
+            await asyncio.to_thread(os.remove, self._path(tag))
+        except FileNotFoundError:
+            return False
+        self.index.remove(tag)
+        self.search_index.remove(tag)
+        return True
+
+    async def record_use(self, tag: str):
+        pass  # files have nowhere to keep a use count
+
+    async def info(self, tag: str) -> Optional[Dict[str, Any]]:
+        try:
+            stat = await asyncio.to_thread(os.stat, self._path(tag))
+        except FileNotFoundError:
+            return None
+        return {"name": tag, "author": None, "created_at": None, "updated_at": stat.st_mtime, "use_count": None, "size": stat.st_size}
+
+    async def glob(self, pattern: str) -> List[str]:
+        return self.index.glob(pattern)
+
+    async def page(self, page_num: int, page_size: int) -> Tuple[List[str], int, int, int]:
+        names, page_num, total_pages = self.index.page(page_num, page_size)
+        return names, page_num, total_pages, len(self.index)
+
+    async def suggest(self, name: str, limit: int) -> List[str]:
+        return self.index.trigrams.similar(name, limit)
+
+    async def complete(self, text: str, limit: int) -> List[str]:
+        return self.index.complete(text, limit)
+
+    async def search(self, query: str, limit: int) -> List[Tuple[str, str]]:
+        await self.search_index.ensure_loaded(self.index.names())
+        results = self.search_index.search(query, limit=limit)
+        contents = await asyncio.to_thread(lambda: [(tag, self._read(tag)) for tag, _ in results])
+        return [(tag, content) for tag, content in contents if content is not None]
+
+
+class SqliteFetchStore(SqliteStore):
+    """Tags in one SQLite database: a `tags` table with metadata plus an FTS5 index for search.
+
+    Every write is a single transaction, so a save is either fully there or not at all.
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, path: str):
+        super().__init__(path, "fetch-db")
+        self.trigrams = TrigramIndex()  # tag names, kept in memory for suggestions
+
+    # --- Thread-side helpers (only ever called on the fetch-db thread) ---
+
+    def _init_db(self, conn: sqlite3.Connection):
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS tags (
+                name TEXT PRIMARY KEY,
+                content TEXT NOT NULL,
+                author TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                use_count INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS tags_fts USING fts5(
+                name, content, content='tags', content_rowid='rowid'
+            );
+            CREATE TRIGGER IF NOT EXISTS tags_ai AFTER INSERT ON tags BEGIN
+                INSERT INTO tags_fts(rowid, name, content) VALUES (new.rowid, new.name, new.content);
+            END;
+            CREATE TRIGGER IF NOT EXISTS tags_ad AFTER DELETE ON tags BEGIN
+                INSERT INTO tags_fts(tags_fts, rowid, name, content) VALUES ('delete', old.rowid, old.name, old.content);
+            END;
+            CREATE TRIGGER IF NOT EXISTS tags_au AFTER UPDATE OF name, content ON tags BEGIN
+                INSERT INTO tags_fts(tags_fts, rowid, name, content) VALUES ('delete', old.rowid, old.name, old.content);
+                INSERT INTO tags_fts(rowid, name, content) VALUES (new.rowid, new.name, new.content);
+            END;
+        """)
+
+    def _get(self, tag: str) -> Optional[str]:
+        row = self._connect().execute("SELECT content FROM tags WHERE name = ?", (tag,)).fetchone()
+        return row["content"] if row else None
+
+    def _save(self, tag: str, content: str, author: str, now: float):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT INTO tags(name, content, author, created_at, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET content=excluded.content, updated_at=excluded.updated_at",
+                (tag, content, author, now, now),
+            )
+
+    def _delete(self, tag: str) -> bool:
+        conn = self._connect()
+        with conn:
+            return conn.execute("DELETE FROM tags WHERE name = ?", (tag,)).rowcount > 0
+
+    def _record_use(self, tag: str):
+        conn = self._connect()
+        with conn:
+            conn.execute("UPDATE tags SET use_count = use_count + 1 WHERE name = ?", (tag,))
+
+    def _info(self, tag: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            "SELECT name, author, created_at, updated_at, use_count, length(content) AS size FROM tags WHERE name = ?", (tag,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def _names(self) -> List[str]:
+        return [row["name"] for row in self._connect().execute("SELECT name FROM tags")]
+
+    def _prefix(self, prefix: str, limit: int) -> List[str]:
+        rows = self._connect().execute(
+            "SELECT name FROM tags WHERE name >= ? AND name < ? ORDER BY name LIMIT ?", (prefix, prefix + "\U0010ffff", limit)
+        ).fetchall()
+        return [row["name"] for row in rows]
+
+    def _glob(self, pattern: str) -> List[str]:
+        rows = self._connect().execute("SELECT name FROM tags WHERE name GLOB ? ORDER BY name", (pattern,)).fetchall()
+        return [row["name"] for row in rows]
+
+    def _page(self, page_num: int, page_size: int) -> Tuple[List[str], int, int, int]:
+        conn = self._connect()
+        total = conn.execute("SELECT COUNT(*) FROM tags").fetchone()[0]
+        total_pages = max(1, -(-total // page_size))
+        page_num = min(max(1, page_num), total_pages)
+        rows = conn.execute(
+            "SELECT name FROM tags ORDER BY name LIMIT ? OFFSET ?", (page_size, (page_num - 1) * page_size)
+        ).fetchall()
+        return [row["name"] for row in rows], page_num, total_pages, total
+
+    def _search(self, match: str, limit: int) -> List[Tuple[str, str]]:
+        rows = self._connect().execute(
+            "SELECT t.name, t.content FROM tags_fts JOIN tags t ON t.rowid = tags_fts.rowid "
+            "WHERE tags_fts MATCH ? ORDER BY bm25(tags_fts, 0.5, 1.0) LIMIT ?",
+            (match, limit),
+        ).fetchall()
+        return [(row["name"], row["content"]) for row in rows]
+
+    def _import(self, tags: List[Tuple[str, str, float]], author: str) -> int:
+        conn = self._connect()
+        with conn:
+            # Existing rows are only replaced by a file that is newer than them.
+            cursor = conn.executemany(
+                "INSERT INTO tags(name, content, author, created_at, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET content=excluded.content, updated_at=excluded.updated_at "
+                "WHERE excluded.updated_at > tags.updated_at",
+                [(name, content, author, mtime, mtime) for name, content, mtime in tags],
+            )
+        return cursor.rowcount
+
+    # --- Public async API (same as FileFetchStore) ---
+
+    async def load(self):
+        self.trigrams.rebuild(await self._run(self._names))
+
+    def version(self, tag: str) -> Optional[int]:
+        # The database is only written through this store, so cached copies are invalidated on
+        # write instead of being checked against the row.
+        return 0
+
+    async def get(self, tag: str) -> Optional[str]:
+        return await self._run(self._get, tag)
+
+    async def save(self, tag: str, content: str, author: str):
+        await self._run(self._save, tag, content, author, time.time())
+        self.trigrams.add(tag)
+
+    async def delete(self, tag: str) -> bool:
+        deleted = await self._run(self._delete, tag)
+        self.trigrams.remove(tag)
+        return deleted
+
+    async def record_use(self, tag: str):
+        await self._run(self._record_use, tag)
+
+    async def info(self, tag: str) -> Optional[Dict[str, Any]]:
+        return await self._run(self._info, tag)
+
+    async def glob(self, pattern: str) -> List[str]:
+        return await self._run(self._glob, pattern)
+
+    async def page(self, page_num: int, page_size: int) -> Tuple[List[str], int, int, int]:
+        return await self._run(self._page, page_num, page_size)
+
+    async def suggest(self, name: str, limit: int) -> List[str]:
+        return self.trigrams.similar(name, limit)
+
+    async def complete(self, text: str, limit: int) -> List[str]:
+        prefixed = await self._run(self._prefix, text, limit)
+        return complete_names(prefixed, self.trigrams.similar(text, limit) if text else [], limit)
+
+    async def search(self, query: str, limit: int) -> List[Tuple[str, str]]:
+        terms, phrases = parse_query(query)
+        quote = lambda text: '"' + text.replace('"', '""') + '"'
+        required = [quote(t) for t in terms] + [quote(" ".join(p)) for p in phrases]
+        if not required:
+            return []
+        results = await self._run(self._search, " AND ".join(required), limit)
+        if not results and not phrases and len(terms) > 1:
+            results = await self._run(self._search, " OR ".join(required), limit)
+        return results
+
+    async def import_tags(self, tags: List[Tuple[str, str, float]], author: str) -> int:
+        """Bulk-insert (tag, content, mtime) rows in one transaction."""
+        imported = await self._run(self._import, tags, author)
+        for name, _, _ in tags:
+            self.trigrams.add(name)
+        return imported
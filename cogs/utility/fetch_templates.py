@@ -0,0 +1,78 @@
+# bot/cogs/utility/fetch_templates.py
+import collections
+import re
+from typing import Callable, Dict, Hashable, List, Optional, Tuple, Union
+
+PLACEHOLDERS = ("mention", "time", "membercount", "author", "channel", "replycontent")
+_PLACEHOLDER_RE = re.compile(r"\{(" + "|".join(PLACEHOLDERS) + r")\}")
+
+
+class Placeholder:
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+
+class CompiledTemplate:
+    """A fetch tag split once into literal text and placeholder segments."""
+
+    def __init__(self, segments: List[Union[str, Placeholder]]):
+        self.segments = segments
+        self.placeholders = {s.name for s in segments if isinstance(s, Placeholder)}
+
+    def render(self, resolvers: Dict[str, Callable[[], Optional[str]]]) -> str:
+        """Join the segments in one pass. A placeholder's resolver only runs if the tag uses it
+        (once, however often it appears); a resolver returning None leaves the placeholder as is."""
+        if not self.placeholders:
+            return self.segments[0] if self.segments else ""
+        values = {}
+        for name in self.placeholders:
+            value = resolvers[name]() if name in resolvers else None
+            values[name] = f"{{{name}}}" if value is None else value
+        return "".join(values[s.name] if isinstance(s, Placeholder) else s for s in self.segments)
+
+
+def compile_template(text: str) -> CompiledTemplate:
+    segments: List[Union[str, Placeholder]] = []
+    pos = 0
+    for match in _PLACEHOLDER_RE.finditer(text):
+        if match.start() > pos:
+            segments.append(text[pos:match.start()])
+        segments.append(Placeholder(match.group(1)))
+        pos = match.end()
+    if pos < len(text) or not segments:
+        segments.append(text[pos:])
+    return CompiledTemplate(segments)
+
+
+class TemplateCache:
+    """LRU of compiled tags keyed by name. An entry is only used while its version (file mtime or
+    similar) still matches; writes and deletes through the bot call `invalidate()`."""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._entries: "collections.OrderedDict[str, Tuple[Hashable, CompiledTemplate]]" = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, tag: str, version: Hashable) -> Optional[CompiledTemplate]:
+        entry = self._entries.get(tag)
+        if entry is None or entry[0] != version:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(tag)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, tag: str, version: Hashable, template: CompiledTemplate):
+        self._entries[tag] = (version, template)
+        self._entries.move_to_end(tag)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, tag: str):
+        self._entries.pop(tag, None)
+
+    def clear(self):
+        self._entries.clear()
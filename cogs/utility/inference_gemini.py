@@ -46,199 +46,187 @@ class GeminiInference(commands.Cog):
         self.video_capable_models = ["gemini-1.5-flash", "gemini-1.5-pro"]
 
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author == self.bot.user:
+    async def cog_load(self):
+        router = self.bot.get_cog("MessageRouter")
+        if router is None:
+            logging.error("The `MessageRouter` cog is not loaded.")
             return
+        router.add_llm_handler("gemini", self.handle_message)
 
-        inference_toggle_cog = self.bot.get_cog("Toggle_llm")
-        if inference_toggle_cog is None or not inference_toggle_cog.is_inference_enabled():
-            return
+    async def cog_unload(self):
+        router = self.bot.get_cog("MessageRouter")
+        if router is not None:
+            router.remove(self.handle_message)
 
-        # Check which provider is selected
-        provider_selector = self.bot.get_cog("ProviderSelector")
-        if provider_selector is None:
-            logging.error("ProviderSelector cog not found")
-            return
+    async def handle_message(self, message):
+        """Reply to a message that mentions or replies to the bot, when gemini is the selected provider."""
+        user_id = message.author.id
+
+        # Extract content, message.clean_content automatically removes mentions
+        content = message.clean_content
 
-        current_provider = provider_selector.get_current_provider()
+        # Find YouTube URLs in the original message content (before cleaning)
+        # Use finditer to get match objects and extract the full matched string
+        youtube_urls = [match.group(0) for match in self.youtube_url_pattern.finditer(message.content)]
 
-        # If groq is selected, skip processing in this cog
-        if current_provider != "gemini":
+        text_prompt = content
+        # Remove URLs from the text prompt if they were found
+        if youtube_urls:
+             # Iterate through found URLs and remove them from the text_prompt
+             for url in youtube_urls:
+                 text_prompt = text_prompt.replace(url, "").strip() # Remove the matched URL string
+
+        text_prompt = text_prompt.strip() # Clean up leading/trailing whitespace again
+
+        if not text_prompt and not youtube_urls:
+            # Only bot mention or reply without content
             return
 
-        # Check if the bot was mentioned or if it's a reply to the bot (implies interaction)
-        is_mentioned = self.bot.user in message.mentions
-        is_reply_to_bot = message.reference and message.reference.resolved and message.reference.resolved.author == self.bot.user
-
-        if is_mentioned or is_reply_to_bot:
-            user_id = message.author.id
-
-            # Extract content, message.clean_content automatically removes mentions
-            content = message.clean_content
-
-            # Find YouTube URLs in the original message content (before cleaning)
-            # Use finditer to get match objects and extract the full matched string
-            youtube_urls = [match.group(0) for match in self.youtube_url_pattern.finditer(message.content)]
-
-            text_prompt = content
-            # Remove URLs from the text prompt if they were found
-            if youtube_urls:
-                 # Iterate through found URLs and remove them from the text_prompt
-                 for url in youtube_urls:
-                     text_prompt = text_prompt.replace(url, "").strip() # Remove the matched URL string
-
-            text_prompt = text_prompt.strip() # Clean up leading/trailing whitespace again
-
-            if not text_prompt and not youtube_urls:
-                # Only bot mention or reply without content
-                return
-
-            try:
-                async with message.channel.typing():
-                    # Initialize conversation history if it doesn't exist
-                    if user_id not in self.memory:
-                        self.memory[user_id] = []
-
-                    # Check if we're handling video input and the model supports it
-                    if youtube_urls and self.model in self.video_capable_models:
-                        logging.info(f"Processing video input from {message.author.name} ({message.author.id}) with model {self.model}. URLs: {youtube_urls}, Text: '{text_prompt}'")
-
-                        contents_parts = []
-                        # Add FileData parts for each YouTube URL
-                        # Note: Gemini API requires a MIME type. video/mp4 is commonly used,
-                        # but the API handles the actual fetching/processing.
-                        for url in youtube_urls:
-                            contents_parts.append(types.Part(file_data=types.FileData(file_uri=url, mime_type='video/mp4')))
-
-                        # Add the text prompt part
-                        if text_prompt:
-                            contents_parts.append(types.Part(text=text_prompt))
-                        else:
-                            # If no text prompt, add a default instruction
-                            contents_parts.append(types.Part(text="Summarize the video."))
-
-                        # Add the multimodal input to memory (as a text representation)
-                        memory_input_text = f"Video(s): {', '.join(youtube_urls)}"
-                        if text_prompt:
-                             memory_input_text += f"\nText: {text_prompt}"
-                        self.memory[user_id].append({"role": "user", "content": memory_input_text})
-
-                        # Use streaming with thoughts for video content
-                        thoughts = ""
-                        answer = ""
-
-                        for chunk in self.client.models.generate_content_stream(
-                            model=self.model,
-                            contents=types.Content(parts=contents_parts),
-                            config=GenerateContentConfig(
-                                temperature=self.temperature,
-                                max_output_tokens=self.max_tokens,
-                                thinking_config=types.ThinkingConfig(
-                                    include_thoughts=True
-                                )
-                            )
-                        ):
-                            for part in chunk.candidates[0].content.parts:
-                                if not part.text:
-                                    continue
-                                elif part.thought:
-                                    thoughts += part.text
-                                else:
-                                    answer += part.text
-
-                        reply = answer.strip() if answer else "The model processed the video but did not return a text response."
-
-                        # Add the response to memory
-                        self.memory[user_id].append({"role": "assistant", "content": reply})
-
-                        # Trim memory if needed
-                        if len(self.memory[user_id]) > self.memory_limit * 2:
-                            self.memory[user_id] = self.memory[user_id][-self.memory_limit * 2:]
-
-                        logging.info(f"Name:{message.author.name}\n User:{message.author.id}\n Multimodal Input:{memory_input_text}\n Response:{reply}")
-
-                        # Send thoughts summary if available
-                        if thoughts.strip():
-                            thoughts_message = f"**Thoughts Summary:**\n{thoughts.strip()}"
-                            # Send thoughts in chunks if too long
-                            for i in range(0, len(thoughts_message), 2000):
-                                chunk = thoughts_message[i:i + 2000]
-                                await message.reply(chunk)
+        try:
+            async with message.channel.typing():
+                # Initialize conversation history if it doesn't exist
+                if user_id not in self.memory:
+                    self.memory[user_id] = []
 
-                        # Send the response in chunks if it's too long
-                        for i in range(0, len(reply), 2000):
-                            chunk = reply[i:i + 2000]
-                            await message.reply(chunk)
+                # Check if we're handling video input and the model supports it
+                if youtube_urls and self.model in self.video_capable_models:
+                    logging.info(f"Processing video input from {message.author.name} ({message.author.id}) with model {self.model}. URLs: {youtube_urls}, Text: '{text_prompt}'")
+
+                    contents_parts = []
+                    # Add FileData parts for each YouTube URL
+                    # Note: Gemini API requires a MIME type. video/mp4 is commonly used,
+                    # but the API handles the actual fetching/processing.
+                    for url in youtube_urls:
+                        contents_parts.append(types.Part(file_data=types.FileData(file_uri=url, mime_type='video/mp4')))
 
-                    elif self.model == "gemini-2.0-flash-exp-image-generation":
-                        # Process with image generation capabilities (kept separate)
-                        await self.process_with_image_gen(message, content) # Use original 'content' here for image prompt
-                        return
-
-                    elif youtube_urls and self.model not in self.video_capable_models:
-                         # URLs found but model doesn't support video
-                         video_models_str = ", ".join([f"`{m}`" for m in self.video_capable_models])
-                         await message.reply(f"The current model (`{self.model}`) does not support video input. Please switch to a model like {video_models_str} using `/gemini_model` to process videos.")
-                         logging.info(f"User {message.author.id} attempted video processing with non-video model {self.model}")
-
-                    elif text_prompt: # Regular text processing if no URLs or model isn't video-capable and there's text
-                        logging.info(f"Processing text input from {message.author.name} ({message.author.id}) with model {self.model}. Text: '{text_prompt}'")
-                        # Add the text message to the memory BEFORE the API call
-                        self.memory[user_id].append({"role": "user", "content": text_prompt})
-
-                        # Use streaming with thoughts for text content
-                        thoughts = ""
-                        answer = ""
-
-                        for chunk in self.client.models.generate_content_stream(
-                            model=self.model,
-                            contents=text_prompt,
-                            config=GenerateContentConfig(
-                                temperature=self.temperature,
-                                max_output_tokens=self.max_tokens,
-                                thinking_config=types.ThinkingConfig(
-                                    include_thoughts=True
-                                )
+                    # Add the text prompt part
+                    if text_prompt:
+                        contents_parts.append(types.Part(text=text_prompt))
+                    else:
+                        # If no text prompt, add a default instruction
+                        contents_parts.append(types.Part(text="Summarize the video."))
+
+                    # Add the multimodal input to memory (as a text representation)
+                    memory_input_text = f"Video(s): {', '.join(youtube_urls)}"
+                    if text_prompt:
+                         memory_input_text += f"\nText: {text_prompt}"
+                    self.memory[user_id].append({"role": "user", "content": memory_input_text})
+
+                    # Use streaming with thoughts for video content
+                    thoughts = ""
+                    answer = ""
+
+                    for chunk in self.client.models.generate_content_stream(
+                        model=self.model,
+                        contents=types.Content(parts=contents_parts),
+                        config=GenerateContentConfig(
+                            temperature=self.temperature,
+                            max_output_tokens=self.max_tokens,
+                            thinking_config=types.ThinkingConfig(
+                                include_thoughts=True
                             )
-                        ):
-                            for part in chunk.candidates[0].content.parts:
-                                if not part.text:
-                                    continue
-                                elif part.thought:
-                                    thoughts += part.text
-                                else:
-                                    answer += part.text
-
-                        reply = answer.strip() if answer else "The model did not return a text response."
-
-                        # Add the response to memory
-                        self.memory[user_id].append({"role": "assistant", "content": reply})
-
-                        # Trim memory if needed
-                        if len(self.memory[user_id]) > self.memory_limit * 2:
-                            self.memory[user_id] = self.memory[user_id][-self.memory_limit * 2:]
-
-                        logging.info(f"Name:{message.author.name}\n User:{message.author.id}\n Message:{text_prompt}\n Response:{reply}")
-
-                        # Send thoughts summary if available
-                        if thoughts.strip():
-                            thoughts_message = f"**<think>**\n{thoughts.strip()}\n**<\\think>**"
-                            # Send thoughts in chunks if too long
-                            for i in range(0, len(thoughts_message), 2000):
-                                chunk = thoughts_message[i:i + 2000]
-                                await message.reply(chunk)
+                        )
+                    ):
+                        for part in chunk.candidates[0].content.parts:
+                            if not part.text:
+                                continue
+                            elif part.thought:
+                                thoughts += part.text
+                            else:
+                                answer += part.text
+
+                    reply = answer.strip() if answer else "The model processed the video but did not return a text response."
+
+                    # Add the response to memory
+                    self.memory[user_id].append({"role": "assistant", "content": reply})
+
+                    # Trim memory if needed
+                    if len(self.memory[user_id]) > self.memory_limit * 2:
+                        self.memory[user_id] = self.memory[user_id][-self.memory_limit * 2:]
+
+                    logging.info(f"Name:{message.author.name}\n User:{message.author.id}\n Multimodal Input:{memory_input_text}\n Response:{reply}")
+
+                    # Send thoughts summary if available
+                    if thoughts.strip():
+                        thoughts_message = f"**Thoughts Summary:**\n{thoughts.strip()}"
+                        # Send thoughts in chunks if too long
+                        for i in range(0, len(thoughts_message), 2000):
+                            chunk = thoughts_message[i:i + 2000]
+                            await message.reply(chunk)
 
-                        # Send the response in chunks if it's too long
-                        for i in range(0, len(reply), 2000):
-                            chunk = reply[i:i + 2000]
+                    # Send the response in chunks if it's too long
+                    for i in range(0, len(reply), 2000):
+                        chunk = reply[i:i + 2000]
+                        await message.reply(chunk)
+
+                elif self.model == "gemini-2.0-flash-exp-image-generation":
+                    # Process with image generation capabilities (kept separate)
+                    await self.process_with_image_gen(message, content) # Use original 'content' here for image prompt
+                    return
+
+                elif youtube_urls and self.model not in self.video_capable_models:
+                     # URLs found but model doesn't support video
+                     video_models_str = ", ".join([f"`{m}`" for m in self.video_capable_models])
+                     await message.reply(f"The current model (`{self.model}`) does not support video input. Please switch to a model like {video_models_str} using `/gemini_model` to process videos.")
+                     logging.info(f"User {message.author.id} attempted video processing with non-video model {self.model}")
+
+                elif text_prompt: # Regular text processing if no URLs or model isn't video-capable and there's text
+                    logging.info(f"Processing text input from {message.author.name} ({message.author.id}) with model {self.model}. Text: '{text_prompt}'")
+                    # Add the text message to the memory BEFORE the API call
+                    self.memory[user_id].append({"role": "user", "content": text_prompt})
+
+                    # Use streaming with thoughts for text content
+                    thoughts = ""
+                    answer = ""
+
+                    for chunk in self.client.models.generate_content_stream(
+                        model=self.model,
+                        contents=text_prompt,
+                        config=GenerateContentConfig(
+                            temperature=self.temperature,
+                            max_output_tokens=self.max_tokens,
+                            thinking_config=types.ThinkingConfig(
+                                include_thoughts=True
+                            )
+                        )
+                    ):
+                        for part in chunk.candidates[0].content.parts:
+                            if not part.text:
+                                continue
+                            elif part.thought:
+                                thoughts += part.text
+                            else:
+                                answer += part.text
+
+                    reply = answer.strip() if answer else "The model did not return a text response."
+
+                    # Add the response to memory
+                    self.memory[user_id].append({"role": "assistant", "content": reply})
+
+                    # Trim memory if needed
+                    if len(self.memory[user_id]) > self.memory_limit * 2:
+                        self.memory[user_id] = self.memory[user_id][-self.memory_limit * 2:]
+
+                    logging.info(f"Name:{message.author.name}\n User:{message.author.id}\n Message:{text_prompt}\n Response:{reply}")
+
+                    # Send thoughts summary if available
+                    if thoughts.strip():
+                        thoughts_message = f"**<think>**\n{thoughts.strip()}\n**<\\think>**"
+                        # Send thoughts in chunks if too long
+                        for i in range(0, len(thoughts_message), 2000):
+                            chunk = thoughts_message[i:i + 2000]
                             await message.reply(chunk)
-                            time.sleep(1)
 
-            except Exception as e:
-                # More specific error message
-                await message.reply("An error occurred while processing your request.")
-                logging.error(f"Gemini completion error for user {message.author.id}: {e}", exc_info=True) # Add exc_info to log traceback
+                    # Send the response in chunks if it's too long
+                    for i in range(0, len(reply), 2000):
+                        chunk = reply[i:i + 2000]
+                        await message.reply(chunk)
+                        time.sleep(1)
+
+        except Exception as e:
+            # More specific error message
+            await message.reply("An error occurred while processing your request.")
+            logging.error(f"Gemini completion error for user {message.author.id}: {e}", exc_info=True) # Add exc_info to log traceback
 
     async def process_with_image_gen(self, message, prompt):
         """Process a message with the image generation model, which can return text, images, or both based on the prompt"""
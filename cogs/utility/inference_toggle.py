@@ -9,6 +9,12 @@ class Toggle_llm(commands.Cog):
         self.bot = bot
         self.inference_enabled = True
 
+    async def cog_load(self):
+        self.bot.dispatch("llm_settings_changed")
+
+    async def cog_unload(self):
+        self.bot.dispatch("llm_settings_changed")
+
     @app_commands.command(name="toggle_llm", description="enable or disable.")
     async def toggle_inference(self, interaction: discord.Interaction):
          """Toggles the LLM functionality on or off."""
@@ -22,6 +28,7 @@ class Toggle_llm(commands.Cog):
              logging.error(f"{interaction.user} tried to toggle LLM but was not authorized.")
              return
          self.inference_enabled = not self.inference_enabled
+         self.bot.dispatch("llm_settings_changed")
          status = "enabled" if self.inference_enabled else "disabled"
          await interaction.response.send_message(f"LLM is now {status}.", ephemeral=True)
          logging.info(f"LLM toggled to {status} by {interaction.user}.")
@@ -0,0 +1,244 @@
+# bot/cogs/utility/language_detection.py
+import asyncio
+import collections
+import json
+import logging
+import math
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+from cogs.utility.storage_utils import write_atomic
+
+logger = logging.getLogger(__name__)
+
+HISTORY_VERSION = 1
+SAVE_DELAY_SECONDS = 10
+
+# Scores: a clear local answer needs MIN_SCORE, a lead of MIN_MARGIN over the runner-up, and
+# either an explicit signal (mention, extension, fence) or MIN_KEYWORDS keywords agreeing: one
+# generic word ("channel", "promise") is a hint, not an answer.
+MENTION_WEIGHT = 4.0    # "python", "c++", "golang", ...
+DIRECTED_WEIGHT = 2.0   # extra when it follows "in"/"using"/"to"/...: "port this python to rust"
+EXTENSION_WEIGHT = 3.0  # main.rs, app.js
+FENCE_WEIGHT = 4.0      # ```cpp in the prompt
+KEYWORD_WEIGHT = 1.0    # times the keyword's idf
+HISTORY_WEIGHT = 1.5    # times the learned probability; never enough on its own
+MIN_SCORE = 2.0
+MIN_MARGIN = 2.0
+MIN_KEYWORDS = 2
+
+# Fence tags, extensions and aliases -> the language names CodeGenerator uses.
+LANGUAGE_ALIASES = {
+    "python": "python", "py": "python", "python3": "python",
+    "java": "java",
+    "javascript": "javascript", "js": "javascript", "mjs": "javascript", "node": "javascript",
+    "c": "c", "h": "c",
+    "c++": "c++", "cpp": "c++", "cc": "c++", "cxx": "c++", "hpp": "c++",
+    "rust": "rust", "rs": "rust",
+    "go": "go", "golang": "go",
+    "c#": "c#", "cs": "c#", "csharp": "c#",
+}
+
+_MENTIONS = {
+    "python": r"\bpython\d?\b",
+    "java": r"\bjava\b(?!\s*script)",
+    "javascript": r"\bjavascript\b|\bjs\b|\bnode\.?js\b",
+    "c": r"(?<![\w.-])c(?:89|99|11|17)?(?![\w+#])",
+    "c++": r"c\+\+|\bcpp\b",
+    "rust": r"\brust(?:lang)?\b",
+    "go": r"\bgolang\b|(?<![\w.-])go\b",
+    "c#": r"c#|\bc\s*sharp\b|\bcsharp\b|\bdotnet\b|\.net\b",
+}
+_MENTION_RES = {language: re.compile(pattern) for language, pattern in _MENTIONS.items()}
+_DIRECTED_RE = re.compile(r"\b(?:in|using|with|to|into|write)\s+(?:a\s+|an\s+|the\s+)?$")
+# Bare "c" and "go" are ordinary words; they only count in phrases that name the language.
+_AMBIGUOUS_MENTIONS = {"c", "go"}
+_NAMING_PREFIX_RE = re.compile(r"\b(?:in|using|with|write|ansi|plain|pure)\s+$")
+_NAMING_SUFFIX_RE = re.compile(r"\s+(?:program|code|language|function)\b")
+_EXTENSION_RE = re.compile(r"\b[\w-]+\.(py|js|mjs|java|c|h|cpp|cc|cxx|hpp|rs|go|cs)\b")
+_FENCE_RE = re.compile(r"```([\w+#]+)")
+_TOKEN_RE = re.compile(r"[a-z][a-z0-9+#]{2,}")
+
+# Terms that point at a language without naming it. Terms listed under several languages get a
+# lower idf, so "pointer" counts for less than "malloc".
+_KEYWORDS = {
+    "python": ["def", "pip", "pandas", "numpy", "django", "flask", "pytest", "matplotlib", "list comprehension",
+               "dataclass", "pygame", "tkinter", "jupyter", "scipy", "dictionary", "decorator"],
+    "javascript": ["npm", "react", "dom", "browser", "express", "promise", "vue", "frontend", "webpage",
+                   "document.getelementbyid", "console.log", "json", "async/await"],
+    "java": ["jvm", "spring", "arraylist", "hashmap", "maven", "gradle", "public static void", "junit",
+             "android", "servlet", "class"],
+    "c": ["malloc", "printf", "pointer", "struct", "stdio", "header file", "segfault", "embedded",
+          "microcontroller", "bitwise"],
+    "c++": ["std::", "stl", "vector", "template", "iostream", "cout", "smart pointer", "unique_ptr", "raii",
+            "operator overloading", "class", "pointer", "struct"],
+    "rust": ["cargo", "crate", "borrow checker", "ownership", "lifetime", "tokio", "trait", "unsafe", "async/await"],
+    "go": ["goroutine", "goroutines", "channel", "gin", "go mod", "defer", "gofmt", "interface{}"],
+    "c#": ["linq", "unity", "asp.net", "nuget", "wpf", "winforms", "monobehaviour", "class", "async/await"],
+}
+
+
+def _term_re(term: str):
+    left = r"\b" if term[0].isalnum() else ""
+    right = r"\b" if term[-1].isalnum() else ""
+    return re.compile(left + re.escape(term) + right)
+
+
+def _keyword_table():
+    document_frequency = collections.Counter(term for terms in _KEYWORDS.values() for term in set(terms))
+    return [
+        (language, _term_re(term), math.log(1 + len(_KEYWORDS) / document_frequency[term]))
+        for language, terms in _KEYWORDS.items() for term in terms
+    ]
+
+
+_KEYWORD_TABLE = _keyword_table()
+_STOPWORDS = frozenset(
+    "the and that this with for from into using write program code function make create that takes returns "
+    "which what will should can a an of to in on it is be prints print".split()
+)
+
+
+def tokens(text: str) -> List[str]:
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in _STOPWORDS]
+
+
+class Detection:
+    def __init__(self, language: Optional[str], scores: Dict[str, float], reasons: List[str]):
+        self.language = language
+        self.scores = scores
+        self.reasons = reasons
+
+    @property
+    def confident(self) -> bool:
+        return self.language is not None
+
+
+class LanguageHistory:
+    """Which language past prompts ended up in, by word: a tiny learned prior for detection.
+
+    Counts are kept for the `maxsize` most recently seen words and persisted (debounced) to a
+    JSON file, so it keeps learning across restarts.
+    """
+
+    def __init__(self, path: Optional[str] = None, maxsize: int = 5000):
+        self.path = os.path.abspath(path) if path else None
+        self.maxsize = maxsize
+        self._counts: "collections.OrderedDict[str, Dict[str, int]]" = collections.OrderedDict()
+        self._save_task: Optional[asyncio.Task] = None
+
+    def observe(self, prompt: str, language: str):
+        for token in set(tokens(prompt)):
+            counts = self._counts.pop(token, {})
+            counts[language] = counts.get(language, 0) + 1
+            self._counts[token] = counts
+        while len(self._counts) > self.maxsize:
+            self._counts.popitem(last=False)
+        self.schedule_save()
+
+    def scores(self, prompt: str) -> Dict[str, float]:
+        """Average, over the prompt's known words, of P(language | word)."""
+        totals: Dict[str, float] = collections.defaultdict(float)
+        known = 0
+        for token in set(tokens(prompt)):
+            counts = self._counts.get(token)
+            if not counts:
+                continue
+            known += 1
+            seen = sum(counts.values())
+            for language, count in counts.items():
+                totals[language] += count / seen
+        return {language: total / known for language, total in totals.items()} if known else {}
+
+    # --- Persistence ---
+
+    async def load(self):
+        if not self.path:
+            return
+        try:
+            data = await asyncio.to_thread(self._read)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable language history {self.path}: {e}")
+            return
+        if data.get("version") == HISTORY_VERSION:
+            self._counts = collections.OrderedDict(data.get("counts", []))
+            logger.info(f"Loaded language history for {len(self._counts)} words from {self.path}")
+
+    def _read(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def schedule_save(self):
+        if not self.path:
+            return
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.create_task(self._save_later())
+
+    async def _save_later(self):
+        await asyncio.sleep(SAVE_DELAY_SECONDS)
+        await self.save()
+
+    async def save(self):
+        if not self.path:
+            return
+        payload = json.dumps({"version": HISTORY_VERSION, "counts": list(self._counts.items())})
+        try:
+            await asyncio.to_thread(write_atomic, self.path, payload)
+        except OSError as e:
+            logger.error(f"Failed to save language history: {e}")
+
+    async def close(self):
+        """Flush a pending debounced save."""
+        if self._save_task and not self._save_task.done():
+            self._save_task.cancel()
+            await self.save()
+
+
+def detect_language(prompt: str, history: Optional[LanguageHistory] = None) -> Detection:
+    """Score each language from what the prompt says; `language` is None unless one clearly wins."""
+    text = prompt.lower()
+    scores: Dict[str, float] = collections.defaultdict(float)
+    reasons: List[str] = []
+
+    explicit = set()
+    keyword_hits: Dict[str, int] = collections.defaultdict(int)
+
+    for language, pattern in _MENTION_RES.items():
+        for match in pattern.finditer(text):
+            before = text[:match.start()]
+            if match.group() in _AMBIGUOUS_MENTIONS and not (
+                    _NAMING_PREFIX_RE.search(before) or _NAMING_SUFFIX_RE.match(text, match.end())):
+                continue
+            directed = bool(_DIRECTED_RE.search(before))
+            scores[language] += MENTION_WEIGHT + (DIRECTED_WEIGHT if directed else 0)
+            explicit.add(language)
+            reasons.append(f"mentions {language}")
+            break
+    for extension in set(_EXTENSION_RE.findall(text)):
+        scores[LANGUAGE_ALIASES[extension]] += EXTENSION_WEIGHT
+        explicit.add(LANGUAGE_ALIASES[extension])
+        reasons.append(f".{extension} file")
+    for tag in set(_FENCE_RE.findall(text)):
+        if tag in LANGUAGE_ALIASES:
+            scores[LANGUAGE_ALIASES[tag]] += FENCE_WEIGHT
+            explicit.add(LANGUAGE_ALIASES[tag])
+            reasons.append(f"```{tag} block")
+    for language, pattern, idf in _KEYWORD_TABLE:
+        if pattern.search(text):
+            scores[language] += KEYWORD_WEIGHT * idf
+            keyword_hits[language] += 1
+    if history is not None:
+        for language, probability in history.scores(prompt).items():
+            scores[language] += HISTORY_WEIGHT * probability
+
+    ranked: List[Tuple[str, float]] = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    if not ranked:
+        return Detection(None, {}, reasons)
+    best, best_score = ranked[0]
+    runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+    confident = (best_score >= MIN_SCORE and best_score - runner_up >= MIN_MARGIN
+                 and (best in explicit or keyword_hits[best] >= MIN_KEYWORDS))
+    return Detection(best if confident else None, dict(scores), reasons)
@@ -0,0 +1,243 @@
+# bot/cogs/utility/log_pipeline.py
+import atexit
+import gzip
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+MAX_BATCH_RECORDS = 512  # records written with one write + flush
+ROTATE_WHEN = {"": None, "hour": timedelta(hours=1), "midnight": timedelta(days=1)}
+
+
+class RateLimitFilter(logging.Filter):
+    """Keep a `sample` fraction of records, then at most `per_second` of those (bursts of up to
+    `burst`). Dropped records are counted and reported on the next one that gets through.
+    Warnings and errors always pass."""
+
+    def __init__(self, per_second: float = 0, burst: int = 0, sample: float = 1.0):
+        super().__init__()
+        self.per_second = per_second
+        self.burst = max(burst, 1)
+        self.sample = sample
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._sample_credit = 0.0
+        self._dropped = 0
+        self._lock = threading.Lock()  # loggers are also used from executor threads
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        with self._lock:
+            if self.sample < 1:
+                # Deterministic: 0.25 keeps exactly every 4th record.
+                self._sample_credit += self.sample
+                if self._sample_credit < 1:
+                    self._dropped += 1
+                    return False
+                self._sample_credit -= 1
+            if self.per_second > 0:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.per_second)
+                self._last = now
+                if self._tokens < 1:
+                    self._dropped += 1
+                    return False
+                self._tokens -= 1
+            dropped, self._dropped = self._dropped, 0
+        if dropped:
+            record.msg = f"{record.getMessage()} ({dropped} similar records dropped)"
+            record.args = None
+        return True
+
+
+class CompressingRotatingFileHandler(logging.Handler):
+    """Appends to `path`, rotating it once it would grow past `max_bytes` and/or when the `when`
+    period ("hour", "midnight") ends. Rotated files get a timestamp suffix, are gzipped if
+    `compress`, and only the newest `backup_count` are kept.
+
+    Meant to run on the listener thread: `emit_batch` writes a whole batch with one write and one
+    flush, instead of a flush per record like logging.FileHandler.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 0, when: str = "", backup_count: int = 0, compress: bool = True):
+        super().__init__()
+        if when not in ROTATE_WHEN:
+            raise ValueError(f"Unknown log rotation period {when!r}, expected one of {', '.join(map(repr, ROTATE_WHEN))}")
+        self.path = os.path.abspath(path)
+        self.max_bytes = max_bytes
+        self.period = ROTATE_WHEN[when]
+        self.backup_count = backup_count
+        self.compress = compress
+        self._stream = None
+        self._size = 0
+        self._rollover_at = self._next_rollover(datetime.now())
+
+    def _next_rollover(self, now: datetime) -> Optional[float]:
+        if self.period is None:
+            return None
+        start = now.replace(minute=0, second=0, microsecond=0)
+        if self.period >= timedelta(days=1):
+            start = start.replace(hour=0)
+        return (start + self.period).timestamp()
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._stream = open(self.path, "ab", buffering=64 * 1024)
+        self._size = self._stream.tell()
+
+    def _should_rollover(self, incoming: int) -> bool:
+        if self._rollover_at is not None and time.time() >= self._rollover_at:
+            return True
+        return bool(self.max_bytes) and self._size > 0 and self._size + incoming > self.max_bytes
+
+    def _rollover(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+        self._rollover_at = self._next_rollover(datetime.now())
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return
+        rotated = f"{self.path}.{datetime.now():%Y-%m-%d_%H%M%S}"
+        suffix = ".gz" if self.compress else ""
+        n = 1
+        base = rotated
+        while os.path.exists(rotated) or os.path.exists(rotated + suffix):
+            rotated = f"{base}.{n}"
+            n += 1
+        os.replace(self.path, rotated)
+        if self.compress:
+            with open(rotated, "rb") as src, gzip.open(rotated + ".gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(rotated)
+        self._remove_old_backups()
+
+    def _remove_old_backups(self):
+        if self.backup_count <= 0:
+            return
+        directory, name = os.path.split(self.path)
+        backups = [os.path.join(directory, f) for f in os.listdir(directory) if f.startswith(name + ".")]
+        backups.sort(key=os.path.getmtime)
+        for old in backups[:-self.backup_count]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+    def emit_batch(self, records: List[logging.LogRecord]):
+        try:
+            data = "".join(self.format(record) + "\n" for record in records).encode("utf-8", "backslashreplace")
+            if self._should_rollover(len(data)):
+                self._rollover()
+            if self._stream is None:
+                self._open()
+            self._stream.write(data)
+            self._stream.flush()
+            self._size += len(data)
+        except Exception:
+            self.handleError(records[-1])
+
+    def emit(self, record: logging.LogRecord):
+        self.emit_batch([record])
+
+    def close(self):
+        self.acquire()
+        try:
+            if self._stream is not None:
+                self._stream.close()
+                self._stream = None
+        finally:
+            self.release()
+            super().close()
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """QueueListener that drains everything already queued (up to MAX_BATCH_RECORDS) before
+    handing it on, so handlers with `emit_batch` do one disk write per batch. Under load batches
+    grow; when idle each record is still written as soon as it arrives."""
+
+    def handle_batch(self, records: List[logging.LogRecord]):
+        for handler in self.handlers:
+            accepted = [r for r in records if not self.respect_handler_level or r.levelno >= handler.level]
+            if not hasattr(handler, "emit_batch"):
+                for record in accepted:
+                    handler.handle(record)
+                continue
+            accepted = [r for r in accepted if handler.filter(r)]
+            if accepted:
+                handler.acquire()
+                try:
+                    handler.emit_batch(accepted)
+                finally:
+                    handler.release()
+
+    def _monitor(self):
+        q = self.queue
+        while True:
+            batch = [self.dequeue(True)]
+            while len(batch) < MAX_BATCH_RECORDS and batch[-1] is not self._sentinel:
+                try:
+                    batch.append(q.get_nowait())
+                except queue.Empty:
+                    break
+            stop = batch[-1] is self._sentinel
+            records = [self.prepare(r) for r in batch if r is not self._sentinel]
+            if records:
+                self.handle_batch(records)
+            if stop:
+                break
+
+    def stop(self):
+        if self._thread is not None:  # also called at exit, after an explicit stop
+            super().stop()
+
+
+def setup_logging(config: Dict[str, Any], log_file_path: str) -> BatchingQueueListener:
+    """Route all logging through a queue to a background thread that writes the file (and console).
+
+    On the event loop a log call only builds the record and puts it on the queue; formatting,
+    disk writes, rotation and compression happen on the listener thread. `config` is the
+    `logging:` section of config.yml. Returns the started listener; it is stopped (and the
+    queue flushed) at exit.
+    """
+    formatter = logging.Formatter(LOG_FORMAT)
+    file_handler = CompressingRotatingFileHandler(
+        log_file_path,
+        max_bytes=int(float(config.get("max_file_mb", 0)) * 1024 * 1024),
+        when=config.get("rotate_when") or "",
+        backup_count=int(config.get("backup_count", 0)),
+        compress=config.get("compress", True),
+    )
+    file_handler.setFormatter(formatter)
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(config.get("console_level", "INFO"))
+    console_handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()  # unbounded: a log call never blocks the event loop
+    listener = BatchingQueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(config.get("level", "INFO"))
+
+    for name, level in (config.get("levels") or {}).items():
+        logging.getLogger(name).setLevel(level)
+    for name, limit in (config.get("rate_limits") or {}).items():
+        logging.getLogger(name).addFilter(RateLimitFilter(
+            per_second=float(limit.get("per_second", 0)),
+            burst=int(limit.get("burst", 0)),
+            sample=float(limit.get("sample", 1.0)),
+        ))
+
+    listener.start()
+    atexit.register(listener.stop)  # runs before logging's own atexit shutdown
+    return listener
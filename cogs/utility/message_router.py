@@ -0,0 +1,102 @@
+# cogs/utility/message_router.py
+from discord.ext import commands
+import logging
+
+
+class MessageRouter(commands.Cog):
+    """The bot's only on_message listener.
+
+    Other cogs register with it instead of listening themselves:
+    - observers see every message (e.g. the message log) and must be cheap, non-async functions
+    - LLM handlers, one per provider, get messages that mention or reply to the bot; only the
+      selected provider's handler is called, and none while the LLM is toggled off
+    - triggers get other messages containing a keyword
+
+    Each message goes to at most one handler. Which LLM handler that is comes from a snapshot of
+    the Toggle_llm/ProviderSelector settings, refreshed when they dispatch `llm_settings_changed`,
+    so messages that don't concern the bot cost a few attribute checks.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._observers = []
+        self._triggers = []  # (lowercase keyword, handler)
+        self._llm_handlers = {}  # provider -> handler
+        self._llm_handler = None  # snapshot: the selected provider's handler, None if disabled
+        prefix = bot.command_prefix
+        # Commands are handled by the bot itself; a callable prefix can't be checked up front.
+        self._command_prefixes = (prefix,) if isinstance(prefix, str) else tuple(prefix) if isinstance(prefix, (list, tuple)) else ()
+
+    # --- Registration ---
+
+    def add_observer(self, handler):
+        self._observers.append(handler)
+
+    def add_trigger(self, keyword, handler):
+        self._triggers.append((keyword.lower(), handler))
+
+    def add_llm_handler(self, provider, handler):
+        self._llm_handlers[provider] = handler
+        self.refresh_settings()
+
+    def remove(self, handler):
+        """Forget a handler, whichever way it was registered (for cog_unload)."""
+        self._observers = [h for h in self._observers if h != handler]
+        self._triggers = [(k, h) for k, h in self._triggers if h != handler]
+        self._llm_handlers = {p: h for p, h in self._llm_handlers.items() if h != handler}
+        self.refresh_settings()
+
+    def refresh_settings(self):
+        toggle = self.bot.get_cog("Toggle_llm")
+        selector = self.bot.get_cog("ProviderSelector")
+        enabled = toggle is not None and toggle.is_inference_enabled()
+        provider = selector.get_current_provider() if selector is not None else None
+        self._llm_handler = self._llm_handlers.get(provider) if enabled else None
+
+    @commands.Cog.listener()
+    async def on_llm_settings_changed(self):
+        self.refresh_settings()
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        self.refresh_settings()
+
+    # --- Dispatch ---
+
+    def addressed_to_bot(self, message):
+        user = self.bot.user
+        if user in message.mentions:
+            return True
+        reference = message.reference
+        resolved = reference.resolved if reference is not None else None
+        return resolved is not None and getattr(resolved, "author", None) == user
+
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        for observer in self._observers:
+            try:
+                observer(message)
+            except Exception as e:
+                logging.error(f"Message observer {observer.__qualname__} failed: {e}")
+
+        if message.author.bot or message.content.startswith(self._command_prefixes):
+            return
+
+        if self._llm_handler is not None and self.addressed_to_bot(message):
+            handler = self._llm_handler
+        else:
+            handler = None
+            if self._triggers:
+                content = message.content.lower()
+                handler = next((h for keyword, h in self._triggers if keyword in content), None)
+            if handler is None:
+                return
+
+        try:
+            await handler(message)
+        except Exception as e:
+            logging.error(f"Message handler {handler.__qualname__} failed: {e}")
+
+async def setup(bot):
+    logging.info("setting up the message router cog...")
+    await bot.add_cog(MessageRouter(bot))
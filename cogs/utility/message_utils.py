@@ -0,0 +1,47 @@
+# cogs/utility/message_utils.py
+import re
+from typing import List
+
+DISCORD_MESSAGE_LIMIT = 2000
+
+_FENCE_RE = re.compile(r"^```(\S*)", re.MULTILINE)
+
+
+def _open_fence(text: str):
+    """Return the language tag of a code fence left open at the end of `text`, or None."""
+    open_lang = None
+    for match in _FENCE_RE.finditer(text):
+        open_lang = None if open_lang is not None else match.group(1)
+    return open_lang
+
+
+def split_message(text: str, max_length: int = DISCORD_MESSAGE_LIMIT) -> List[str]:
+    """Split text into chunks that fit in a Discord message.
+
+    Prefers breaking on a newline in the second half of the chunk, and when a break lands inside
+    a ``` code block the block is closed and reopened (same language) in the next chunk.
+    """
+    chunks = []
+    remaining_text = text
+    reopen = ""
+    while remaining_text:
+        remaining_text = reopen + remaining_text
+        if len(remaining_text) <= max_length:
+            chunks.append(remaining_text)
+            break
+        # Leave room to close a code block.
+        limit = max_length - 4
+        split_at = remaining_text.rfind('\n', 0, limit)
+        if split_at == -1 or split_at < limit // 2:
+            split_at = limit
+        chunk = remaining_text[:split_at]
+        remaining_text = remaining_text[split_at:].lstrip('\n') if split_at < len(remaining_text) else ""
+        fence_lang = _open_fence(chunk)
+        if fence_lang is not None:
+            chunk += "\n```"
+            reopen = f"```{fence_lang}\n"
+        else:
+            reopen = ""
+            remaining_text = remaining_text.lstrip()
+        chunks.append(chunk)
+    return chunks
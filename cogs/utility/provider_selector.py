@@ -10,6 +10,12 @@ class ProviderSelector(commands.Cog):
         self.current_provider = "groq"  # Default provider
         self.available_providers = ["groq", "gemini"]
 
+    async def cog_load(self):
+        self.bot.dispatch("llm_settings_changed")
+
+    async def cog_unload(self):
+        self.bot.dispatch("llm_settings_changed")
+
     @app_commands.command(name="select_provider", description="Select which LLM provider to use (groq or gemini)")
     async def select_provider(self, interaction: discord.Interaction, provider: str):
         """Select which LLM provider to use"""
@@ -33,6 +39,7 @@ class ProviderSelector(commands.Cog):
             return
 
         self.current_provider = provider
+        self.bot.dispatch("llm_settings_changed")
         await interaction.response.send_message(f"LLM provider changed to: {provider}", ephemeral=True)
         logging.info(f"LLM provider changed to {provider} by {interaction.user.name} ({interaction.user.id})")
 
@@ -0,0 +1,219 @@
+# bot/cogs/utility/recurrence.py
+import bisect
+import functools
+import math
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+import pytz
+
+MIN_INTERVAL_SECONDS = 60
+# A cron expression that matches nothing this far ahead (e.g. "0 0 31 2 *") never fires.
+CRON_SEARCH_YEARS = 5
+
+CRON_MACROS = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+}
+_MONTH_NAMES = {name: i for i, name in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], start=1)}
+_WEEKDAY_NAMES = {name: i for i, name in enumerate(["sun", "mon", "tue", "wed", "thu", "fri", "sat"])}
+# (name, lowest, highest, names) of the five cron fields
+_CRON_FIELDS = [
+    ("minute", 0, 59, {}),
+    ("hour", 0, 23, {}),
+    ("day of month", 1, 31, {}),
+    ("month", 1, 12, _MONTH_NAMES),
+    ("day of week", 0, 7, _WEEKDAY_NAMES),  # 0 and 7 are both Sunday
+]
+
+
+def format_duration(seconds: float) -> str:
+    """3600 -> '1h', 93784 -> '1d 2h 3m 4s'."""
+    seconds = int(seconds)
+    parts = []
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60), ("s", 1)):
+        if seconds >= size:
+            parts.append(f"{seconds // size}{unit}")
+            seconds %= size
+    return " ".join(parts) or "0s"
+
+
+def _parse_cron_field(text: str, name: str, lowest: int, highest: int, names) -> List[int]:
+    def value(token: str) -> int:
+        token = token.lower()
+        if token in names:
+            return names[token]
+        if not token.isdigit():
+            raise ValueError(f"'{token}' is not a valid {name}")
+        number = int(token)
+        if not lowest <= number <= highest:
+            raise ValueError(f"{name} {number} is out of range {lowest}-{highest}")
+        return number
+
+    values = set()
+    for part in text.split(","):
+        span, _, step_text = part.partition("/")
+        step = 1
+        if step_text:
+            if not step_text.isdigit() or int(step_text) == 0:
+                raise ValueError(f"'{step_text}' is not a valid step for {name}")
+            step = int(step_text)
+        if span == "*":
+            start, end = lowest, highest
+        elif "-" in span:
+            start_text, _, end_text = span.partition("-")
+            start, end = value(start_text), value(end_text)
+            if start > end:
+                raise ValueError(f"{name} range {span} runs backwards")
+        else:
+            start = value(span)
+            end = highest if step_text else start
+        values.update(range(start, end + 1, step))
+    return sorted(values)
+
+
+class IntervalRecurrence:
+    """Every N seconds, anchored to the first due time. Whole-day intervals keep their local
+    wall-clock time across DST changes instead of drifting by an hour."""
+
+    def __init__(self, seconds: int, timezone):
+        if seconds < MIN_INTERVAL_SECONDS:
+            raise ValueError(f"Repeat interval must be at least {format_duration(MIN_INTERVAL_SECONDS)}.")
+        self.seconds = seconds
+        self.timezone = timezone
+
+    @property
+    def spec(self) -> str:
+        return f"every:{self.seconds}"
+
+    def describe(self) -> str:
+        return f"every {format_duration(self.seconds)}"
+
+    def next_after(self, previous: float, now: float) -> float:
+        """The first occurrence after `now` in the series through `previous`: O(1), however many
+        occurrences were missed."""
+        steps = max(1, math.floor((now - previous) / self.seconds) + 1)
+        if self.seconds % 86400:
+            return previous + steps * self.seconds
+        start = datetime.fromtimestamp(previous, self.timezone).replace(tzinfo=None)
+        days = self.seconds // 86400
+        steps = max(1, steps - 1)  # a 25-hour DST day can make the estimate one too far
+        while True:
+            candidate = _localize(self.timezone, start + timedelta(days=steps * days))
+            if candidate > now:
+                return candidate
+            steps += 1
+
+
+class CronRecurrence:
+    """Standard five-field cron (minute hour day-of-month month day-of-week) in a time zone.
+
+    The next fire time is found by jumping field by field (to the next allowed month, day, hour,
+    minute) rather than testing every minute, so it costs a handful of steps per fire.
+    """
+
+    def __init__(self, expression: str, timezone):
+        self.expression = " ".join(expression.split())
+        fields = CRON_MACROS.get(self.expression.lower(), self.expression).split()
+        if len(fields) != 5:
+            raise ValueError("A cron expression needs 5 fields: minute hour day-of-month month day-of-week.")
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            _parse_cron_field(text, *field) for text, field in zip(fields, _CRON_FIELDS)
+        )
+        self.weekdays = sorted({day % 7 for day in weekdays})
+        # Like cron: if both day fields are restricted, a day matching either one counts.
+        self.days_restricted = not fields[2].startswith("*")
+        self.weekdays_restricted = not fields[4].startswith("*")
+        self.timezone = timezone
+        if self.next_after(0, datetime.now(pytz.utc).timestamp()) is None:
+            raise ValueError(f"`{self.expression}` never fires.")
+
+    @property
+    def spec(self) -> str:
+        return f"cron:{self.expression}"
+
+    def describe(self) -> str:
+        return f"cron `{self.expression}`"
+
+    def _day_matches(self, day: datetime) -> bool:
+        in_days = day.day in self.days
+        in_weekdays = (day.weekday() + 1) % 7 in self.weekdays  # cron counts from Sunday
+        if self.days_restricted and self.weekdays_restricted:
+            return in_days or in_weekdays
+        return in_days and in_weekdays
+
+    def next_after(self, previous: float, now: float) -> Optional[float]:
+        after = max(previous, now)
+        local = datetime.fromtimestamp(after, self.timezone).replace(tzinfo=None, second=0, microsecond=0)
+        local += timedelta(minutes=1)
+        limit = local + timedelta(days=366 * CRON_SEARCH_YEARS)
+        while local < limit:
+            if local.month not in self.months:
+                i = bisect.bisect_right(self.months, local.month)
+                year, month = (local.year, self.months[i]) if i < len(self.months) else (local.year + 1, self.months[0])
+                local = datetime(year, month, 1)
+                continue
+            if not self._day_matches(local):
+                local = datetime(local.year, local.month, local.day) + timedelta(days=1)
+                continue
+            if local.hour not in self.hours:
+                i = bisect.bisect_right(self.hours, local.hour)
+                if i < len(self.hours):
+                    local = local.replace(hour=self.hours[i], minute=0)
+                else:
+                    local = datetime(local.year, local.month, local.day) + timedelta(days=1)
+                continue
+            if local.minute not in self.minutes:
+                i = bisect.bisect_right(self.minutes, local.minute)
+                if i < len(self.minutes):
+                    local = local.replace(minute=self.minutes[i])
+                else:
+                    local = local.replace(minute=0) + timedelta(hours=1)
+                continue
+            fire_at = _localize(self.timezone, local)
+            if fire_at > after:
+                return fire_at
+            local += timedelta(minutes=1)
+        return None
+
+
+def _localize(timezone, local: datetime) -> float:
+    """Unix time of a wall-clock time in `timezone`. Times skipped by a DST change run after the
+    jump (02:30 -> 03:30) rather than not at all; repeated ones run the first time round."""
+    try:
+        return timezone.localize(local, is_dst=None).timestamp()
+    except pytz.NonExistentTimeError:
+        return timezone.localize(local, is_dst=False).timestamp()
+    except pytz.AmbiguousTimeError:
+        return timezone.localize(local, is_dst=True).timestamp()
+
+
+def get_timezone(name: Optional[str]):
+    """pytz zone by name (case-insensitive); raises ValueError for unknown names."""
+    if not name:
+        return pytz.utc
+    try:
+        return pytz.timezone(name)
+    except pytz.UnknownTimeZoneError:
+        match = next((zone for zone in pytz.all_timezones if zone.lower() == name.lower()), None)
+        if match is None:
+            raise ValueError(f"Unknown time zone '{name}'. Use a name like Europe/Berlin or America/New_York.")
+        return pytz.timezone(match)
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_recurrence(spec: str, timezone_name: Optional[str] = None):
+    """Rebuild a recurrence from its stored `spec`. Cached: most reminders share a few specs."""
+    kind, _, value = spec.partition(":")
+    timezone = get_timezone(timezone_name)
+    if kind == "every":
+        return IntervalRecurrence(int(value), timezone)
+    if kind == "cron":
+        return CronRecurrence(value, timezone)
+    raise ValueError(f"Unknown recurrence '{spec}'")
@@ -1,66 +1,264 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-import asyncio
 import re
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone
 import logging
+import pytz
+import yaml
+from typing import List, Optional
+
+from cogs.utility.message_utils import split_message
+from cogs.utility.recurrence import format_duration, get_timezone, parse_recurrence
+from cogs.utility.reminder_scheduler import ReminderScheduler
+from cogs.utility.reminder_store import ReminderStore
+
+REMINDER_LIST_LIMIT = 25
+REMINDER_LATE_SECONDS = 60  # delivered later than this, it was missed while the bot was offline
+REMINDER_RETRY_SECONDS = 600  # a reminder that couldn't be sent is retried this often...
+REMINDER_RETRY_FOR_SECONDS = 86400  # ...until this long after it was due
+
+def utc_now():
+    return datetime.now(timezone.utc).timestamp()
+
+def parse_duration(time):
+    """'2d 6h', '1 second', ... -> (timedelta, None), or (None, error message)."""
+    time_regex = re.compile(r"(\d+)\s*(s|sec|seconds|m|min|minutes|h|hour|hours|d|day|days)")
+    time_parts = time.split()
+    delta = timedelta()
+    valid_units = ["s", "sec", "seconds", "m", "min", "minutes", "h", "hour", "hours", "d", "day", "days"]
+    i = 0
+    while i < len(time_parts):
+        match = time_regex.match(time_parts[i])
+        if not match:
+            if i + 1 < len(time_parts) and time_parts[i + 1].lower() in valid_units:
+                combined_part = time_parts[i] + time_parts[i + 1]
+                match = time_regex.match(combined_part)
+                if match:
+                    i += 1
+                else:
+                    return None, f"Invalid time format in '{time_parts[i]}'. Please use a valid format like '1h', '30m', '2d 6h', '1 second'."
+            else:
+                return None, f"Invalid time format in '{time_parts[i]}'. Please use a valid format like '1h', '30m', '2d 6h', '1 second'."
+
+        time_amount = int(match.group(1))
+        time_unit = match.group(2).lower()
+
+        if time_unit not in valid_units:
+            return None, f"Invalid time unit '{time_unit}'. Please use s/m/h/d or their full names."
+
+        if time_unit in ("s", "sec", "seconds"):
+            delta += timedelta(seconds=time_amount)
+        elif time_unit in ("m", "min", "minutes"):
+            delta += timedelta(minutes=time_amount)
+        elif time_unit in ("h", "hour", "hours"):
+            delta += timedelta(hours=time_amount)
+        elif time_unit in ("d", "day", "days"):
+            delta += timedelta(days=time_amount)
+
+        i += 1
+    return delta, None
 
 class Reminder(commands.Cog):
+    reminders = app_commands.Group(name="reminders", description="Your pending reminders.")
+
     def __init__(self, bot):
         self.bot = bot
+        with open('config/config.yml', 'r') as file:
+            config = yaml.safe_load(file)
+        self.store = ReminderStore(config.get("reminder_db_path") or "reminders.db")
+        self.default_timezone = config.get("reminder_default_timezone") or "UTC"
+        # Reminders wait in the database plus one heap entry each; a single task fires them.
+        self.scheduler = ReminderScheduler(self.deliver)
+        self.retrying = {}  # reminder id -> when it was first due, while its sends keep failing
+
+    async def cog_load(self):
+        self.scheduler.load(await self.store.schedule())
+        logging.info(f"Loaded {len(self.scheduler)} pending reminders")
+        # Anything already due (missed while offline) fires as soon as the bot is ready.
+        self.scheduler.start(self.bot.wait_until_ready)
+
+    async def cog_unload(self):
+        await self.scheduler.stop()
+        await self.store.close()
+
+    async def deliver(self, reminder_id, due_at):
+        reminder = await self.store.get(reminder_id)
+        if reminder is None:
+            self.retrying.pop(reminder_id, None)  # cancelled while its delivery was in flight
+            return
+        now = utc_now()
+        text = f"<@{reminder['user_id']}> ⏰ Reminder: {reminder['message']}"
+        if reminder_id in self.retrying:
+            # A retry after a failed send: rescheduled, but it reports when it was first due.
+            due_at = self.retrying[reminder_id]
+            text += f"\n-# This was due <t:{int(due_at)}:R>, but I couldn't send it then."
+        elif now - due_at > REMINDER_LATE_SECONDS:
+            text += f"\n-# This was due <t:{int(due_at)}:R>, while I was offline."
+        sent = await self.send(reminder, text)
+        if sent:
+            logging.info(f"User:{reminder['user_id']} - Reminder: {reminder['message']}")
+        elif sent is None:
+            logging.error(f"Reminder {reminder_id}: neither its channel nor user {reminder['user_id']} is reachable, dropping it")
+
+        if reminder["recurrence"] and sent is not None:
+            self.retrying.pop(reminder_id, None)
+            # Back into the heap at its next time: one push, no rescan of the other reminders.
+            # Occurrences missed while offline collapse into the one just sent.
+            try:
+                next_due = parse_recurrence(reminder["recurrence"], reminder["timezone"]).next_after(due_at, now)
+            except ValueError as e:
+                logging.error(f"Reminder {reminder_id} has an invalid recurrence {reminder['recurrence']!r}: {e}")
+                next_due = None
+            if next_due is not None:
+                await self.store.reschedule(reminder_id, next_due)
+                self.scheduler.schedule(reminder_id, next_due)
+                return
+        elif sent is False:
+            if now - due_at < REMINDER_RETRY_FOR_SECONDS:
+                # Keep it and try again later (permissions fixed, DMs opened, Discord back up).
+                self.retrying[reminder_id] = due_at
+                retry_at = now + REMINDER_RETRY_SECONDS
+                await self.store.reschedule(reminder_id, retry_at)
+                self.scheduler.schedule(reminder_id, retry_at)
+                return
+            logging.error(f"Reminder {reminder_id}: still undeliverable {format_duration(now - due_at)} after it was due, dropping it")
+        self.retrying.pop(reminder_id, None)
+        await self.store.delete(reminder_id)
+
+    async def send(self, reminder, text):
+        """Send to the channel the reminder was set in, or the user's DMs if that is gone or fails.
+
+        Returns True once sent, False if sending failed, None if neither the channel nor the user exists anymore.
+        """
+        channel = None
+        if reminder["channel_id"]:
+            channel = self.bot.get_channel(reminder["channel_id"])
+            if channel is None:
+                try:
+                    channel = await self.bot.fetch_channel(reminder["channel_id"])
+                except discord.HTTPException:
+                    channel = None
+            if channel is not None:
+                try:
+                    await channel.send(text)
+                    return True
+                except discord.HTTPException as e:
+                    logging.warning(f"Failed to send reminder {reminder['id']} to channel {reminder['channel_id']}, trying DMs: {e}")
+        user = self.bot.get_user(reminder["user_id"])
+        if user is None:
+            try:
+                user = await self.bot.fetch_user(reminder["user_id"])
+            except discord.HTTPException:
+                return False if channel is not None else None
+        try:
+            await user.send(text)
+            return True
+        except discord.HTTPException as e:
+            logging.error(f"Failed to send reminder {reminder['id']} to user {reminder['user_id']}: {e}")
+            return False
 
     @app_commands.command(name="reminder", description="Set a reminder.")
     async def reminder(self, interaction: discord.Interaction, time: str, *, message: str):
         await interaction.response.defer()
-        time_regex = re.compile(r"(\d+)\s*(s|sec|seconds|m|min|minutes|h|hour|hours|d|day|days)")
-        time_parts = time.split()
-        delta = timedelta()
-        valid_units = ["s", "sec", "seconds", "m", "min", "minutes", "h", "hour", "hours", "d", "day", "days"]
-        i = 0
-        while i < len(time_parts):
-            match = time_regex.match(time_parts[i])
-            if not match:
-                if i + 1 < len(time_parts) and time_parts[i + 1].lower() in valid_units:
-                    combined_part = time_parts[i] + time_parts[i + 1]
-                    match = time_regex.match(combined_part)
-                    if match:
-                        i += 1
-                    else:
-                        await interaction.followup.send(f"Invalid time format in '{time_parts[i]}'. Please use a valid format like '1h', '30m', '2d 6h', '1 second'.", ephemeral=True)
-                        logging.error(f"User: {interaction.user} - Error: Invalid time format in '{time_parts[i]}'.")
-                        return
-                else:
-                    await interaction.followup.send(f"Invalid time format in '{time_parts[i]}'. Please use a valid format like '1h', '30m', '2d 6h', '1 second'.", ephemeral=True)
-                    logging.error(f"User: {interaction.user} - Error: Invalid time format in '{time_parts[i]}'.")
-                    return
+        delta, error = parse_duration(time)
+        if error:
+            await interaction.followup.send(error, ephemeral=True)
+            logging.error(f"User: {interaction.user} - Error: {error}")
+            return
 
-            time_amount = int(match.group(1))
-            time_unit = match.group(2).lower()
+        due_at = utc_now() + delta.total_seconds()
+        reminder_id = await self.store.add(interaction.user.id, interaction.channel_id, interaction.guild_id, message, due_at)
+        self.scheduler.schedule(reminder_id, due_at)
 
-            if time_unit not in valid_units:
-                await interaction.followup.send(f"Invalid time unit '{time_unit}'. Please use s/m/h/d or their full names.", ephemeral=True)
-                logging.error(f"User: {interaction.user} - Error: Invalid time unit '{time_unit}'.")
-                return
+        await interaction.followup.send(f"Reminder #{reminder_id} set for {time} from now (<t:{int(due_at)}:f>).")
+        logging.info(f"User:{interaction.user} - set a timer for {time}")
 
-            if time_unit in ("s", "sec", "seconds"):
-                delta += timedelta(seconds=time_amount)
-            elif time_unit in ("m", "min", "minutes"):
-                delta += timedelta(minutes=time_amount)
-            elif time_unit in ("h", "hour", "hours"):
-                delta += timedelta(hours=time_amount)
-            elif time_unit in ("d", "day", "days"):
-                delta += timedelta(days=time_amount)
+    @reminders.command(name="list", description="List your pending reminders.")
+    async def reminders_list(self, interaction: discord.Interaction):
+        pending = await self.store.for_user(interaction.user.id, REMINDER_LIST_LIMIT)
+        if not pending:
+            await interaction.response.send_message("You have no pending reminders.", ephemeral=True)
+            return
+        total = await self.store.count_for_user(interaction.user.id)
+        lines = [f"**Your reminders** ({total})"]
+        lines.extend(f"`#{r['id']}` <t:{int(r['due_at'])}:R>{self.describe_recurrence(r)} - {r['message'][:100]}" for r in pending)
+        if total > len(pending):
+            lines.append(f"... and {total - len(pending)} more")
+        chunks = split_message("\n".join(lines))
+        await interaction.response.send_message(chunks[0], ephemeral=True)
+        for chunk in chunks[1:]:
+            await interaction.followup.send(chunk, ephemeral=True)
 
-            i += 1
+    @reminders.command(name="every", description="Set a reminder that repeats at a fixed interval.")
+    @app_commands.describe(interval="How often, e.g. '1d', '12h', '7d'", message="What to remind you of",
+                           timezone="Keeps whole-day intervals at the same local time across DST changes")
+    async def reminders_every(self, interaction: discord.Interaction, interval: str, message: str, timezone: Optional[str] = None):
+        delta, error = parse_duration(interval)
+        if error:
+            await interaction.response.send_message(error, ephemeral=True)
+            return
+        await self.add_recurring(interaction, f"every:{int(delta.total_seconds())}", message, timezone)
 
-        await interaction.followup.send(f"Reminder set for {time} from now.")
-        logging.info(f"User:{interaction.user} - set a timer for {time}")
+    @reminders.command(name="cron", description="Set a reminder on a cron schedule.")
+    @app_commands.describe(expression="minute hour day-of-month month day-of-week, e.g. '0 9 * * mon-fri', or @daily",
+                           message="What to remind you of", timezone="Time zone the schedule is in, e.g. Europe/Berlin")
+    async def reminders_cron(self, interaction: discord.Interaction, expression: str, message: str, timezone: Optional[str] = None):
+        await self.add_recurring(interaction, f"cron:{expression}", message, timezone)
+
+    async def add_recurring(self, interaction, spec, message, timezone_name):
+        try:
+            timezone_name = get_timezone(timezone_name or self.default_timezone).zone
+            recurrence = parse_recurrence(spec, timezone_name)
+        except ValueError as e:
+            await interaction.response.send_message(str(e), ephemeral=True)
+            return
+        now = utc_now()
+        due_at = recurrence.next_after(now, now)
+        reminder_id = await self.store.add(
+            interaction.user.id, interaction.channel_id, interaction.guild_id, message, due_at, recurrence.spec, timezone_name
+        )
+        self.scheduler.schedule(reminder_id, due_at)
+        await interaction.response.send_message(
+            f"Reminder #{reminder_id} set, {recurrence.describe()} ({timezone_name}). First one <t:{int(due_at)}:R>."
+        )
+        logging.info(f"User:{interaction.user} - set recurring reminder {reminder_id}: {recurrence.spec} ({timezone_name})")
+
+    @reminders_every.autocomplete("timezone")
+    @reminders_cron.autocomplete("timezone")
+    async def timezone_autocomplete(self, interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+        current = current.lower()
+        zones = [zone for zone in pytz.common_timezones if current in zone.lower()]
+        return [app_commands.Choice(name=zone, value=zone) for zone in zones[:REMINDER_LIST_LIMIT]]
+
+    @staticmethod
+    def describe_recurrence(reminder):
+        if not reminder["recurrence"]:
+            return ""
+        try:
+            description = parse_recurrence(reminder["recurrence"], reminder["timezone"]).describe()
+        except ValueError:
+            description = reminder["recurrence"]
+        return f" 🔁 {description} ({reminder['timezone']})"
 
-        await asyncio.sleep(delta.total_seconds())
+    @reminders.command(name="cancel", description="Cancel one of your reminders.")
+    @app_commands.describe(reminder_id="Number of the reminder, from /reminders list")
+    async def reminders_cancel(self, interaction: discord.Interaction, reminder_id: int):
+        if not await self.store.delete(reminder_id, interaction.user.id):
+            await interaction.response.send_message(f"You have no pending reminder #{reminder_id}.", ephemeral=True)
+            return
+        self.scheduler.cancel(reminder_id)
+        self.retrying.pop(reminder_id, None)
+        await interaction.response.send_message(f"Reminder #{reminder_id} cancelled.", ephemeral=True)
+        logging.info(f"User:{interaction.user} - cancelled reminder {reminder_id}")
 
-        await interaction.channel.send(f"<@{interaction.user.id}> ⏰ Reminder: {message}")
-        logging.info(f"User:{interaction.user} - Reminder: {message}")
+    @reminders_cancel.autocomplete("reminder_id")
+    async def reminders_cancel_autocomplete(self, interaction: discord.Interaction, current: str) -> List[app_commands.Choice[int]]:
+        pending = await self.store.for_user(interaction.user.id, REMINDER_LIST_LIMIT)
+        return [
+            app_commands.Choice(name=f"#{r['id']}: {r['message']}"[:100], value=r["id"])
+            for r in pending if current in str(r["id"]) or current.lower() in r["message"].lower()
+        ]
 
 async def setup(bot):
     logging.info("setting up the reminder cog...")
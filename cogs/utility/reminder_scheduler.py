@@ -0,0 +1,119 @@
+# bot/cogs/utility/reminder_scheduler.py
+import asyncio
+import heapq
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Re-check the clock at least this often, so a wall-clock jump can't delay a reminder for long.
+MAX_SLEEP_SECONDS = 300
+# Deliveries in flight at once. Each can take several HTTP calls (fetching the channel or user,
+# falling back to DMs), so after downtime a catch-up burst is sent in parallel, not one by one.
+MAX_CONCURRENT_DELIVERIES = 8
+STOP_GRACE_SECONDS = 5  # let in-flight sends finish on shutdown, so they aren't repeated on restart
+
+
+class ReminderScheduler:
+    """One background task firing reminders from an in-memory min-heap of (due_at, id).
+
+    A pending reminder costs one heap tuple and one dict entry; its text and destination stay in
+    the database until it fires. Cancelling only forgets the id: the heap entry is skipped when it
+    reaches the top (and the heap is compacted if too many stale entries pile up). Each due
+    reminder is delivered in a task of its own, at most MAX_CONCURRENT_DELIVERIES at a time, so
+    one slow send doesn't hold back the reminders due after it.
+    """
+
+    def __init__(self, deliver: Callable[[int, float], Awaitable[None]],
+                 max_concurrent: int = MAX_CONCURRENT_DELIVERIES):
+        self.deliver = deliver  # deliver(reminder_id, due_at)
+        self._heap: List[Tuple[float, int]] = []
+        self._due: Dict[int, float] = {}  # live reminders; heap entries that don't match are stale
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._deliveries: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def load(self, entries: Iterable[Tuple[float, int]]):
+        """Bulk-load (due_at, id) pairs: one heapify instead of a push per reminder."""
+        for due_at, reminder_id in entries:
+            self._due[reminder_id] = due_at
+        self._heap = [(due_at, reminder_id) for reminder_id, due_at in self._due.items()]
+        heapq.heapify(self._heap)
+        self._wakeup.set()
+
+    def schedule(self, reminder_id: int, due_at: float):
+        self._due[reminder_id] = due_at
+        heapq.heappush(self._heap, (due_at, reminder_id))
+        if self._heap[0] == (due_at, reminder_id):
+            self._wakeup.set()  # new earliest reminder: the sleeping task must wake sooner
+
+    def cancel(self, reminder_id: int) -> bool:
+        if self._due.pop(reminder_id, None) is None:
+            return False
+        if len(self._heap) > 2 * len(self._due) + 64:
+            self._heap = [(due_at, rid) for due_at, rid in self._heap if self._due.get(rid) == due_at]
+            heapq.heapify(self._heap)
+        return True
+
+    def _peek(self) -> Optional[Tuple[float, int]]:
+        while self._heap:
+            due_at, reminder_id = self._heap[0]
+            if self._due.get(reminder_id) == due_at:
+                return due_at, reminder_id
+            heapq.heappop(self._heap)  # cancelled or rescheduled
+        return None
+
+    # --- Lifecycle ---
+
+    def start(self, wait_until_ready: Optional[Callable[[], Awaitable[None]]] = None):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(wait_until_ready))
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._deliveries:
+            _, unfinished = await asyncio.wait(self._deliveries, timeout=STOP_GRACE_SECONDS)
+            for task in unfinished:
+                task.cancel()
+            await asyncio.gather(*unfinished, return_exceptions=True)
+
+    async def _run(self, wait_until_ready):
+        if wait_until_ready:
+            await wait_until_ready()
+        while True:
+            self._wakeup.clear()
+            head = self._peek()
+            if head is not None and head[0] <= time.time():
+                # Wait for a free slot first; the head may have been cancelled meanwhile.
+                await self._slots.acquire()
+                if self._peek() != head:
+                    self._slots.release()
+                    continue
+                heapq.heappop(self._heap)
+                due_at, reminder_id = head
+                del self._due[reminder_id]
+                task = asyncio.create_task(self._deliver(reminder_id, due_at))
+                self._deliveries.add(task)
+                task.add_done_callback(self._deliveries.discard)
+                continue
+            timeout = MAX_SLEEP_SECONDS if head is None else min(head[0] - time.time(), MAX_SLEEP_SECONDS)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(0.0, timeout))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _deliver(self, reminder_id: int, due_at: float):
+        try:
+            await self.deliver(reminder_id, due_at)
+        except Exception as e:
+            logger.error(f"Failed to deliver reminder {reminder_id}: {e}")
+        finally:
+            self._slots.release()
@@ -0,0 +1,109 @@
+# bot/cogs/utility/reminder_store.py
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from cogs.utility.storage_utils import SqliteStore
+
+
+class ReminderStore(SqliteStore):
+    """Pending reminders in SQLite, so they survive restarts.
+
+    One-shot rows are deleted once delivered (or cancelled); recurring ones get their next
+    `due_at` instead.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path, "reminder-db")
+
+    # --- Thread-side helpers (only ever called on the reminder-db thread) ---
+
+    def _init_db(self, conn: sqlite3.Connection):
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS reminders (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                channel_id INTEGER,
+                guild_id INTEGER,
+                message TEXT NOT NULL,
+                due_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                recurrence TEXT,
+                timezone TEXT
+            );
+            CREATE INDEX IF NOT EXISTS reminders_user ON reminders(user_id, due_at);
+        """)
+        # Databases from before recurring reminders.
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(reminders)")}
+        for column in ("recurrence", "timezone"):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE reminders ADD COLUMN {column} TEXT")
+
+    def _add(self, user_id: int, channel_id: Optional[int], guild_id: Optional[int], message: str,
+             due_at: float, now: float, recurrence: Optional[str], timezone: Optional[str]) -> int:
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO reminders(user_id, channel_id, guild_id, message, due_at, created_at, recurrence, timezone) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (user_id, channel_id, guild_id, message, due_at, now, recurrence, timezone),
+            )
+        return cursor.lastrowid
+
+    def _reschedule(self, reminder_id: int, due_at: float):
+        conn = self._connect()
+        with conn:
+            conn.execute("UPDATE reminders SET due_at = ? WHERE id = ?", (due_at, reminder_id))
+
+    def _get(self, reminder_id: int) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute("SELECT * FROM reminders WHERE id = ?", (reminder_id,)).fetchone()
+        return dict(row) if row else None
+
+    def _delete(self, reminder_id: int, user_id: Optional[int]) -> bool:
+        conn = self._connect()
+        with conn:
+            if user_id is None:
+                cursor = conn.execute("DELETE FROM reminders WHERE id = ?", (reminder_id,))
+            else:
+                cursor = conn.execute("DELETE FROM reminders WHERE id = ? AND user_id = ?", (reminder_id, user_id))
+        return cursor.rowcount > 0
+
+    def _for_user(self, user_id: int, limit: int) -> List[Dict[str, Any]]:
+        rows = self._connect().execute(
+            "SELECT * FROM reminders WHERE user_id = ? ORDER BY due_at LIMIT ?", (user_id, limit)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def _count_for_user(self, user_id: int) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM reminders WHERE user_id = ?", (user_id,)).fetchone()[0]
+
+    def _schedule(self) -> List[Tuple[float, int]]:
+        return [(row["due_at"], row["id"]) for row in self._connect().execute("SELECT id, due_at FROM reminders")]
+
+    # --- Public async API ---
+
+    async def add(self, user_id: int, channel_id: Optional[int], guild_id: Optional[int], message: str, due_at: float,
+                  recurrence: Optional[str] = None, timezone: Optional[str] = None) -> int:
+        """`recurrence` is a spec from cogs.utility.recurrence ("every:3600", "cron:0 9 * * 1")."""
+        return await self._run(self._add, user_id, channel_id, guild_id, message, due_at, time.time(), recurrence, timezone)
+
+    async def reschedule(self, reminder_id: int, due_at: float):
+        await self._run(self._reschedule, reminder_id, due_at)
+
+    async def get(self, reminder_id: int) -> Optional[Dict[str, Any]]:
+        return await self._run(self._get, reminder_id)
+
+    async def delete(self, reminder_id: int, user_id: Optional[int] = None) -> bool:
+        """Delete a reminder; with `user_id`, only if it belongs to that user."""
+        return await self._run(self._delete, reminder_id, user_id)
+
+    async def for_user(self, user_id: int, limit: int) -> List[Dict[str, Any]]:
+        return await self._run(self._for_user, user_id, limit)
+
+    async def count_for_user(self, user_id: int) -> int:
+        return await self._run(self._count_for_user, user_id)
+
+    async def schedule(self) -> List[Tuple[float, int]]:
+        """(due_at, id) of every pending reminder, for loading the scheduler at startup."""
+        return await self._run(self._schedule)
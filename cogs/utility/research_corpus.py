@@ -0,0 +1,140 @@
+# bot/cogs/utility/research_corpus.py
+import logging
+import re
+import sqlite3
+import time
+from typing import Any, Dict, List
+
+from cogs.utility.storage_utils import SqliteStore
+
+logger = logging.getLogger(__name__)
+
+# Words too common to say anything about whether the corpus covers a query.
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from", "how", "in",
+    "is", "it", "of", "on", "or", "the", "to", "vs", "versus", "what", "when", "where", "which", "who",
+    "why", "with", "best", "latest", "about", "between", "compare", "comparison", "difference",
+}
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.\-]*[a-z0-9+#]|[a-z0-9]")
+
+
+def query_terms(text: str) -> List[str]:
+    """Distinct, lower-cased content words of a query."""
+    terms = [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+    return list(dict.fromkeys(terms))
+
+
+class ResearchCorpus(SqliteStore):
+    """Every page DeepResearch has extracted, in an on-disk SQLite FTS5 index ranked with BM25.
+
+    Pages carry a `fetched_at` timestamp; anything older than `max_age_seconds` counts as stale,
+    so it isn't served from the corpus and gets re-fetched (and replaced) by the next scrape.
+    """
+
+    def __init__(self, path: str, max_age_seconds: float, mmap_size: int = 256 * 1024 * 1024):
+        super().__init__(path, "research-corpus")
+        self.max_age_seconds = max_age_seconds
+        self.mmap_size = mmap_size
+
+    # --- Thread-side helpers (only ever called on the corpus thread) ---
+
+    def _init_db(self, conn: sqlite3.Connection):
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS documents (
+                id INTEGER PRIMARY KEY,
+                url TEXT NOT NULL UNIQUE,
+                title TEXT NOT NULL,
+                content TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+                title, content, content='documents', content_rowid='id', tokenize='porter unicode61'
+            );
+            CREATE TRIGGER IF NOT EXISTS documents_ai AFTER INSERT ON documents BEGIN
+                INSERT INTO documents_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+            END;
+            CREATE TRIGGER IF NOT EXISTS documents_ad AFTER DELETE ON documents BEGIN
+                INSERT INTO documents_fts(documents_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+            END;
+            CREATE TRIGGER IF NOT EXISTS documents_au AFTER UPDATE ON documents BEGIN
+                INSERT INTO documents_fts(documents_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+                INSERT INTO documents_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+            END;
+        """)
+
+    def _add_page(self, url: str, title: str, content: str, fetched_at: float):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT INTO documents(url, title, content, fetched_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET title=excluded.title, content=excluded.content, fetched_at=excluded.fetched_at",
+                (url, title, content, fetched_at),
+            )
+
+    def _get_fresh(self, urls: List[str], min_fetched_at: float) -> Dict[str, Dict[str, Any]]:
+        conn = self._connect()
+        found = {}
+        for url in urls:
+            row = conn.execute(
+                "SELECT url, title, content, fetched_at FROM documents WHERE url = ? AND fetched_at >= ?",
+                (url, min_fetched_at),
+            ).fetchone()
+            if row:
+                found[url] = dict(row)
+        return found
+
+    def _search(self, terms: List[str], limit: int, min_fetched_at: float, match_all: bool) -> List[Dict[str, Any]]:
+        conn = self._connect()
+        joiner = " AND " if match_all else " OR "
+        match = joiner.join('"' + t.replace('"', '""') + '"' for t in terms)
+        rows = conn.execute(
+            "SELECT d.url, d.title, d.content, d.fetched_at, bm25(documents_fts, 2.0, 1.0) AS score "
+            "FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid "
+            "WHERE documents_fts MATCH ? AND d.fetched_at >= ? "
+            "ORDER BY score LIMIT ?",
+            (match, min_fetched_at, limit),
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def _count(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    # --- Public async API ---
+
+    def _min_fetched_at(self) -> float:
+        return time.time() - self.max_age_seconds
+
+    async def add_page(self, url: str, title: str, content: str):
+        try:
+            await self._run(self._add_page, url, title, content, time.time())
+        except sqlite3.Error as e:
+            logger.error(f"Failed to add {url} to research corpus: {e}")
+
+    async def get_fresh(self, urls: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fresh stored copies of any of these URLs, keyed by URL."""
+        if not urls:
+            return {}
+        try:
+            return await self._run(self._get_fresh, list(urls), self._min_fetched_at())
+        except sqlite3.Error as e:
+            logger.error(f"Research corpus lookup failed: {e}")
+            return {}
+
+    async def search(self, query: str, limit: int = 5, match_all: bool = True) -> List[Dict[str, Any]]:
+        """BM25-ranked fresh documents for a query (best first).
+
+        With `match_all` every content word of the query must appear, which is what we use to
+        decide whether the corpus can answer a query without going to the web.
+        """
+        terms = query_terms(query)
+        if not terms:
+            return []
+        try:
+            return await self._run(self._search, terms, limit, self._min_fetched_at(), match_all)
+        except sqlite3.Error as e:
+            logger.error(f"Research corpus search failed for '{query}': {e}")
+            return []
+
+    async def count(self) -> int:
+        return await self._run(self._count)
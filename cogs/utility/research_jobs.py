@@ -0,0 +1,332 @@
+# bot/cogs/utility/research_jobs.py
+import asyncio
+import collections
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from cogs.utility.storage_utils import write_atomic
+
+logger = logging.getLogger(__name__)
+
+# Job status values
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+
+
+class ResearchJob:
+    """One /deepresearch request. Everything in `state` is checkpointed to disk and restored on resume."""
+
+    def __init__(self, topic: str, user_id: int, channel_id: Optional[int], guild_id: Optional[int],
+                 options: Optional[Dict[str, Any]] = None, job_id: Optional[str] = None,
+                 created_at: Optional[float] = None, state: Optional[Dict[str, Any]] = None):
+        self.job_id = job_id or uuid.uuid4().hex[:8]
+        self.topic = topic
+        self.user_id = user_id
+        self.channel_id = channel_id
+        self.guild_id = guild_id
+        self.options = options or {}
+        self.created_at = created_at or time.time()
+        self.state = state or {}
+        self.status = JOB_QUEUED
+        # Runtime only, never persisted: the interaction dies with the process anyway.
+        self.interaction = None
+        self.resumed = False
+        self.cancel_requested = False
+        self.task: Optional[asyncio.Task] = None
+        self.progress: Optional["ResearchProgress"] = None
+        # Breadth-mode branches checkpoint concurrently; writes must not interleave.
+        self.checkpoint_lock = asyncio.Lock()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "topic": self.topic,
+            "user_id": self.user_id,
+            "channel_id": self.channel_id,
+            "guild_id": self.guild_id,
+            "options": self.options,
+            "created_at": self.created_at,
+            "state": self.state,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ResearchJob":
+        return cls(
+            topic=data["topic"],
+            user_id=data["user_id"],
+            channel_id=data.get("channel_id"),
+            guild_id=data.get("guild_id"),
+            options=data.get("options"),
+            job_id=data["job_id"],
+            created_at=data.get("created_at"),
+            state=data.get("state"),
+        )
+
+
+class ResearchProgress:
+    """Coalesces a job's status updates into at most one Discord edit per `interval` seconds.
+
+    Callers just `update()` the phase and counters as often as they like; a background task sends
+    the latest rendering when something changed, plus a heartbeat so the elapsed time stays live.
+    """
+
+    def __init__(self, send: Callable[[str], Awaitable[None]], interval: float = 3.0,
+                 heartbeat: float = 15.0, started_at: Optional[float] = None, tokens_used: int = 0):
+        self.send = send
+        self.interval = interval
+        self.heartbeat = heartbeat
+        self.started_at = started_at or time.time()
+        self.phase = ""
+        self.pages_done = 0
+        self.pages_planned = 0
+        self.pages_total = 0
+        self.tokens_used = tokens_used
+        self._changed = asyncio.Event()
+        self._last_sent = None
+        self._task: Optional[asyncio.Task] = None
+
+    def update(self, phase: Optional[str] = None, **counters):
+        if phase is not None:
+            self.phase = phase
+        for name, value in counters.items():
+            setattr(self, name, value)
+        self._changed.set()
+
+    def add_tokens(self, tokens: int):
+        self.tokens_used += tokens
+        self._changed.set()
+
+    def plan_pages(self, count: int):
+        self.pages_planned += count
+        self._changed.set()
+
+    def page_done(self, success: bool):
+        self.pages_done += 1
+        if success:
+            self.pages_total += 1
+        self._changed.set()
+
+    def render(self) -> str:
+        elapsed = int(time.time() - self.started_at)
+        stats = []
+        if self.pages_planned:
+            stats.append(f"Pages: {self.pages_done}/{self.pages_planned}")
+        stats.append(f"Scraped: {self.pages_total}")
+        stats.append(f"Tokens: {self.tokens_used:,}")
+        stats.append(f"Elapsed: {elapsed // 60}m {elapsed % 60:02d}s")
+        return f"{self.phase}\n-# {' · '.join(stats)}"
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop reporting without sending anything still pending (final output replaces it)."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=self.heartbeat)
+            except asyncio.TimeoutError:
+                pass
+            self._changed.clear()
+            content = self.render()
+            if content != self._last_sent:
+                try:
+                    await self.send(content)
+                    self._last_sent = content
+                except Exception as e:
+                    logger.warning(f"Progress update failed: {e}")
+            await asyncio.sleep(self.interval)
+
+
+class ResearchJobManager:
+    """Bounded worker pool over a FIFO of research jobs, with on-disk checkpoints for resume.
+
+    `runner(job)` does the actual research and is expected to call `checkpoint(job)` after each
+    stage. A job's checkpoint file is removed when it finishes or is cancelled by a user; jobs
+    interrupted by shutdown keep theirs and are picked up again by `load_checkpoints()`.
+    """
+
+    def __init__(self, runner: Callable[[ResearchJob], Awaitable[None]], state_dir: str,
+                 max_workers: int = 2, max_queued: int = 20,
+                 on_position_change: Optional[Callable[[ResearchJob, int], Awaitable[None]]] = None):
+        self.runner = runner
+        self.state_dir = os.path.abspath(state_dir)
+        self.max_workers = max(1, max_workers)
+        self.max_queued = max_queued
+        self.on_position_change = on_position_change
+        self.jobs: Dict[str, ResearchJob] = {}
+        self._queue = collections.deque()
+        self._queue_changed = asyncio.Condition()
+        self._workers: List[asyncio.Task] = []
+        os.makedirs(self.state_dir, exist_ok=True)
+
+    # --- Lifecycle ---
+
+    def start(self):
+        if self._workers:
+            return
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.max_workers)]
+        logger.info(f"Research job manager started with {self.max_workers} workers.")
+
+    async def stop(self):
+        """Stop workers and interrupt running jobs, keeping their checkpoints for the next start."""
+        for worker in self._workers:
+            worker.cancel()
+        running = [job.task for job in self.jobs.values() if job.task and not job.task.done()]
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*self._workers, *running, return_exceptions=True)
+        self._workers = []
+
+    # --- Queue ---
+
+    def is_full(self) -> bool:
+        return len(self._queue) >= self.max_queued
+
+    def queued_count(self) -> int:
+        return len(self._queue)
+
+    async def submit(self, job: ResearchJob) -> Optional[int]:
+        """Queue a job and return its 1-based queue position, or None if the queue is full."""
+        if self.is_full():
+            return None
+        self.jobs[job.job_id] = job
+        await self.checkpoint(job)
+        async with self._queue_changed:
+            self._queue.append(job.job_id)
+            position = len(self._queue)
+            self._queue_changed.notify()
+        return position
+
+    def position(self, job_id: str) -> Optional[int]:
+        try:
+            return self._queue.index(job_id) + 1
+        except ValueError:
+            return None
+
+    def running_jobs(self) -> List[ResearchJob]:
+        return [job for job in self.jobs.values() if job.status == JOB_RUNNING]
+
+    def jobs_for_user(self, user_id: int) -> List[ResearchJob]:
+        return sorted((job for job in self.jobs.values() if job.user_id == user_id), key=lambda j: j.created_at)
+
+    async def cancel(self, job_id: str) -> Optional[str]:
+        """Cancel a queued or running job. Returns the status it had, or None if unknown."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        job.cancel_requested = True
+        if job.status == JOB_QUEUED:
+            async with self._queue_changed:
+                if job_id in self._queue:
+                    self._queue.remove(job_id)
+            self.discard(job)
+            await self._notify_positions()
+            return JOB_QUEUED
+        if job.task and not job.task.done():
+            job.task.cancel()
+        return JOB_RUNNING
+
+    async def _notify_positions(self):
+        if not self.on_position_change:
+            return
+        for idx, job_id in enumerate(list(self._queue)):
+            job = self.jobs.get(job_id)
+            if job is None:
+                continue
+            try:
+                await self.on_position_change(job, idx + 1)
+            except Exception as e:
+                logger.warning(f"Failed to report queue position for research job {job_id}: {e}")
+
+    async def _worker(self, worker_num: int):
+        while True:
+            async with self._queue_changed:
+                await self._queue_changed.wait_for(lambda: bool(self._queue))
+                job_id = self._queue.popleft()
+            job = self.jobs.get(job_id)
+            if job is None:
+                continue
+
+            job.status = JOB_RUNNING
+            logger.info(f"Worker {worker_num} starting research job {job.job_id} ('{job.topic}').")
+            job.task = asyncio.create_task(self.runner(job))
+            await self._notify_positions()
+            # On shutdown the worker is cancelled here and stop() cancels the job task; the
+            # checkpoint is left on disk for resume.
+            await asyncio.wait({job.task})
+
+            if job.task.cancelled():
+                if job.cancel_requested:
+                    logger.info(f"Research job {job.job_id} cancelled by request.")
+                    self.discard(job)
+                else:
+                    logger.info(f"Research job {job.job_id} interrupted; checkpoint kept for resume.")
+                    self.jobs.pop(job.job_id, None)
+                continue
+            if job.task.exception():
+                logger.error(f"Research job {job.job_id} crashed: {job.task.exception()}", exc_info=job.task.exception())
+            self.discard(job)
+
+    def discard(self, job: ResearchJob):
+        """Drop a job and its checkpoint (it finished, was cancelled, or won't be resumed)."""
+        self.jobs.pop(job.job_id, None)
+        try:
+            os.remove(self._checkpoint_path(job.job_id))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Failed to remove checkpoint for research job {job.job_id}: {e}")
+
+    # --- Checkpoints ---
+
+    def _checkpoint_path(self, job_id: str) -> str:
+        return os.path.join(self.state_dir, f"{job_id}.json")
+
+    async def checkpoint(self, job: ResearchJob):
+        """Atomically persist the job. The file write runs off the event loop (contexts can be tens of KB)."""
+        if job.cancel_requested:
+            return
+        async with job.checkpoint_lock:
+            try:
+                # Serialize here, not in the thread, so the snapshot can't see a half-updated state.
+                payload = json.dumps(job.to_dict())
+                await asyncio.to_thread(write_atomic, self._checkpoint_path(job.job_id), payload)
+            except Exception as e:
+                logger.error(f"Failed to checkpoint research job {job.job_id}: {e}")
+
+    def load_checkpoints(self) -> List[ResearchJob]:
+        """Read every checkpoint left behind by a previous run, oldest first."""
+        jobs = []
+        for filename in os.listdir(self.state_dir):
+            if not filename.endswith(".json"):
+                continue
+            path = os.path.join(self.state_dir, filename)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    job = ResearchJob.from_dict(json.load(f))
+            except (OSError, ValueError, KeyError) as e:
+                logger.error(f"Discarding unreadable research checkpoint {filename}: {e}")
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            if job.job_id in self.jobs:
+                # Submitted in this run (its checkpoint was written before we got here); already live.
+                continue
+            job.resumed = True
+            jobs.append(job)
+        jobs.sort(key=lambda j: j.created_at)
+        return jobs
@@ -0,0 +1,163 @@
+# bot/cogs/utility/sandbox_launcher.py
+# Sets up the local compile sandbox, then execs the program in it. LocalSandboxBackend runs this
+# as its own process (`python -I sandbox_launcher.py SPEC ARGV...`), so none of the setup happens
+# between fork and exec in the multi-threaded bot. SPEC is a JSON object: `root` (an empty
+# directory to build the sandbox root on), `tmp` (the writable working directory), `readonly` and
+# `devices` (host paths to bind), `limits` (rlimits) and `status_fd` (a pipe that gets the
+# program's CPU time once it exits, or -1). Standard library only: the bot's package isn't
+# importable from here.
+import ctypes
+import json
+import os
+import resource
+import signal
+import sys
+
+SETUP_FAILED = 125
+EXEC_FAILED = 127
+
+_CLONE_NEWNS = 0x00020000
+_CLONE_NEWUSER = 0x10000000
+_CLONE_NEWPID = 0x20000000
+_CLONE_NEWNET = 0x40000000
+_MS_RDONLY = 0x1
+_MS_NOSUID = 0x2
+_MS_NODEV = 0x4
+_MS_NOEXEC = 0x8
+_MS_REMOUNT = 0x20
+_MS_BIND = 0x1000
+_MS_REC = 0x4000
+_MS_PRIVATE = 0x40000
+_MNT_DETACH = 0x2
+# Flags of the original mount that a bind in a user namespace must keep when remounted read-only.
+_LOCKED_MOUNT_FLAGS = os.ST_NOSUID | os.ST_NODEV | os.ST_NOEXEC | os.ST_NOATIME | os.ST_NODIRATIME | os.ST_RELATIME
+# Uid/gid the program runs as inside its user namespace. Not 0: exec then drops the namespace's
+# capabilities, so the program can't remount, unmount or chroot its way out.
+SANDBOX_ID = 1000
+_libc = ctypes.CDLL(None, use_errno=True)
+_libc.mount.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_ulong, ctypes.c_void_p]
+
+
+def _mount(source, target, fstype, flags, data=None):
+    if _libc.mount(source and source.encode(), target.encode(), fstype and fstype.encode(), flags, data and data.encode()) != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, f"mount {source} on {target}: {os.strerror(errno)}")
+
+
+def _enter_namespaces():
+    uid, gid = os.geteuid(), os.getegid()
+    if _libc.unshare(_CLONE_NEWUSER | _CLONE_NEWNS | _CLONE_NEWNET | _CLONE_NEWPID) != 0:
+        raise OSError(ctypes.get_errno(), "unshare(CLONE_NEWUSER | CLONE_NEWNS | CLONE_NEWNET | CLONE_NEWPID) failed")
+    for name, content in (("setgroups", "deny"), ("uid_map", f"{SANDBOX_ID} {uid} 1"), ("gid_map", f"{SANDBOX_ID} {gid} 1")):
+        with open(f"/proc/self/{name}", "w") as f:
+            f.write(content)
+
+
+def _build_root(root: str, tmp: str, readonly, devices):
+    # Mounts made from here on stay in this namespace.
+    _mount(None, "/", None, _MS_REC | _MS_PRIVATE)
+    _mount("tmpfs", root, "tmpfs", _MS_NOSUID | _MS_NODEV, "size=1m,mode=755")
+
+    def bind(source, writable=False):
+        target = root + source
+        if os.path.islink(source):  # /bin -> usr/bin on merged-/usr systems
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.symlink(os.readlink(source), target)
+            return
+        if os.path.isdir(source):
+            os.makedirs(target, exist_ok=True)
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            open(target, "a").close()
+        _mount(source, target, None, _MS_BIND | _MS_REC)
+        flags = os.statvfs(source).f_flag & _LOCKED_MOUNT_FLAGS | _MS_NOSUID
+        _mount(None, target, None, _MS_REMOUNT | _MS_BIND | flags | (0 if writable else _MS_RDONLY))
+
+    for path in readonly:
+        bind(path)
+    for device in devices:
+        if os.path.exists(device):
+            bind(device, writable=True)
+    bind(tmp, writable=True)
+    # The new pid namespace's /proc: only the program's own processes. Some toolchains need
+    # /proc/self/exe; where procfs can't be mounted (some containers) they fail, the rest work.
+    os.mkdir(root + "/proc")
+    try:
+        _mount("proc", root + "/proc", "proc", _MS_NOSUID | _MS_NODEV | _MS_NOEXEC)
+    except OSError:
+        pass
+    _mount(None, root, None, _MS_REMOUNT | _MS_BIND | _MS_NOSUID | _MS_NODEV | _MS_RDONLY)
+
+    # Swap the root and drop the old one entirely: no path leads back to the host.
+    os.chdir(root)
+    if _libc.pivot_root(b".", b".") != 0:
+        raise OSError(ctypes.get_errno(), "pivot_root failed")
+    if _libc.umount2(b".", _MNT_DETACH) != 0:
+        raise OSError(ctypes.get_errno(), "umount of the old root failed")
+    os.chdir("/")
+
+
+def _set_limits(limits):
+    cpu = limits["cpu_seconds"]
+    memory = limits["memory_mb"] * 1024 * 1024
+    file_size = limits["max_file_mb"] * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+    # RLIMIT_DATA rather than RLIMIT_AS: V8 and the Go runtime reserve huge address ranges up front.
+    resource.setrlimit(resource.RLIMIT_DATA, (memory, memory))
+    resource.setrlimit(resource.RLIMIT_NPROC, (limits["max_processes"], limits["max_processes"]))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (file_size, file_size))
+    resource.setrlimit(resource.RLIMIT_NOFILE, (256, 256))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+
+
+def _wait_and_exit(pid: int, status_fd: int):
+    """Stand in for the program: wait for it, report its CPU time, and exit the way it did."""
+    _, status, usage = os.wait4(pid, 0)
+    if status_fd >= 0:
+        try:
+            os.write(status_fd, f"{usage.ru_utime + usage.ru_stime:.3f}\n".encode())
+        except OSError:
+            pass
+        os.close(status_fd)
+    if os.WIFSIGNALED(status):
+        sig = os.WTERMSIG(status)
+        if sig != signal.SIGKILL:  # can't have a handler, and setting one raises
+            signal.signal(sig, signal.SIG_DFL)
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+        os.kill(os.getpid(), sig)
+    os._exit(os.waitstatus_to_exitcode(status) & 0xFF)
+
+
+def main(argv) -> int:
+    spec, command = json.loads(argv[0]), argv[1:]
+    status_fd = spec.get("status_fd", -1)
+    try:
+        _enter_namespaces()
+        # Only children enter the new pid namespace. The program runs in one (as its pid 1, so
+        # anything it leaves behind dies with it); this process stays outside and stands in for it.
+        pid = os.fork()
+    except OSError as e:
+        print(f"sandbox: {e}", file=sys.stderr)
+        return SETUP_FAILED
+    if pid:
+        _wait_and_exit(pid, status_fd)
+    try:
+        if status_fd >= 0:
+            os.close(status_fd)
+        _build_root(spec["root"], spec["tmp"], spec["readonly"], spec["devices"])
+        os.chdir(spec["tmp"])
+        _set_limits(spec["limits"])
+    except OSError as e:
+        print(f"sandbox: {e}", file=sys.stderr)
+        sys.stderr.flush()
+        os._exit(SETUP_FAILED)
+    try:
+        os.execvp(command[0], command)
+    except OSError as e:
+        print(f"{command[0]}: {e.strerror}", file=sys.stderr)
+        sys.stderr.flush()
+        os._exit(EXEC_FAILED)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
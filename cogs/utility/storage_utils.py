@@ -0,0 +1,62 @@
+# bot/cogs/utility/storage_utils.py
+import abc
+import asyncio
+import concurrent.futures
+import os
+import sqlite3
+from typing import Optional
+
+
+def write_atomic(path: str, payload: str, encoding: Optional[str] = "utf-8"):
+    """Write `payload` to `path` through a temp file and os.replace, so a crash mid-write never
+    leaves a truncated file behind. Blocking; run it in a thread."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding=encoding) as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+
+class SqliteStore(abc.ABC):
+    """Base for stores backed by one SQLite database.
+
+    All sqlite work runs on one dedicated thread, which also owns the connection: the async API
+    goes through `_run()`, and thread-side methods get the connection from `_connect()`.
+    Subclasses create their schema (and set any extra pragmas) in `_init_db()`.
+    """
+
+    def __init__(self, path: str, thread_name: str):
+        self.path = os.path.abspath(path)
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix=thread_name)
+        self._conn: Optional[sqlite3.Connection] = None
+
+    # --- Thread-side helpers (only ever called on the store's thread) ---
+
+    @abc.abstractmethod
+    def _init_db(self, conn: sqlite3.Connection):
+        """Create the schema on a freshly opened connection."""
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._init_db(conn)
+            self._conn = conn
+        return self._conn
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    async def close(self):
+        try:
+            await self._run(self._close)
+        finally:
+            self._executor.shutdown(wait=False)
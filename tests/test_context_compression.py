@@ -0,0 +1,20 @@
+from cogs.utility.context_compression import compress_context
+
+
+def _source(title: str, body: str) -> str:
+    # Same layout as deep_research._format_source.
+    return f"\n\n--- SOURCE: {title} ---\nURL: https://{title}.example\n\nCONTENT:\n{body}\n\n" + "-" * 60 + "\n"
+
+
+def test_sub_question_header_survives_dropped_source():
+    same = "Rust ownership rules guarantee memory safety without needing a garbage collector at runtime."
+    context = (
+        "\n\n=== SUB-QUESTION 1: rust ===\n" + _source("a", same) + _source("b", same)
+        + "\n\n=== SUB-QUESTION 2: go ===\n"
+        + _source("c", "Go uses a concurrent tracing garbage collector tuned for low pause times in servers.")
+    )
+    compressed, _ = compress_context(context, "rust go")
+
+    assert "--- SOURCE: b ---" not in compressed  # emptied by dedup
+    assert "=== SUB-QUESTION 2: go ===" in compressed
+    assert compressed.index("=== SUB-QUESTION 2: go ===") < compressed.index("--- SOURCE: c ---")